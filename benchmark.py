@@ -0,0 +1,323 @@
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+from cycles import board_hash, update_hash
+from engine import available_engines, default_engine, generate_boards, np, random_board
+from headless import setup_match
+from pattern_store import default_store
+from renderer import CanvasRenderer, StubCanvas
+from simulation import Simulation
+
+
+cases = ("step", "render", "hash", "randomize", "counter", "stamp", "startup")
+default_sizes = ("96x54", "400x200", "1000x1000")
+default_densities = (0.05, 0.2, 0.5)
+default_matches = ("Gosper Glider Gun:Spaceship", "Gosper Glider Gun:Gosper Glider Gun")
+startup_modules = ("headless", "main", "gui")  # Imported by a fresh interpreter in the startup case
+bulk_boards = 1000  # Boards per bulk generation in the randomize case
+stamp_count = 300  # Patterns placed per run of the stamp case
+memory_repeats = 5  # Repeats of the separate traced run that measures peak memory
+
+
+# Value below which the given fraction of the sorted values lie
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+# Times action(state) up to repeats times or until max_seconds are used, action returns False when it can't go on.
+# Peak memory comes from a second, shorter run under tracemalloc, so tracing doesn't slow down the timed one.
+def measure(setup, action, repeats, max_seconds):
+    state = setup()
+    latencies = []
+    budget_end = time.perf_counter() + max_seconds
+    for _ in range(repeats):
+        start = time.perf_counter()
+        if action(state) is False:
+            break
+        latencies.append(time.perf_counter() - start)
+        if start > budget_end:
+            break
+
+    tracemalloc.start()
+    state = setup()
+    tracemalloc.reset_peak()
+    for _ in range(min(repeats, memory_repeats)):
+        if action(state) is False:
+            break
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    total = sum(latencies)
+    latencies.sort()
+    return {
+        "runs": len(latencies),
+        "ops_per_sec": len(latencies) / total if total > 0 else float("inf"),
+        "p50_ms": percentile(latencies, 0.5) * 1000,
+        "p90_ms": percentile(latencies, 0.9) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "peak_mb": peak / 2 ** 20,
+    }
+
+
+def random_simulation(engine_name, width, height, density, seed):
+    simulation = Simulation(width, height, engine_name=engine_name)
+    simulation.reset(random_board(width, height, density, seed))
+    return simulation
+
+
+# Change sets of the first generations of a simulation, replayed by the render and hash cases
+def recorded_changes(simulation, generations):
+    history = []
+    for _ in range(generations):
+        changes = simulation.step()
+        if changes is None:
+            break
+        history.append(changes)
+    return history
+
+
+def step_action(simulation):
+    return simulation.step() is not None
+
+
+# One (name, setup, action) per benchmark of a case on one board
+def case_benchmarks(case, engine_name, width, height, boards, seeds, steps):
+    if case == "randomize":
+        for seed in seeds:
+            yield (f"seed {seed}", lambda: Simulation(width, height, engine_name=engine_name),
+                   lambda simulation, seed=seed: simulation.randomize(seed))
+            if np is not None:  # Starting boards for batch experiments, without building any Simulation
+                yield (f"bulk {bulk_boards} seed {seed}", lambda: None,
+                       lambda state, seed=seed: generate_boards(range(seed, seed + bulk_boards), width, height))
+        return
+    if case == "stamp":
+        for seed in seeds:
+            stamps = random_stamps(width, height, seed)
+            yield (f"{stamp_count} patterns one by one, seed {seed}",
+                   lambda: Simulation(width, height, engine_name=engine_name),
+                   lambda simulation, stamps=stamps: [simulation.apply_edits(simulation.stamp_cells(*stamp))
+                                                      for stamp in stamps])
+            yield (f"{stamp_count} patterns in one batch, seed {seed}",
+                   lambda: Simulation(width, height, engine_name=engine_name),
+                   lambda simulation, stamps=stamps: simulation.stamp_many(stamps))
+        return
+
+    for label, make_simulation in boards:
+        if case == "step":
+            yield label, make_simulation, step_action
+        elif case == "counter":
+            yield label, make_simulation, lambda simulation: simulation.counts()
+        elif case == "render":
+            def setup(make_simulation=make_simulation):
+                simulation = make_simulation()
+                renderer = CanvasRenderer(StubCanvas(), width, height, 1)
+                renderer.draw(simulation.live_cells)
+                return renderer, iter(recorded_changes(simulation, steps))
+            yield label, setup, render_action
+        elif case == "hash":
+            # Full board hash, what every generation used to cost before incremental hashing
+            yield (label, lambda make_simulation=make_simulation: make_simulation().live_cells,
+                   lambda live_cells: board_hash(live_cells))
+
+            # Incremental update over recorded changes, what a generation costs now
+            def setup(make_simulation=make_simulation):
+                simulation = make_simulation()
+                old_cells = dict(simulation.live_cells)
+                return [board_hash(old_cells), old_cells, iter(recorded_changes(simulation, steps))]
+            yield f"{label} incremental", setup, hash_update_action
+
+
+# (offsets, x, y, colour) of random patterns from the store in random orientations, as a scripted scenario would
+def random_stamps(width, height, seed):
+    rng = random.Random(seed)
+    store = default_store()
+    names = store.names()
+    stamps = []
+    for _ in range(stamp_count):
+        x, y = rng.randrange(width), rng.randrange(height)
+        team = "blue" if x < width // 2 else "red"
+        stamps.append((store.offsets(rng.choice(names), rng.randrange(8), team), x, y, team))
+    return stamps
+
+
+def render_action(state):
+    renderer, history = state
+    changes = next(history, None)
+    if changes is None:
+        return False
+    renderer.apply(changes)
+
+
+def hash_update_action(state):
+    value, old_cells, history = state
+    changes = next(history, None)
+    if changes is None:
+        return False
+    state[0] = update_hash(value, old_cells, changes)
+    for cell, color in changes.items():
+        if color is None:
+            old_cells.pop(cell, None)
+        else:
+            old_cells[cell] = color
+
+
+# Import time of a module in a fresh interpreter and of each module it imports directly, in milliseconds and
+# including everything those import in turn, read from the -X importtime report. None when the import fails.
+def import_times(module):
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+    if result.returncode:
+        return None
+    total = 0.0
+    children = []
+    nested = []  # Reported before their parent, which closes the group
+    for line in result.stderr.splitlines():
+        fields = line.split("|")
+        if len(fields) != 3 or not fields[1].strip().isdigit():
+            continue
+        name = fields[2][1:]
+        depth = (len(name) - len(name.lstrip())) // 2
+        if depth == 1:
+            nested.append((name.strip(), int(fields[1]) / 1000))
+        elif depth == 0:
+            if name == module:
+                total = int(fields[1]) / 1000
+                children = nested
+            nested = []
+    return total, children
+
+
+# Wall time of starting an interpreter and importing a module, measured like measure does for the other cases
+def measure_startup(module, repeats, max_seconds):
+    times = import_times(module)
+    if times is None:
+        return None
+    import_ms, children = times
+    command = [sys.executable, "-c", f"import {module}"]
+    directory = os.path.dirname(os.path.abspath(__file__))
+    latencies = []
+    budget_end = time.perf_counter() + max_seconds
+    for _ in range(repeats):
+        start = time.perf_counter()
+        subprocess.run(command, cwd=directory, check=True)
+        latencies.append(time.perf_counter() - start)
+        if start > budget_end:
+            break
+
+    total = sum(latencies)
+    latencies.sort()
+    slowest = sorted(children, key=lambda item: -item[1])[:5]
+    return {
+        "runs": len(latencies),
+        "ops_per_sec": len(latencies) / total if total > 0 else float("inf"),
+        "p50_ms": percentile(latencies, 0.5) * 1000,
+        "p90_ms": percentile(latencies, 0.9) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "peak_mb": 0.0,
+        "import_ms": import_ms,
+        "slowest_imports": slowest,
+    }
+
+
+# Runs every selected case over every engine, size and board, returns {benchmark key: result}
+def run_benchmarks(selected_cases=cases, engine_names=(default_engine,), sizes=default_sizes,
+                   densities=default_densities, seeds=(1,), matches=default_matches, steps=100, max_seconds=2.0):
+    results = {}
+    if "startup" in selected_cases:
+        for module in startup_modules:
+            result = measure_startup(module, steps, max_seconds)
+            if result is None:
+                print(f"startup/{module}: the import fails, skipped")
+                continue
+            results[f"startup/{module}"] = result
+            print_result(f"startup/{module}", result)
+            print(f"    imports {result['import_ms']:.1f} ms, slowest: "
+                  + ", ".join(f"{name} {ms:.1f} ms" for name, ms in result["slowest_imports"]))
+
+    for engine_name in engine_names:
+        for size in sizes:
+            width, height = (int(value) for value in size.split("x"))
+
+            boards = [
+                (f"{density:.0%} seed {seed}",
+                 lambda density=density, seed=seed: random_simulation(engine_name, width, height, density, seed))
+                for density in densities
+                for seed in seeds
+            ]
+            for match in matches:
+                blue, red = match.split(":")
+                boards.append((f"{blue} vs {red}",
+                               lambda blue=blue, red=red: setup_match(width, height, blue, red, engine_name)))
+
+            for case in selected_cases:
+                for label, setup, action in case_benchmarks(case, engine_name, width, height, boards, seeds, steps):
+                    key = f"{case}/{engine_name}/{size}/{label}"
+                    results[key] = measure(setup, action, steps, max_seconds)
+                    print_result(key, results[key])
+    return results
+
+
+def print_result(key, result):
+    print(f"{key:<64} {result['ops_per_sec']:>10.1f}/s  p50 {result['p50_ms']:.3f} ms  "
+          f"p90 {result['p90_ms']:.3f} ms  p99 {result['p99_ms']:.3f} ms  peak {result['peak_mb']:.1f} MB")
+
+
+# Benchmarks that got slower than the baseline by more than the tolerance, as (key, baseline, current)
+def find_regressions(results, baseline, tolerance=0.25):
+    regressions = []
+    for key, result in results.items():
+        expected = baseline.get(key)
+        if expected is not None and result["ops_per_sec"] < expected["ops_per_sec"] * (1 - tolerance):
+            regressions.append((key, expected["ops_per_sec"], result["ops_per_sec"]))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks of the step, render, hash, randomize, counter and stamp paths "
+                                                 "and of the startup time")
+    parser.add_argument("--cases", nargs="+", choices=cases, default=list(cases))
+    parser.add_argument("--engines", nargs="+", choices=available_engines(), default=[default_engine])
+    parser.add_argument("--sizes", nargs="+", default=list(default_sizes), help="Board sizes as WIDTHxHEIGHT")
+    parser.add_argument("--densities", type=float, nargs="+", default=list(default_densities))
+    parser.add_argument("--seeds", type=int, nargs="+", default=[1])
+    parser.add_argument("--matches", nargs="*", default=list(default_matches),
+                        help="Pattern matches as BLUE:RED, from the pattern store")
+    parser.add_argument("--steps", type=int, default=100, help="Timed repeats per benchmark")
+    parser.add_argument("--max-seconds", type=float, default=2.0, help="Time budget per benchmark")
+    parser.add_argument("--baseline", default=None, help="Baseline JSON to compare against")
+    parser.add_argument("--save-baseline", default=None, help="Writes the results as a new baseline JSON")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown against the baseline")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.cases, args.engines, args.sizes, args.densities, args.seeds, args.matches,
+                             args.steps, args.max_seconds)
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as file:
+            json.dump({"python": platform.python_version(), "machine": platform.machine(), "results": results},
+                      file, indent=2)
+        print(f"Baseline written to {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)["results"]
+        regressions = find_regressions(results, baseline, args.tolerance)
+        for key, expected, actual in regressions:
+            print(f"REGRESSION {key}: {expected:.1f}/s -> {actual:.1f}/s ({actual / expected - 1:+.0%})")
+        if regressions:
+            print(f"{len(regressions)} benchmarks are more than {args.tolerance:.0%} slower than the baseline.")
+            return 1
+        print(f"No benchmark is more than {args.tolerance:.0%} slower than the baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
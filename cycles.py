@@ -0,0 +1,71 @@
+from collections import OrderedDict
+from teams import team_codes
+
+try:
+    import numpy as np
+except ImportError:  # Only cell_keys and the hash of large boards need NumPy
+    np = None
+
+
+mask = (1 << 64) - 1
+color_codes = team_codes  # Up to 8 teams, 4 bits of the key
+vector_hash_size = 4096  # Boards with at least this many cells are hashed with NumPy
+
+
+# 64-bit key of one coloured cell, a splitmix64 mix of its position so no key table has to be stored
+def cell_key(x, y, color):
+    z = (((y << 32) | (x & 0xFFFFFFFF)) * 16 + color_codes[color] + 0x9E3779B97F4A7C15) & mask
+    z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & mask
+    z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & mask
+    return z ^ (z >> 31)
+
+
+# cell_key for arrays of positions and colour codes at once, used by the engines that keep NumPy boards
+def cell_keys(xs, ys, codes):
+    z = (ys.astype(np.uint64) << np.uint64(32)) | xs.astype(np.uint64)
+    z = z * np.uint64(16) + codes.astype(np.uint64) + np.uint64(0x9E3779B97F4A7C15)
+    z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return z ^ (z >> np.uint64(31))
+
+
+# Zobrist hash of a whole board, the XOR of the keys of its live cells
+def board_hash(live_cells):
+    if np is not None and len(live_cells) >= vector_hash_size:
+        cells = np.array(list(live_cells), dtype=np.int64).reshape(-1, 2)
+        codes = np.array([color_codes[color] for color in live_cells.values()], dtype=np.uint8)
+        return int(np.bitwise_xor.reduce(cell_keys(cells[:, 0] & 0xFFFFFFFF, cells[:, 1], codes)))
+    value = 0
+    for (x, y), color in live_cells.items():
+        value ^= cell_key(x, y, color)
+    return value
+
+
+# Updates a board hash for {(x, y): colour or None} changes, old_cells is the board before the changes
+def update_hash(value, old_cells, changes):
+    for (x, y), color in changes.items():
+        old_color = old_cells.get((x, y))
+        if old_color is not None:
+            value ^= cell_key(x, y, old_color)
+        if color is not None:
+            value ^= cell_key(x, y, color)
+    return value
+
+
+# Remembers the generation at which each recent board hash was first seen, up to a fixed number of boards
+class CycleDetector:
+    def __init__(self, capacity=1 << 14):
+        self.capacity = capacity
+        self.seen = OrderedDict()  # hash -> generation, oldest first
+
+    def clear(self):
+        self.seen.clear()
+
+    # Returns the generation the hash was seen before, or records it and returns None
+    def check(self, value, generation):
+        if value in self.seen:
+            return self.seen[value]
+        self.seen[value] = generation
+        if len(self.seen) > self.capacity:
+            self.seen.popitem(last=False)  # Forget the oldest board
+        return None
@@ -0,0 +1,883 @@
+import random
+from itertools import compress
+from hashlife import HashlifeEngine
+from rules import coin, coins, lookup, random_tie, standard_rule, tie_hash, tie_hashes
+from teams import code_colors, match_teams, max_teams, region_dividers, team_codes
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional, the dict engine works without it
+    np = None
+
+
+# Reference engine, the original dict based step from GameOfLife.update with the rule read from its table.
+# Boards of more than two teams go through the life table and the tie policy of the rule instead.
+class DictEngine:
+    name = "dict"
+    codes = {None: 0, **team_codes}
+    colors = code_colors
+    max_teams = max_teams
+
+    def __init__(self, width, height, rule=None, teams=2):
+        self.width = width
+        self.height = height
+        self.rule = rule or standard_rule
+        self.teams = match_teams(teams)
+        self.live_cells = {}
+
+    # Replaces the board with the given {(x, y): colour} dictionary
+    def load(self, live_cells):
+        self.live_cells = dict(live_cells)
+
+    # Applies {(x, y): colour or None} edits without reloading the board
+    def apply(self, changes):
+        for cell, color in changes.items():
+            if color is None:
+                self.live_cells.pop(cell, None)
+            else:
+                self.live_cells[cell] = color
+
+    def cells(self):
+        return dict(self.live_cells)
+
+    # Immutable copy of the board that can be compared with == and given back to restore
+    def snapshot(self):
+        return frozenset(self.live_cells.items())
+
+    def restore(self, snapshot):
+        self.live_cells = dict(snapshot)
+
+    # Number of cells of each team, (blue, red) in a two-team match
+    def population(self):
+        counts = dict.fromkeys(self.teams, 0)
+        for color in self.live_cells.values():
+            counts[color] += 1
+        return tuple(counts.values())
+
+    # Advances one generation and returns {(x, y): colour or None} for every cell that changed
+    def step(self):
+        new_live_cells = {}
+        neighbor_counts = {}
+        no_counts = dict.fromkeys(self.teams, 0)
+
+        for (x, y), color in self.live_cells.items():
+            for dy in (-1, 0, 1):
+                for dx in (-1, 0, 1):
+                    if dx == 0 and dy == 0:
+                        continue
+                    nx, ny = (x + dx) % self.width, (y + dy) % self.height
+                    if (nx, ny) not in neighbor_counts:
+                        neighbor_counts[(nx, ny)] = no_counts.copy()  # Sets the cell counts
+                    neighbor_counts[(nx, ny)][color] += 1  # Adds to the count of the cell's team
+
+        # Live cells without neighbours only stay alive under rules with S0
+        if self.rule.life[9]:
+            for cell in self.live_cells:
+                neighbor_counts.setdefault(cell, no_counts.copy())
+
+        if len(self.teams) > 2:
+            for (cell, data) in neighbor_counts.items():
+                color = self.team_state(cell, data)
+                if color is not None:
+                    new_live_cells[cell] = color
+        else:
+            table = self.rule.table
+            for (cell, data) in neighbor_counts.items():  # Looks up the next state of the cell
+                state = table[self.codes[self.live_cells.get(cell)] * 81 + data["blue"] * 9 + data["red"]]
+                if state == random_tie:
+                    state = coin(cell[0], cell[1], self.rule.seed)
+                if state:
+                    new_live_cells[cell] = self.colors[state]  # Turns the cell blue or red
+
+        changes = {cell: None for cell in self.live_cells if cell not in new_live_cells}
+        for cell, color in new_live_cells.items():
+            if self.live_cells.get(cell) != color:
+                changes[cell] = color
+
+        self.live_cells = new_live_cells
+        return changes
+
+    # Next colour of a cell from its neighbour count per team: the team with the most neighbours, unless several
+    # have the most, then the tie policy of the rule decides
+    def team_state(self, cell, counts):
+        own = self.live_cells.get(cell)
+        if not self.rule.life[(own is not None) * 9 + sum(counts.values())]:
+            return None
+        most = max(counts.values())
+        leaders = [team for team, count in counts.items() if count == most]
+        if len(leaders) == 1:
+            return leaders[0]
+        if self.rule.tie == "keep":
+            return own
+        if self.rule.tie == "random":
+            return leaders[tie_hash(cell[0], cell[1], self.rule.seed) % len(leaders)]
+        return None
+
+
+# Vectorised engine, holds one 0/1 array per team and steps the whole torus at once
+class NumpyEngine:
+    name = "numpy"
+    colors = (None, "blue", "red")  # Indexed by blue + 2 * red
+
+    def __init__(self, width, height, rule=None):
+        if np is None:
+            raise RuntimeError("The numpy engine requires NumPy to be installed.")
+        self.width = width
+        self.height = height
+        self.rule = rule or standard_rule
+        self.coins = self.rule.coin_array(width, height) if self.rule.random_ties else None
+        self.blue = np.zeros((height, width), dtype=np.uint8)
+        self.red = np.zeros((height, width), dtype=np.uint8)
+
+    def load(self, live_cells):
+        self.blue[:] = 0
+        self.red[:] = 0
+        if not live_cells:
+            return
+        cells = np.array(list(live_cells), dtype=np.int64)
+        xs = cells[:, 0] % self.width
+        ys = cells[:, 1] % self.height
+        blue = np.fromiter((color == "blue" for color in live_cells.values()), dtype=bool, count=len(live_cells))
+        self.blue[ys[blue], xs[blue]] = 1
+        self.red[ys[~blue], xs[~blue]] = 1
+
+    def apply(self, changes):
+        for (x, y), color in changes.items():
+            self.blue[y, x] = color == "blue"
+            self.red[y, x] = color == "red"
+
+    def cells(self):
+        live_cells = {}
+        for color, board in (("blue", self.blue), ("red", self.red)):
+            ys, xs = np.nonzero(board)
+            for x, y in zip(xs.tolist(), ys.tolist()):
+                live_cells[(x, y)] = color
+        return live_cells
+
+    def snapshot(self):
+        return self.blue.tobytes(), self.red.tobytes()
+
+    def restore(self, snapshot):
+        blue, red = snapshot
+        self.blue = np.frombuffer(blue, dtype=np.uint8).reshape(self.height, self.width).copy()
+        self.red = np.frombuffer(red, dtype=np.uint8).reshape(self.height, self.width).copy()
+
+    def population(self):
+        return int(self.blue.sum()), int(self.red.sum())
+
+    def step(self):
+        states = lookup(self.rule.table, rule_index(self.blue, self.red))
+        if self.coins is not None:
+            states = np.where(states == random_tie, self.coins, states)
+        new_blue = (states == 1).view(np.uint8)
+        new_red = (states == 2).view(np.uint8)
+
+        ys, xs = np.nonzero((new_blue != self.blue) | (new_red != self.red))
+        codes = (new_blue[ys, xs] + 2 * new_red[ys, xs]).tolist()
+        changes = {(x, y): self.colors[code] for x, y, code in zip(xs.tolist(), ys.tolist(), codes)}
+
+        self.blue = new_blue
+        self.red = new_red
+        return changes
+
+
+# Vectorised engine for two to eight teams, the board is one array of team IDs (0 empty, see teams.team_codes).
+# Each live cell weighs 1 << 4 * (ID - 1) in a uint32, so one neighbour sum counts every team at once with one
+# nibble per team, whatever the number of teams. Whether a cell lives comes from the life table of the rule, and
+# only the nibbles of the cells that live are compared to find the team with the most neighbours. The few cells
+# where several teams have the most follow the tie policy of the rule.
+class TeamEngine:
+    name = "teams"
+    max_teams = max_teams
+
+    def __init__(self, width, height, rule=None, teams=2):
+        if np is None:
+            raise RuntimeError("The teams engine requires NumPy to be installed.")
+        self.width = width
+        self.height = height
+        self.rule = rule or standard_rule
+        self.teams = match_teams(teams)
+        self.codes = {None: 0, **team_codes}
+        self.weights = np.array([0] + [1 << 4 * index for index in range(len(self.teams))], dtype=np.uint32)
+        self.shifts = np.arange(0, 4 * len(self.teams), 4, dtype=np.uint32)
+        self.board = np.zeros((height, width), dtype=np.uint8)
+
+    def load(self, live_cells):
+        self.board[:] = 0
+        if not live_cells:
+            return
+        cells = np.array(list(live_cells), dtype=np.int64)
+        codes = np.fromiter((self.codes[color] for color in live_cells.values()), dtype=np.uint8,
+                            count=len(live_cells))
+        self.board[cells[:, 1] % self.height, cells[:, 0] % self.width] = codes
+
+    def apply(self, changes):
+        for (x, y), color in changes.items():
+            self.board[y, x] = self.codes[color]
+
+    def cells(self):
+        ys, xs = np.nonzero(self.board)
+        return {(x, y): code_colors[code] for x, y, code in zip(xs.tolist(), ys.tolist(), self.board[ys, xs].tolist())}
+
+    def snapshot(self):
+        return self.board.tobytes()
+
+    def restore(self, snapshot):
+        self.board = np.frombuffer(snapshot, dtype=np.uint8).reshape(self.height, self.width).copy()
+
+    # Number of cells of each team, counted in one pass
+    def population(self):
+        return tuple(np.bincount(self.board.ravel(), minlength=len(self.teams) + 1)[1:].tolist())
+
+    def step(self):
+        board = self.board
+        alive = (board != 0).view(np.uint8)
+        ys, xs = np.nonzero(lookup(self.rule.life, neighbor_sum(alive) + 9 * alive))
+        counts = neighbor_sum(self.weights[board])[ys, xs]
+
+        # Team with the most neighbours of every cell that lives, the first one in team order when several tie
+        most = counts & np.uint32(15)
+        winners = np.ones(len(ys), dtype=np.uint8)
+        tied = np.zeros(len(ys), dtype=bool)
+        for code, shift in enumerate(self.shifts[1:].tolist(), 2):
+            team = (counts >> np.uint32(shift)) & np.uint32(15)
+            more = team > most
+            tied = (tied & ~more) | (team == most)
+            winners[more] = code
+            most = np.maximum(most, team)
+
+        new_board = np.zeros_like(board)
+        new_board[ys, xs] = winners
+        if tied.any():
+            counts, most = counts[tied], most[tied]
+            leaders = ((counts[:, None] >> self.shifts) & np.uint32(15)) == most[:, None]
+            new_board[ys[tied], xs[tied]] = self.settle_ties(xs[tied], ys[tied], leaders)
+
+        ys, xs = np.nonzero(new_board != board)
+        changes = {(x, y): code_colors[code] for x, y, code in zip(xs.tolist(), ys.tolist(),
+                                                                  new_board[ys, xs].tolist())}
+        self.board = new_board
+        return changes
+
+    # Team IDs of the cells where several teams have the most neighbours, leaders flags those teams per cell
+    def settle_ties(self, xs, ys, leaders):
+        if self.rule.tie == "keep":
+            return self.board[ys, xs]
+        if self.rule.tie == "random":
+            picks = tie_hashes(xs, ys, self.rule.seed) % np.count_nonzero(leaders, axis=1).astype(np.uint64)
+            ranks = np.cumsum(leaders, axis=1) - 1  # Position of each tied team among the tied teams of its cell
+            chosen = leaders & (ranks == picks[:, None].astype(np.int64))
+            return chosen.argmax(axis=1).astype(np.uint8) + 1
+        return 0
+
+
+# Counts the live neighbours of every cell on the torus, rows first then columns.
+# Works on one board or on a stack of boards, the last two axes are the rows and columns.
+def neighbor_sum(board):
+    rows = board + np.roll(board, 1, axis=-2) + np.roll(board, -1, axis=-2)
+    return rows + np.roll(rows, 1, axis=-1) + np.roll(rows, -1, axis=-1) - board
+
+
+# Rule table index of every cell of one board or a stack of them (see rules.Rule). Both teams are counted by
+# one neighbour sum of 9 * blue + red, at most 72, and the whole index stays within a uint8.
+def rule_index(blue, red):
+    return neighbor_sum(9 * blue + red) + 81 * blue + 162 * red
+
+
+# Neighbour counts of the inner cells of a stack of windows that have a one cell border
+def window_neighbor_sum(windows):
+    rows = windows[:, :-2] + windows[:, 1:-1] + windows[:, 2:]
+    return rows[:, :, :-2] + rows[:, :, 1:-1] + rows[:, :, 2:] - windows[:, 1:-1, 1:-1]
+
+
+# rule_index of the inner cells of stacks of windows with a one cell border
+def window_rule_index(blue, red):
+    return window_neighbor_sum(9 * blue + red) + 81 * blue[:, 1:-1, 1:-1] + 162 * red[:, 1:-1, 1:-1]
+
+
+# NumPy engine that only looks at active tiles. The torus is cut into square tiles and a tile is dirty
+# when one of its cells changed in the previous generation, only dirty tiles and their neighbours can change next,
+# so settled regions cost nothing and the changes handed to the renderer never leave the active tiles.
+class TileEngine(NumpyEngine):
+    name = "tiles"
+
+    def __init__(self, width, height, rule=None, tile_size=16, full_step_fraction=0.25):
+        super().__init__(width, height, rule)
+        self.tile_size = tile_size
+        self.tiles_x = -(-width // tile_size)
+        self.tiles_y = -(-height // tile_size)
+        self.dirty = np.ones((self.tiles_y, self.tiles_x), dtype=bool)
+
+        # Offsets of a tile plus its one cell border, the window each active tile is computed from
+        self.window = np.arange(-1, tile_size + 1)
+        self.full_step_fraction = full_step_fraction  # Above this share of active tiles the whole board is stepped
+
+        self.active_tiles = 0  # Tiles recomputed by the last step
+        self.steps = 0
+        self.active_total = 0  # Sum of active tiles over all steps, for the mean fraction
+
+    def load(self, live_cells):
+        super().load(live_cells)
+        self.dirty[:] = True
+
+    def apply(self, changes):
+        super().apply(changes)
+        for x, y in changes:
+            self.dirty[y // self.tile_size, x // self.tile_size] = True
+
+    def restore(self, snapshot):
+        super().restore(snapshot)
+        self.dirty[:] = True
+
+    def tile_stats(self):
+        tiles = self.tiles_x * self.tiles_y
+        return {
+            "tiles": tiles,
+            "active": self.active_tiles,
+            "active_fraction": self.active_tiles / tiles,
+            "mean_active_fraction": self.active_total / (self.steps * tiles) if self.steps else 0.0,
+        }
+
+    def step(self):
+        # A changed cell can only affect cells in its own tile and the eight tiles around it
+        active = self.dirty | np.roll(self.dirty, 1, axis=0) | np.roll(self.dirty, -1, axis=0)
+        active = active | np.roll(active, 1, axis=1) | np.roll(active, -1, axis=1)
+        tile_ys, tile_xs = np.nonzero(active)
+        self.active_tiles = len(tile_ys)
+        self.active_total += self.active_tiles
+        self.steps += 1
+        if not self.active_tiles:
+            return {}
+        if self.active_tiles > self.full_step_fraction * active.size:
+            return self.full_step()
+
+        # Gathers the window of every active tile from the torus, the last row and column of tiles
+        # can stick out of the board, those cells wrap around and are dropped again below
+        rows = (tile_ys[:, None] * self.tile_size + self.window) % self.height
+        columns = (tile_xs[:, None] * self.tile_size + self.window) % self.width
+        blue = self.blue[rows[:, :, None], columns[:, None, :]]
+        red = self.red[rows[:, :, None], columns[:, None, :]]
+
+        states = lookup(self.rule.table, window_rule_index(blue, red))
+        if self.coins is not None:
+            inner_rows, inner_columns = rows[:, 1:-1], columns[:, 1:-1]
+            states = np.where(states == random_tie, self.coins[inner_rows[:, :, None], inner_columns[:, None, :]],
+                              states)
+        old_blue = blue[:, 1:-1, 1:-1]
+        old_red = red[:, 1:-1, 1:-1]
+        new_blue = (states == 1).view(np.uint8)
+        new_red = (states == 2).view(np.uint8)
+
+        tiles, tile_y, tile_x = np.nonzero((new_blue != old_blue) | (new_red != old_red))
+        ys = tile_ys[tiles] * self.tile_size + tile_y
+        xs = tile_xs[tiles] * self.tile_size + tile_x
+        inside = (ys < self.height) & (xs < self.width)
+        tiles, tile_y, tile_x = tiles[inside], tile_y[inside], tile_x[inside]
+        ys = ys[inside]
+        xs = xs[inside]
+        new_blue = new_blue[tiles, tile_y, tile_x]
+        new_red = new_red[tiles, tile_y, tile_x]
+        self.blue[ys, xs] = new_blue
+        self.red[ys, xs] = new_red
+
+        self.dirty = np.zeros_like(self.dirty)
+        self.dirty[ys // self.tile_size, xs // self.tile_size] = True
+
+        codes = (new_blue + 2 * new_red).tolist()
+        return {(x, y): self.colors[code] for x, y, code in zip(xs.tolist(), ys.tolist(), codes)}
+
+    # Busy boards are cheaper to step in one go, the dirty tiles then come from the changed cells
+    def full_step(self):
+        old_blue, old_red = self.blue, self.red
+        changes = super().step()
+        changed = (self.blue != old_blue) | (self.red != old_red)
+        padded = np.zeros((self.tiles_y * self.tile_size, self.tiles_x * self.tile_size), dtype=bool)
+        padded[:self.height, :self.width] = changed
+        self.dirty = padded.reshape(self.tiles_y, self.tile_size, self.tiles_x, self.tile_size).any(axis=(1, 3))
+        return changes
+
+
+chunk_size = 64
+# Offsets of the eight chunks around a chunk, in the order the halo of its window is gathered
+neighbor_offsets = ((-1, -1), (0, -1), (1, -1), (-1, 0), (1, 0), (-1, 1), (0, 1), (1, 1))
+
+
+# Unbounded plane instead of a torus. Live cells are kept in a dict of 64x64 chunks, each chunk holds one 0/1
+# array per team (shape (2, 64, 64), blue first), and only chunks with live cells are stored.
+# A step only looks at the stored chunks and the neighbours their edge cells can reach, so the cost follows
+# the live area wherever it drifts, and coordinates can grow past the starting board in every direction.
+class PlaneEngine:
+    name = "plane"
+    bounded = False  # Cells are never wrapped, width and height only size the starting board
+    colors = (None, "blue", "red")  # Indexed by blue + 2 * red
+
+    def __init__(self, width, height, rule=None):
+        if np is None:
+            raise RuntimeError("The plane engine requires NumPy to be installed.")
+        self.width = width
+        self.height = height
+        self.rule = rule or standard_rule
+        self.chunks = {}  # (chunk x, chunk y) -> uint8 array (2, chunk_size, chunk_size)
+
+    def load(self, live_cells):
+        self.chunks = {}
+        self.apply(live_cells)
+
+    # Chunks emptied by edits stay until the next step drops them
+    def apply(self, changes):
+        for (x, y), color in changes.items():
+            key = (x // chunk_size, y // chunk_size)
+            chunk = self.chunks.get(key)
+            if chunk is None:
+                if color is None:
+                    continue
+                chunk = self.chunks[key] = np.zeros((2, chunk_size, chunk_size), dtype=np.uint8)
+            cell_y, cell_x = y % chunk_size, x % chunk_size
+            chunk[0, cell_y, cell_x] = color == "blue"
+            chunk[1, cell_y, cell_x] = color == "red"
+
+    def cells(self):
+        return self.region_cells()
+
+    # Live cells with x0 <= x < x1 and y0 <= y < y1, only the chunks overlapping the region are read
+    def region_cells(self, x0=None, y0=None, x1=None, y1=None):
+        live_cells = {}
+        for (chunk_x, chunk_y), chunk in self.region_chunks(x0, y0, x1, y1):
+            origin_x, origin_y = chunk_x * chunk_size, chunk_y * chunk_size
+            codes = chunk[0] + 2 * chunk[1]
+            ys, xs = np.nonzero(codes)
+            for x, y, code in zip((xs + origin_x).tolist(), (ys + origin_y).tolist(), codes[ys, xs].tolist()):
+                if (x0 is None or x0 <= x < x1) and (y0 is None or y0 <= y < y1):
+                    live_cells[(x, y)] = self.colors[code]
+        return live_cells
+
+    # Stored chunks overlapping a region, looked up by key when the region holds fewer chunks than are stored
+    def region_chunks(self, x0=None, y0=None, x1=None, y1=None):
+        if x0 is None:
+            return list(self.chunks.items())
+        first_x, last_x = x0 // chunk_size, (x1 - 1) // chunk_size
+        first_y, last_y = y0 // chunk_size, (y1 - 1) // chunk_size
+        if (last_x - first_x + 1) * (last_y - first_y + 1) < len(self.chunks):
+            return [((chunk_x, chunk_y), self.chunks[(chunk_x, chunk_y)])
+                    for chunk_y in range(first_y, last_y + 1) for chunk_x in range(first_x, last_x + 1)
+                    if (chunk_x, chunk_y) in self.chunks]
+        return [(key, chunk) for key, chunk in self.chunks.items()
+                if first_x <= key[0] <= last_x and first_y <= key[1] <= last_y]
+
+    def snapshot(self):
+        return frozenset((key, chunk.tobytes()) for key, chunk in self.chunks.items() if chunk.any())
+
+    def restore(self, snapshot):
+        self.chunks = {
+            key: np.frombuffer(data, dtype=np.uint8).reshape(2, chunk_size, chunk_size).copy()
+            for key, data in snapshot
+        }
+
+    def population(self):
+        if not self.chunks:
+            return 0, 0
+        blue, red = np.stack(list(self.chunks.values())).sum(axis=(0, 2, 3)).tolist()
+        return blue, red
+
+    # Smallest (x0, y0, x1, y1) rectangle of chunks holding every live cell, None on an empty plane
+    def bounds(self):
+        keys = [key for key, chunk in self.chunks.items() if chunk.any()]
+        if not keys:
+            return None
+        chunk_xs = [chunk_x for chunk_x, chunk_y in keys]
+        chunk_ys = [chunk_y for chunk_x, chunk_y in keys]
+        return (min(chunk_xs) * chunk_size, min(chunk_ys) * chunk_size,
+                (max(chunk_xs) + 1) * chunk_size, (max(chunk_ys) + 1) * chunk_size)
+
+    def chunk_stats(self):
+        bounds = self.bounds()
+        return {
+            "chunks": len(self.chunks),
+            "width": bounds[2] - bounds[0] if bounds else 0,
+            "height": bounds[3] - bounds[1] if bounds else 0,
+        }
+
+    def step(self):
+        if not self.chunks:
+            return {}
+        keys = list(self.chunks)
+        index = {key: position for position, key in enumerate(keys)}
+        stack = np.concatenate([np.stack([self.chunks[key] for key in keys]),
+                                np.zeros((1, 2, chunk_size, chunk_size), dtype=np.uint8)])
+        empty = len(keys)  # Index of the all zero chunk standing in for chunks that aren't stored
+
+        # A stored chunk is always recomputed, a missing neighbour only when live cells touch the shared edge
+        occupied = stack[:-1].any(axis=1)
+        top, bottom = occupied[:, 0, :].any(axis=1), occupied[:, -1, :].any(axis=1)
+        left, right = occupied[:, :, 0].any(axis=1), occupied[:, :, -1].any(axis=1)
+        active = dict(index)
+        for position, (chunk_x, chunk_y) in enumerate(keys):
+            vertical = (-1,) * bool(top[position]) + (0,) + (1,) * bool(bottom[position])
+            horizontal = (-1,) * bool(left[position]) + (0,) + (1,) * bool(right[position])
+            for dy in vertical:
+                for dx in horizontal:
+                    active.setdefault((chunk_x + dx, chunk_y + dy), empty)
+        active_keys = list(active)
+
+        # Window of every active chunk: the chunk itself plus a one cell halo taken from the edges of its neighbours
+        centers = np.array([active[key] for key in active_keys])
+        around = np.array([[index.get((chunk_x + dx, chunk_y + dy), empty) for dx, dy in neighbor_offsets]
+                           for chunk_x, chunk_y in active_keys])
+        windows = np.zeros((len(active_keys), 2, chunk_size + 2, chunk_size + 2), dtype=np.uint8)
+        windows[:, :, 1:-1, 1:-1] = stack[centers]
+        windows[:, :, 0, 0] = stack[around[:, 0], :, -1, -1]
+        windows[:, :, 0, 1:-1] = stack[around[:, 1], :, -1, :]
+        windows[:, :, 0, -1] = stack[around[:, 2], :, -1, 0]
+        windows[:, :, 1:-1, 0] = stack[around[:, 3], :, :, -1]
+        windows[:, :, 1:-1, -1] = stack[around[:, 4], :, :, 0]
+        windows[:, :, -1, 0] = stack[around[:, 5], :, 0, -1]
+        windows[:, :, -1, 1:-1] = stack[around[:, 6], :, 0, :]
+        windows[:, :, -1, -1] = stack[around[:, 7], :, 0, 0]
+
+        states = lookup(self.rule.table, window_rule_index(windows[:, 0], windows[:, 1]))
+        origins = np.array(active_keys) * chunk_size
+        if self.rule.random_ties:  # Coins of the cells that tie, from their position on the plane
+            ties = np.nonzero(states == random_tie)
+            states = states.copy()
+            states[ties] = coins(origins[ties[0], 0] + ties[2], origins[ties[0], 1] + ties[1], self.rule.seed)
+        old = stack[centers]
+        new = np.stack([states == 1, states == 2], axis=1).view(np.uint8)
+
+        chunks, cell_y, cell_x = np.nonzero((new != old).any(axis=1))
+        xs = (origins[chunks, 0] + cell_x).tolist()
+        ys = (origins[chunks, 1] + cell_y).tolist()
+        codes = (new[chunks, 0, cell_y, cell_x] + 2 * new[chunks, 1, cell_y, cell_x]).tolist()
+
+        alive = new.reshape(len(active_keys), -1).any(axis=1).tolist()
+        self.chunks = {key: new[position] for position, key in enumerate(active_keys) if alive[position]}
+        return {(x, y): self.colors[code] for x, y, code in zip(xs, ys, codes)}
+
+
+# Bit-parallel engine, each team is one int with row y stored in bits y * width to y * width + width - 1
+class BitboardEngine:
+    name = "bitboard"
+
+    def __init__(self, width, height, rule=None):
+        self.width = width
+        self.height = height
+        self.full = (1 << (width * height)) - 1
+        row = (1 << width) - 1
+        self.first_column = self.full // row  # Bit 0 of every row
+        self.last_column = self.first_column << (width - 1)
+        self.blue = 0
+        self.red = 0
+
+        # The rule as a program: the (blue, red) neighbour counts that leave some cell alive, with the next state
+        # of an empty, a blue and a red cell for them
+        self.rule = rule or standard_rule
+        table = self.rule.table
+        self.program = []
+        for blue in range(9):
+            for red in range(9 - blue):
+                results = tuple(table[own * 81 + blue * 9 + red] for own in range(3))
+                if any(results):
+                    self.program.append((blue, red, results))
+        self.blue_values = {blue for blue, _, _ in self.program}
+        self.red_values = {red for _, red, _ in self.program}
+        self.coin_blue = 0  # Cells whose tie goes to blue
+        if self.rule.random_ties:
+            self.coin_blue = pack_bits(bytearray(coin(index % width, index // width, self.rule.seed) == 1
+                                                 for index in range(width * height)))
+
+    def load(self, live_cells):
+        blue = bytearray(self.width * self.height)
+        red = bytearray(self.width * self.height)
+        for (x, y), color in live_cells.items():
+            index = (y % self.height) * self.width + x % self.width
+            if color == "blue":
+                blue[index] = 1
+            elif color == "red":
+                red[index] = 1
+        self.blue = pack_bits(blue)
+        self.red = pack_bits(red)
+
+    def apply(self, changes):
+        for (x, y), color in changes.items():
+            bit = 1 << (y * self.width + x)
+            self.blue = self.blue | bit if color == "blue" else self.blue & ~bit
+            self.red = self.red | bit if color == "red" else self.red & ~bit
+
+    def cells(self):
+        live_cells = dict.fromkeys(self.cell_positions(self.blue), "blue")
+        live_cells.update(dict.fromkeys(self.cell_positions(self.red), "red"))
+        return live_cells
+
+    # (x, y) of every set bit of a board
+    def cell_positions(self, board):
+        width = self.width
+        return [(index % width, index // width) for index in set_bits(board)]
+
+    # The two ints are the whole board, so snapshots and their comparisons are word compares
+    def snapshot(self):
+        return self.blue, self.red
+
+    def restore(self, snapshot):
+        self.blue, self.red = snapshot
+
+    def population(self):
+        return self.blue.bit_count(), self.red.bit_count()
+
+    # Moves every cell one column, wrapping around the torus, so bit (x, y) holds the cell at (x - 1, y) or (x + 1, y)
+    def from_west(self, board):
+        return ((board << 1) & self.full & ~self.first_column) | ((board >> (self.width - 1)) & self.first_column)
+
+    def from_east(self, board):
+        return ((board >> 1) & ~self.last_column) | ((board << (self.width - 1)) & self.last_column)
+
+    # Same for rows, bit (x, y) holds the cell at (x, y - 1) or (x, y + 1)
+    def from_north(self, board):
+        return ((board << self.width) & self.full) | (board >> (self.width * (self.height - 1)))
+
+    def from_south(self, board):
+        return (board >> self.width) | ((board << (self.width * (self.height - 1))) & self.full)
+
+    # The eight neighbour planes of a board
+    def neighbor_planes(self, board):
+        west = self.from_west(board)
+        east = self.from_east(board)
+        planes = [west, east]
+        for plane in (board, west, east):
+            planes.append(self.from_north(plane))
+            planes.append(self.from_south(plane))
+        return planes
+
+    # Four bit planes of the number of neighbours of every cell on a board, lowest bit first, from full adders
+    def count_planes(self, board):
+        bit_0 = bit_1 = bit_2 = bit_3 = 0
+        for plane in self.neighbor_planes(board):
+            carry = bit_0 & plane
+            bit_0 ^= plane
+            carry_1 = bit_1 & carry
+            bit_1 ^= carry
+            bit_3 |= bit_2 & carry_1
+            bit_2 ^= carry_1
+        return bit_0, bit_1, bit_2, bit_3
+
+    # Cells whose count planes hold value
+    def equal_planes(self, planes, value):
+        plane = self.full
+        for bit, count_plane in enumerate(planes):
+            plane &= count_plane if value >> bit & 1 else ~count_plane
+        return plane
+
+    def step(self):
+        blue, red = self.blue, self.red
+        alive = blue | red
+
+        # Every (blue, red) neighbour count pair of the program selects its cells from the count planes,
+        # and the cells it leaves alive go to the state the rule table gives for their own state
+        blue_planes = self.count_planes(blue)
+        red_planes = self.count_planes(red)
+        blue_equal = {value: self.equal_planes(blue_planes, value) for value in self.blue_values}
+        red_equal = {value: self.equal_planes(red_planes, value) for value in self.red_values}
+        own_planes = (self.full & ~alive, blue, red)
+        states = [0, 0, 0, 0]  # Cells that end up empty (unused), blue, red or tied for their coin
+        for blue_count, red_count, results in self.program:
+            cells = blue_equal[blue_count] & red_equal[red_count]
+            if results[0] == results[1] == results[2]:
+                states[results[0]] |= cells
+                continue
+            for own, result in enumerate(results):
+                if result:
+                    states[result] |= cells & own_planes[own]
+        new_blue = states[1] | (states[random_tie] & self.coin_blue)
+        new_red = states[2] | (states[random_tie] & ~self.coin_blue)
+
+        # Cells that turned blue, turned red or died, each group read straight from the bits
+        changes = {}
+        for color, board in (("blue", new_blue & ~blue), ("red", new_red & ~red), (None, alive & ~(new_blue | new_red))):
+            changes.update(dict.fromkeys(self.cell_positions(board), color))
+
+        self.blue = new_blue
+        self.red = new_red
+        return changes
+
+
+# Packs a bytearray of 0/1 values into an int, element i becoming bit i
+def pack_bits(values):
+    return int(values[::-1].translate(bytes.maketrans(b"\x00\x01", b"01")) or b"0", 2)
+
+
+# Indices of the set bits of a non-negative int, lowest first
+def set_bits(value):
+    bits = bin(value)[:1:-1].encode().translate(bit_values)
+    return compress(range(len(bits)), bits)
+
+
+bit_values = bytes.maketrans(b"01", b"\x00\x01")
+
+
+engines = {
+    "dict": DictEngine,
+    "numpy": NumpyEngine,
+    "tiles": TileEngine,  # Skips settled regions, pays off once most of the board is still
+    "bitboard": BitboardEngine,
+    "hashlife": HashlifeEngine,  # Opt-in, pays off on long runs of sparse, repetitive boards
+    "plane": PlaneEngine,  # Unbounded plane instead of a torus
+    "teams": TeamEngine,  # Up to eight teams
+}
+
+if np is not None:
+    from sharded import ShardedEngine
+    engines["sharded"] = ShardedEngine  # Multi-core, for very large boards
+
+default_engine = "numpy" if np is not None else "dict"
+
+
+def available_engines():
+    return [name for name in engines if name not in ("numpy", "tiles", "plane", "teams") or np is not None]
+
+
+# Engine for a match of the given number of teams, only some engines play more than two
+def make_engine(name, width, height, rule=None, teams=2):
+    if name not in engines:
+        raise ValueError(f"Unknown engine '{name}', choose from {', '.join(engines)}.")
+    if teams == 2:
+        return engines[name](width, height, rule)
+    if teams > getattr(engines[name], "max_teams", 2):
+        raise ValueError(f"The {name} engine plays two teams, the teams engine plays up to {max_teams}.")
+    return engines[name](width, height, rule, teams)
+
+
+# Engine name to play a number of teams with, the preferred one when it can and the teams engine otherwise
+def team_engine(name, teams):
+    if teams <= getattr(engines.get(name), "max_teams", 2):
+        return name
+    return "teams" if np is not None else "dict"
+
+
+# Builds a random two team board, blue on the left half and red on the right like initialize_grid
+def random_board(width, height, density=0.5, seed=None):
+    rng = random.Random(seed)
+    half_width = width // 2
+    live_cells = {}
+    for y in range(height):
+        for x in range(width):
+            if rng.random() < density:
+                live_cells[(x, y)] = "blue" if x < half_width else "red"
+    return live_cells
+
+
+# Starting board as a (height, width) array of colour codes (0 empty, 1 blue, 2 red, see teams.team_codes). Blue
+# gets the columns left of the divider and red the rest, each side gets exactly density times the area of the
+# smaller side in cells, sampled without replacement so both teams start with the same number of cells. More
+# teams get one strip of the board each (see teams.region_dividers). Needs NumPy.
+def board_codes(width, height, density=0.5, seed=None, divider=None, teams=2):
+    rng = np.random.default_rng(seed)
+    codes = np.zeros((height, width), dtype=np.uint8)
+    regions = region_bounds(width, divider, teams)
+    count = round(density * height * min(last - first for first, last in regions))
+    for code, (first, last) in enumerate(regions, 1):
+        picks = rng.choice(height * (last - first), count, replace=False)
+        codes[picks // (last - first), first + picks % (last - first)] = code
+    return codes
+
+
+# Stamps pattern offsets with their top left corner at (x, y) into an array of colour codes, or into every board
+# of a stack of them like generate_boards returns, wrapping around the edges
+def stamp_codes(codes, offsets, x, y, code):
+    offsets = np.asarray(offsets)
+    height, width = codes.shape[-2:]
+    codes[..., (y + offsets[:, 1]) % height, (x + offsets[:, 0]) % width] = code
+
+
+# (first, last) columns of the region of each team, two teams split the board at the divider
+def region_bounds(width, divider=None, teams=2):
+    if teams == 2:
+        edges = [width // 2 if divider is None else divider]
+    else:
+        edges = region_dividers(width, teams)
+    edges = [0] + edges + [width]
+    return list(zip(edges, edges[1:]))
+
+
+# {(x, y): colour} of an array of colour codes
+def code_cells(codes):
+    ys, xs = np.nonzero(codes)
+    return {(x, y): code_colors[code] for x, y, code in zip(xs.tolist(), ys.tolist(), codes[ys, xs].tolist())}
+
+
+# Seeded, balanced starting board as {(x, y): colour}, see board_codes.
+# Without NumPy the same counts are sampled with the random module, which gives other boards for the same seed.
+def generate_board(width, height, density=0.5, seed=None, divider=None, teams=2):
+    if np is not None:
+        return code_cells(board_codes(width, height, density, seed, divider, teams))
+
+    rng = random.Random(seed)
+    regions = region_bounds(width, divider, teams)
+    count = round(density * height * min(last - first for first, last in regions))
+    live_cells = {}
+    for color, (first, last) in zip(code_colors[1:], regions):
+        for pick in rng.sample(range(height * (last - first)), count):
+            live_cells[(first + pick % (last - first), pick // (last - first))] = color
+    return live_cells
+
+
+# Many starting boards for batch experiments as one (boards, height, width) array of colour codes,
+# board i is the one generate_board builds from seeds[i]
+def generate_boards(seeds, width, height, density=0.5, divider=None):
+    seeds = list(seeds)
+    boards = np.empty((len(seeds), height, width), dtype=np.uint8)
+    for index, seed in enumerate(seeds):
+        boards[index] = board_codes(width, height, density, seed, divider)
+    return boards
+
+
+# Differential check, steps the same boards on the reference and candidate engines and compares every generation
+def compare_engines(candidate, reference="dict", width=96, height=54, generations=200, seeds=range(20), rule=None,
+                    teams=2):
+    for seed in seeds:
+        rng = random.Random(seed)
+        density = rng.choice([0.05, 0.2, 0.35, 0.5])
+        if teams == 2:
+            live_cells = random_board(width, height, density, seed)
+        else:
+            live_cells = generate_board(width, height, density, seed, teams=teams)
+
+        # Mix the colours on some boards so ties and colour flips happen everywhere
+        if seed % 2:
+            live_cells = {cell: rng.choice(match_teams(teams)) for cell in live_cells}
+
+        expected = make_engine(reference, width, height, rule, teams)
+        actual = make_engine(candidate, width, height, rule, teams)
+        expected.load(live_cells)
+        actual.load(live_cells)
+
+        for generation in range(1, generations + 1):
+            expected_changes = expected.step()
+            actual_changes = actual.step()
+            if expected_changes != actual_changes or expected.cells() != actual.cells():
+                raise AssertionError(f"{candidate} engine differs from {reference} at generation {generation} "
+                                     f"(seed {seed}, {width}x{height}, {rule or standard_rule}, {teams} teams).")
+    return True
+
+
+if __name__ == "__main__":
+    from rules import parse_rule
+
+    # The plane engine never wraps around, so it can't follow the torus of the dict engine
+    variants = [parse_rule("HighLife", "keep"), parse_rule("B3678/S034678", "random", seed=7), parse_rule("Seeds")]
+    for engine_name in available_engines():
+        if engine_name == "dict" or not getattr(engines[engine_name], "bounded", True):
+            continue
+        for size in ((96, 54), (200, 100), (10, 10), (37, 23)):
+            compare_engines(engine_name, width=size[0], height=size[1], generations=100, seeds=range(8))
+        for rule in variants:
+            if not (engine_name == "hashlife" and rule.random_ties):
+                compare_engines(engine_name, width=61, height=37, generations=60, seeds=range(4), rule=rule)
+        print(f"{engine_name} engine matches the dict engine.")
+
+    # Matches of more teams on the engines that play them
+    for engine_name in available_engines():
+        if engine_name == "dict" or getattr(engines[engine_name], "max_teams", 2) == 2:
+            continue
+        for teams in range(3, max_teams + 1):
+            compare_engines(engine_name, width=48, height=30, generations=60, seeds=range(4), teams=teams)
+            for rule in variants:
+                compare_engines(engine_name, width=41, height=23, generations=40, seeds=range(2), rule=rule, teams=teams)
+        print(f"{engine_name} engine matches the dict engine with up to {max_teams} teams.")
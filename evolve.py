@@ -0,0 +1,303 @@
+import argparse
+import hashlib
+import os
+import random
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor
+from engine import available_engines, default_engine
+from headless import setup_cells_match
+from pattern_store import canonical_hash, default_store, normalize, pack_cells
+from rules import add_rule_arguments, rule_from_arguments, standard_rule
+
+default_cache_path = "matches.db"
+scores = {"blue": 1.0, "tie": 0.5, "red": 0.0}  # Fitness of one match, seen from the blue candidate
+query_size = 500  # Keys per SELECT, SQLite limits the number of parameters of a statement
+
+
+# Same key for every match that plays out the same: both patterns moved to (0, 0) with their cells sorted, since
+# setup_cells_match places a pattern from its bounding box alone, plus the placement, the board and the rule.
+# Rotations and mirror images get other keys, a turned pattern meets its opponent differently.
+def match_key(blue_cells, red_cells, width, height, offset, seed, max_generations, rule=standard_rule):
+    blue, red = pack_cells(normalize(blue_cells)), pack_cells(normalize(red_cells))
+    settings = f"{len(blue)}:{width}x{height}:{offset}:{seed}:{max_generations}:{rule.key()}".encode()
+    return hashlib.blake2b(settings + blue + red, digest_size=16).hexdigest()
+
+
+# Outcomes of played matches in an SQLite file, so candidates seen before and restarted runs are not played again
+class MatchCache:
+    def __init__(self, path=default_cache_path):
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS matches (key TEXT PRIMARY KEY, outcome TEXT, reason TEXT, generations INTEGER)"
+        )
+        self.hits = 0
+        self.misses = 0
+
+    def close(self):
+        self.connection.close()
+
+    def __len__(self):
+        return self.connection.execute("SELECT COUNT(*) FROM matches").fetchone()[0]
+
+    # {key: (outcome, reason, generations)} of the keys already played
+    def get_many(self, keys):
+        found = {}
+        for start in range(0, len(keys), query_size):
+            chunk = keys[start:start + query_size]
+            rows = self.connection.execute(
+                f"SELECT key, outcome, reason, generations FROM matches WHERE key IN ({','.join('?' * len(chunk))})",
+                chunk)
+            found.update((key, (outcome, reason, generations)) for key, outcome, reason, generations in rows)
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        return found
+
+    # Saves (key, (outcome, reason, generations)) pairs in one transaction
+    def put_many(self, results):
+        with self.connection:
+            self.connection.executemany("INSERT OR REPLACE INTO matches VALUES (?, ?, ?, ?)",
+                                        ((key, *result) for key, result in results))
+
+
+# Plays one candidate against one opponent to completion without a display, runs in a worker process
+def play_cells(match, width=96, height=54, engine_name=default_engine, max_generations=5000, rule=None):
+    blue_cells, red_cells, offset, seed = match
+    simulation = setup_cells_match(width, height, blue_cells, red_cells, engine_name, offset, seed, rule=rule)
+    generations = simulation.run(max_generations)
+    return simulation.outcome() or "tie", simulation.stop_reason or "limit", generations
+
+
+def play_cells_with_settings(arguments):
+    match, settings = arguments
+    return play_cells(match, **settings)
+
+
+# Flips between 1 and flips cells inside the bounding box of a pattern grown by margin on every side, as long as
+# the box stays within max_size. Returns the new pattern moved to (0, 0), or None when no cell is left.
+def mutate(cells, rng, flips=3, margin=1, max_size=16):
+    cells = set(cells)
+    boxes = []
+    for axis in (0, 1):
+        low = min(cell[axis] for cell in cells)
+        high = max(cell[axis] for cell in cells)
+        grow = max(0, min(margin, (max_size - (high - low + 1)) // 2))
+        boxes.append((low - grow, high + grow))
+    (min_x, max_x), (min_y, max_y) = boxes
+    for _ in range(rng.randint(1, flips)):
+        cells ^= {(rng.randint(min_x, max_x), rng.randint(min_y, max_y))}
+    return normalize(cells) if cells else None
+
+
+# Genetic search for blue patterns that beat a set of opponents. Candidates start from the opponents themselves,
+# every generation keeps the fittest and adds mutated copies of them. The fitness of a candidate is its mean
+# score over its matches against every opponent of another shape, each opponent mirrored onto the red side for
+# every offset and seed. Matches missing from the cache are played over a process pool.
+class Evolution:
+    def __init__(self, opponents, cache, width=96, height=54, offsets=(0,), seeds=(None,), engine_name=default_engine,
+                 max_generations=5000, rule=None, population=16, children=32, flips=3, margin=1, max_size=16,
+                 workers=None, seed=0):
+        self.opponents = {name: normalize(cells) for name, cells in opponents.items()}
+        # Shape of each opponent whatever its rotation or mirror image, a candidate never plays its own shape
+        self.opponent_shapes = {name: canonical_hash(cells) for name, cells in self.opponents.items()}
+        self.cache = cache
+        self.width = width
+        self.height = height
+        self.offsets = offsets
+        self.seeds = seeds
+        self.rule = rule or standard_rule
+        self.max_generations = max_generations
+        self.settings = dict(width=width, height=height, engine_name=engine_name, max_generations=max_generations,
+                             rule=rule)
+        self.population = population
+        self.children = children
+        self.flips = flips
+        self.margin = margin
+        self.max_size = max_size
+        self.rng = random.Random(seed)
+        self.workers = workers or os.cpu_count() or 1
+        self.executor = ProcessPoolExecutor(max_workers=self.workers) if self.workers > 1 else None
+        self.fitness = {}  # tuple(cells) -> mean score of every candidate seen so far
+        self.played = 0  # Matches simulated, the rest came from the cache
+        self.generation = 0
+        self.candidates = [tuple(cells) for cells in self.opponents.values()]
+        self.evaluate(self.candidates)
+        # Best fitness among the starting patterns, a candidate that reaches it does as well as the whole library
+        self.baseline = max(self.fitness[cells] for cells in self.candidates)
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown()
+
+    def matches(self, cells):
+        shape = canonical_hash(cells)
+        return [
+            (list(cells), opponent, offset, seed)
+            for name, opponent in self.opponents.items()
+            if self.opponent_shapes[name] != shape
+            for offset in self.offsets
+            for seed in self.seeds
+        ]
+
+    def key(self, match):
+        blue_cells, red_cells, offset, seed = match
+        return match_key(blue_cells, red_cells, self.width, self.height, offset, seed, self.max_generations, self.rule)
+
+    # Works out the fitness of the candidates not scored yet, returns the matches simulated
+    def evaluate(self, candidates):
+        candidates = [cells for cells in dict.fromkeys(candidates) if cells not in self.fitness]
+        matches = {cells: self.matches(cells) for cells in candidates}
+        keys = {cells: [self.key(match) for match in matches[cells]] for cells in candidates}
+        known = self.cache.get_many(list({key for cell_keys in keys.values() for key in cell_keys}))
+
+        # Matches of different candidates can share a key, each one is played once
+        missing = {}
+        for cells in candidates:
+            for key, match in zip(keys[cells], matches[cells]):
+                if key not in known:
+                    missing.setdefault(key, match)
+        if self.executor is None:
+            results = [play_cells(match, **self.settings) for match in missing.values()]
+        else:
+            chunk_size = max(1, len(missing) // (self.workers * 8))
+            results = list(self.executor.map(play_cells_with_settings,
+                                             [(match, self.settings) for match in missing.values()],
+                                             chunksize=chunk_size))
+        played = dict(zip(missing, results))
+        self.cache.put_many(played.items())
+        known.update(played)
+        self.played += len(played)
+
+        for cells in candidates:
+            outcomes = [known[key][0] for key in keys[cells]]
+            self.fitness[cells] = sum(scores[outcome] for outcome in outcomes) / len(outcomes) if outcomes else 0.0
+        return len(played)
+
+    # Breeds one generation, returns the matches simulated for it
+    def step(self):
+        children = []
+        for _ in range(self.children * 4):  # Mutations that empty a pattern or repeat a known one are retried
+            if len(children) == self.children:
+                break
+            child = mutate(self.rng.choice(self.candidates), self.rng, self.flips, self.margin, self.max_size)
+            if child is None:
+                continue
+            width = max(x for x, y in child) + 1
+            child = tuple(child)
+            if width < self.width // 2 and child not in self.fitness and child not in children:
+                children.append(child)
+        played = self.evaluate(children)
+        ranked = sorted(set(self.candidates) | set(children), key=lambda cells: (-self.fitness[cells], len(cells)))
+        self.candidates = ranked[:self.population]
+        self.generation += 1
+        return played
+
+    # Fittest new candidates, best first, that win more than they lose and score at least as well as the best
+    # starting pattern
+    def winners(self, count):
+        opponents = {tuple(cells) for cells in self.opponents.values()}
+        threshold = max(self.baseline, scores["tie"])
+        ranked = sorted(self.fitness, key=lambda cells: (-self.fitness[cells], len(cells)))
+        return [cells for cells in ranked
+                if self.fitness[cells] >= threshold and self.fitness[cells] > scores["tie"] and cells not in opponents
+                ][:count]
+
+
+# Adds winning patterns to the store under the first free names prefix1, prefix2..., like save_pattern does.
+# Shapes the store already holds in any orientation are skipped. Returns the names given.
+def export_winners(store, winners, prefix="Evolved"):
+    names = []
+    number = 1
+    for cells in winners:
+        if store.find_shape(cells) is not None:
+            continue
+        while f"{prefix}{number}" in store:
+            number += 1
+        store.add(f"{prefix}{number}", list(cells))
+        names.append(f"{prefix}{number}")
+    return names
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Evolves blue patterns that beat the stored patterns, played "
+                                                 "against each of them mirrored onto the red side")
+    parser.add_argument("--patterns", nargs="+", default=None,
+                        help="Opponents and starting patterns, all stored patterns by default")
+    parser.add_argument("--generations", type=int, default=10, help="Generations of candidates to breed")
+    parser.add_argument("--population", type=int, default=16, help="Fittest candidates kept every generation")
+    parser.add_argument("--children", type=int, default=32, help="Mutated candidates bred every generation")
+    parser.add_argument("--flips", type=int, default=3, help="Most cells one mutation flips")
+    parser.add_argument("--margin", type=int, default=1,
+                        help="Cells around the bounding box of a pattern that a mutation may fill")
+    parser.add_argument("--max-size", type=int, default=16, help="Largest bounding box a mutation grows a pattern to")
+    parser.add_argument("--width", type=int, default=96)
+    parser.add_argument("--height", type=int, default=54)
+    parser.add_argument("--engine", choices=[name for name in available_engines() if name != "plane"],
+                        default=default_engine)
+    parser.add_argument("--offsets", type=int, nargs="+", default=[0], help="Rows the red pattern is moved down")
+    parser.add_argument("--seeds", type=int, nargs="+", default=None, help="Seeds for random placements")
+    parser.add_argument("--max-generations", type=int, default=5000, help="Generations a match is played for at most")
+    add_rule_arguments(parser)
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes, all cores by default")
+    parser.add_argument("--cache", default=default_cache_path,
+                        help="SQLite file of played matches, shared by every run with the same settings")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the mutations")
+    parser.add_argument("--export", type=int, default=3,
+                        help="Winning patterns saved to the pattern store, 0 to only print them")
+    parser.add_argument("--prefix", default="Evolved", help="Name of the exported patterns, followed by a number")
+    args = parser.parse_args(argv)
+
+    store = default_store()
+    names = args.patterns or store.names()
+    unknown = [name for name in names if name not in store]
+    if unknown:
+        parser.error(f"unknown patterns: {', '.join(unknown)}")
+    if len(names) < 2:
+        parser.error("at least two patterns are needed, each candidate plays the ones of another shape")
+    if min(args.generations, args.population, args.children, args.flips, args.max_size) < 1 or args.margin < 0:
+        parser.error("--generations, --population, --children, --flips and --max-size must be at least 1")
+    if args.max_size >= args.width // 2:
+        parser.error("--max-size must leave the pattern inside the blue half of the board")
+    if not args.prefix.isidentifier():
+        parser.error("--prefix must be a valid pattern name, letters and underscores only")
+    rule = rule_from_arguments(parser, args)
+    if rule.random_ties and args.engine == "hashlife":
+        parser.error("the hashlife engine needs a rule without random ties")
+
+    cache = MatchCache(args.cache)
+    start = time.perf_counter()
+    evolution = Evolution({name: store[name] for name in names}, cache, args.width, args.height, args.offsets,
+                          args.seeds or [None], args.engine, args.max_generations, rule, args.population,
+                          args.children, args.flips, args.margin, args.max_size, args.workers, args.seed)
+    print(f"{len(names)} starting patterns, best fitness {evolution.baseline:.3f}, {evolution.played} matches "
+          f"played, {cache.hits} from the cache")
+    try:
+        for _ in range(args.generations):
+            generation_start = time.perf_counter()
+            hits = cache.hits
+            played = evolution.step()
+            elapsed = time.perf_counter() - generation_start
+            best = evolution.candidates[0]
+            print(f"Generation {evolution.generation}: best {evolution.fitness[best]:.3f} ({len(best)} cells), "
+                  f"{played} matches played, {cache.hits - hits} from the cache, "
+                  f"{played / elapsed if elapsed > 0 else float('inf'):.1f} matches/sec")
+    finally:
+        evolution.close()
+    winners = evolution.winners(max(args.export, 1))
+    print(f"{evolution.played} matches played and {cache.hits} read from {args.cache} in "
+          f"{time.perf_counter() - start:.1f}s, {len(cache)} cached")
+    cache.close()
+
+    if not winners:
+        print("No candidate did as well as the best starting pattern.")
+        return
+    for cells in winners:
+        print(f"Fitness {evolution.fitness[cells]:.3f}, {len(cells)} cells: {list(cells)}")
+    if args.export:
+        exported = export_winners(store, winners[:args.export], args.prefix)
+        print(f"Saved to the pattern store: {', '.join(exported) or 'none, their shapes are already stored'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,1013 @@
+import customtkinter as ctk
+import tkinter as tk
+import time
+from tkinter import filedialog
+from engine import default_engine, team_engine
+from simulation import Simulation, stop_messages
+from renderer import CanvasRenderer, ViewportRenderer, cell_colors
+from pattern_store import default_store
+from profiling import Profiler
+from worker import SimulationWorker
+from recording import Recorder, Recording
+from rules import parse_rule, presets, tie_descriptions, tie_policies
+from teams import max_teams, min_teams
+
+
+# Constants
+pixel_size = 16
+simulation_width = 96
+simulation_height = 54
+max_speed_wait = 1000
+edit_batch_wait = 16  # Milliseconds between two batches of mouse edits, about one per frame
+menu_group_size = 40  # Longer pattern lists are split into submenus by first letter
+hud_interval = 10  # Generations between two refreshes of the profiling overlay
+graph_width = 200
+graph_height = 30
+graph_points = 200  # Generations shown by the population graph
+graph_interval = 5  # Generations between two refreshes of the population graph
+frame_wait = 16  # Milliseconds between two display refreshes in turbo mode
+replay_file = "last_match.cglr"  # Recording of the current match, rewritten whenever a new match starts
+zoom_step = 2  # Zoom factor of one mouse wheel notch on the unbounded plane
+pan_step = 64  # Pixels the arrow keys move the view by
+default_density = 0.5  # Share of each side that starts alive on a random board
+
+
+class GameOfLife:
+    def __init__(self, master, width, height, cell_size=pixel_size, engine_name=default_engine, profiler=None,
+                 turbo=False):
+        self.master = master
+        self.profiler = profiler or Profiler()  # Times each phase of update when enabled
+        # Board and rules live here
+        self.simulation = Simulation(width, height, engine_name=engine_name, profiler=self.profiler)
+        self.engine_name = engine_name  # Engine picked at startup, matches of more teams may need another one
+        self.recorder = None  # Opened when the first match starts, see start_recording
+        self.patterns = default_store()  # Pattern library, cells are loaded when a pattern is first placed
+        self.cell_size = cell_size
+        self.selected_pattern = "Spaceship"  # Default pattern
+        self.pattern_orientation = 0  # Quarter turns, plus 4 when mirrored, see pattern_store.transforms
+        self.current_theme = "Light"  # Track the current theme
+
+        # Create the canvas
+        self.canvas = tk.Canvas(master, width=width * cell_size, height=height * cell_size, bg="white")
+        self.canvas.pack(pady=20)
+        self.canvas.configure(width=width * cell_size, height=height * cell_size)
+        # Keeps the canvas items between frames, on the unbounded plane the canvas is a view with zoom and pan
+        renderer_class = CanvasRenderer if self.simulation.bounded else ViewportRenderer
+        self.renderer = renderer_class(self.canvas, width, height, cell_size)
+        self.hud = None
+        self.create_hud()
+        self.scheduled_at = None  # When the next update is due, to measure how late Tk calls it
+
+        # Mouse edits are collected here and applied together once per frame
+        self.pending_edits = {}
+        self.flush_job = None
+        self.last_paint_cell = None  # Last cell of the current drag
+        self.dragging_divider = False
+        self.last_pan_position = None
+
+        # Bind events to canvas
+        self.canvas.bind("<Button-1>", self.toggle_cell)
+        self.canvas.bind("<B1-Motion>", self.paint_cell)
+        self.canvas.bind("<ButtonRelease-1>", self.end_paint)
+        self.canvas.bind("<Button-3>", self.place_pattern)  # Right-click to place pattern
+        self.master.bind("<space>", lambda event: self.start_stop())  # Space bar to start/stop
+        self.master.bind("<r>", lambda event: self.rotate_pattern())
+        self.master.bind("<m>", lambda event: self.mirror_pattern())
+        if not self.simulation.bounded:
+            self.bind_view_controls()
+
+        self.running = False
+        # In turbo mode a worker thread computes the generations and the Tk loop only shows the newest board
+        self.turbo = turbo
+        self.worker = None
+        self.poll_job = None
+
+        # Adding control buttons with CustomTkinter
+        self.start_stop_button = ctk.CTkButton(master, text="Start/Stop", command=self.start_stop)
+        self.start_stop_button.pack(side=ctk.LEFT, padx=50, pady=10)
+
+        self.clear_button = ctk.CTkButton(master, text="Clear", command=self.clear_grid)
+        self.clear_button.pack(side=ctk.LEFT, padx=10, pady=10)
+
+        self.random_button = ctk.CTkButton(master, text="Randomize", command=self.randomize_grid)
+        self.random_button.pack(side=ctk.LEFT, padx=10, pady=10)
+
+        # Seed of the random board on show, the same seed and density give the same match again
+        self.density = default_density
+        self.seed_label = ctk.CTkLabel(master, text="Seed: -")
+        self.seed_label.pack(side=ctk.LEFT, padx=10, pady=10)
+
+        self.counter_frame = ctk.CTkFrame(master, width=260, height=30, fg_color="lightgray")
+        self.counter_frame.pack_propagate(False)
+        self.counter_frame.pack(side=ctk.LEFT, pady=10)
+
+        self.live_counter = ctk.CTkLabel(self.counter_frame, text="Live Count: Blue: 0, Red: 0", text_color="black")
+        self.live_counter.pack()
+
+        # Population of each team over the last generations, drawn from the simulation's time series
+        self.graph = tk.Canvas(master, width=graph_width, height=graph_height, bg="white", highlightthickness=0)
+        self.graph.pack(side=ctk.LEFT, padx=10, pady=10)
+        self.graph_lines = {}
+        self.create_graph_lines()
+
+        self.speed_scale = ctk.CTkSlider(master, from_=1, to=1000, orientation=ctk.HORIZONTAL, number_of_steps=999)
+        self.speed_scale.set(max_speed_wait)
+        self.speed_scale.pack(side=ctk.RIGHT, padx=50, pady=10)
+        self.speed_scale_label = ctk.CTkLabel(master, text="Speed")
+        self.speed_scale_label.pack(side=ctk.RIGHT, padx=10, pady=10)
+
+        # Initialize grid
+        self.initialize_grid()
+
+        # Add a menu for pattern selection and settings
+        self.menu_bar = tk.Menu(master, bg="white")  # Set initial menu bar color
+        # The pattern list is only built when the menu is first opened, so large libraries don't slow down startup
+        self.pattern_menu = tk.Menu(self.menu_bar, tearoff=0, postcommand=self.fill_pattern_menu)
+        self.pattern_menu_filled = False
+        self.menu_bar.add_cascade(label="Patterns", menu=self.pattern_menu)
+
+        # Settings menu
+        self.settings_menu = tk.Menu(self.menu_bar, tearoff=0)
+        self.settings_menu.add_command(label="Toggle Theme", command=self.toggle_theme)
+        self.settings_menu.add_command(label="Toggle Turbo Mode", command=self.toggle_turbo)
+        self.settings_menu.add_command(label="Adjust Simulation Size", command=self.open_simulation_size_popup)
+        self.settings_menu.add_command(label="Random Board...", command=self.open_random_board_popup)
+        self.settings_menu.add_command(label="Rules...", command=self.open_rules_popup)
+        self.settings_menu.add_command(label="Teams...", command=self.open_teams_popup)
+        self.menu_bar.add_cascade(label="Settings", menu=self.settings_menu)
+
+        self.save_pattern_button = ctk.CTkButton(master, text="Save Pattern", command=self.save_pattern)
+        self.save_pattern_button.pack(side=ctk.LEFT, padx=10, pady=10)
+
+        self.replay_button = ctk.CTkButton(master, text="Replay", command=self.open_replay)
+        self.replay_button.pack(side=ctk.LEFT, padx=10, pady=10)
+
+        master.configure(menu=self.menu_bar)
+
+        # Show the information screen on startup
+        self.show_info_screen()
+
+    # Mouse wheel zooms, middle drag and the arrow keys pan, Home shows every live cell
+    def bind_view_controls(self):
+        self.canvas.bind("<MouseWheel>",
+                         lambda event: self.zoom_view(event, zoom_step if event.delta > 0 else 1 / zoom_step))
+        self.canvas.bind("<Button-4>", lambda event: self.zoom_view(event, zoom_step))  # Wheel on X11
+        self.canvas.bind("<Button-5>", lambda event: self.zoom_view(event, 1 / zoom_step))
+        self.canvas.bind("<Button-2>", self.start_pan)
+        self.canvas.bind("<B2-Motion>", self.pan_view)
+        self.master.bind("<Left>", lambda event: self.renderer.pan(pan_step, 0))
+        self.master.bind("<Right>", lambda event: self.renderer.pan(-pan_step, 0))
+        self.master.bind("<Up>", lambda event: self.renderer.pan(0, pan_step))
+        self.master.bind("<Down>", lambda event: self.renderer.pan(0, -pan_step))
+        self.master.bind("<Home>", lambda event: self.renderer.fit())
+
+    def zoom_view(self, event, factor):
+        self.renderer.zoom_at(event.x, event.y, factor)
+
+    def start_pan(self, event):
+        self.last_pan_position = (event.x, event.y)
+
+    def pan_view(self, event):
+        last_x, last_y = self.last_pan_position or (event.x, event.y)
+        self.last_pan_position = (event.x, event.y)
+        self.renderer.pan(event.x - last_x, event.y - last_y)
+
+    @property
+    def width(self):
+        return self.simulation.width
+
+    @property
+    def height(self):
+        return self.simulation.height
+
+    # Function to open a pop-up with sliders to adjust simulation width and height
+    def open_simulation_size_popup(self):
+        size_popup = tk.Toplevel(self.master)
+        size_popup.title("Adjust Simulation Size")
+        size_popup.geometry("300x400")
+
+        # Label for simulation width
+        width_label = ctk.CTkLabel(size_popup, text="Simulation Width:")
+        width_label.pack(pady=10)
+
+        # Label to display the current width value
+        width_value_label = ctk.CTkLabel(size_popup, text=f"{self.width}")
+        width_value_label.pack(pady=5)
+
+        # Slider for simulation width
+        width_slider = ctk.CTkSlider(size_popup, from_=10, to=200, number_of_steps=190)
+        width_slider.set(self.width)  # Set current width as the default value
+        width_slider.pack(pady=10)
+
+        # Label for simulation height
+        height_label = ctk.CTkLabel(size_popup, text="Simulation Height:")
+        height_label.pack(pady=10)
+
+        # Label to display the current height value
+        height_value_label = ctk.CTkLabel(size_popup, text=f"{self.height}")
+        height_value_label.pack(pady=5)
+
+        # Slider for simulation height
+        height_slider = ctk.CTkSlider(size_popup, from_=10, to=100, number_of_steps=90)
+        height_slider.set(self.height)  # Set current height as the default value
+        height_slider.pack(pady=10)
+
+        # Function to update the label with the current slider value for width
+        def update_width_value(value):
+            width_value_label.configure(text=f"{int(value)}")
+
+        # Function to update the label with the current slider value for height
+        def update_height_value(value):
+            height_value_label.configure(text=f"{int(value)}")
+
+        # Bind the sliders to update the labels when moved
+        width_slider.configure(command=update_width_value)
+        height_slider.configure(command=update_height_value)
+
+        # Function to update simulation size
+        def update_simulation_size():
+            new_width = int(width_slider.get())
+            new_height = int(height_slider.get())
+            self.running = False
+            self.stop_worker()
+
+            self.simulation.resize(new_width, new_height)
+
+            # Recreate the canvas with new dimensions
+            self.canvas.configure(width=self.width * self.cell_size, height=self.height * self.cell_size)
+            self.renderer.rebuild(self.width, self.height)
+            self.renderer.set_regions(self.simulation.dividers)
+            self.create_hud()  # The overlay goes back on top of the rebuilt board
+            self.initialize_grid()  # Reinitialize the grid with new dimensions
+            size_popup.destroy()
+
+        # Button to apply the changes
+        apply_button = ctk.CTkButton(size_popup, text="Apply", command=update_simulation_size)
+        apply_button.pack(pady=20)
+
+        size_popup.focus_set()
+        size_popup.grab_set()
+
+    # Pop-up to replay a random board from its seed or to change how full random boards start
+    def open_random_board_popup(self):
+        board_popup = tk.Toplevel(self.master)
+        board_popup.title("Random Board")
+        board_popup.geometry("300x300")
+
+        seed_label = ctk.CTkLabel(board_popup, text="Seed (empty for a new one):")
+        seed_label.pack(pady=10)
+        seed_entry = ctk.CTkEntry(board_popup)
+        if self.simulation.seed is not None:
+            seed_entry.insert(0, str(self.simulation.seed))
+        seed_entry.pack(pady=5)
+
+        density_label = ctk.CTkLabel(board_popup, text=f"Density: {self.density:.0%}")
+        density_label.pack(pady=10)
+        density_slider = ctk.CTkSlider(board_popup, from_=0.05, to=0.95, number_of_steps=18,
+                                       command=lambda value: density_label.configure(text=f"Density: {value:.0%}"))
+        density_slider.set(self.density)
+        density_slider.pack(pady=10)
+
+        def apply_random_board():
+            seed = seed_entry.get().strip()
+            if seed and not seed.isdigit():
+                self.show_error_popup("Invalid seed", "The seed must be a whole number.")
+                return
+            self.density = round(density_slider.get(), 2)
+            board_popup.destroy()
+            self.initialize_grid(int(seed) if seed else None)
+
+        apply_button = ctk.CTkButton(board_popup, text="Apply", command=apply_random_board)
+        apply_button.pack(pady=20)
+
+        board_popup.focus_set()
+        board_popup.grab_set()
+
+    # Pop-up to play on under other birth and survival counts, picked from the presets or typed in B/S notation
+    def open_rules_popup(self):
+        rule = self.simulation.rule
+        rules_popup = tk.Toplevel(self.master)
+        rules_popup.title("Rules")
+        rules_popup.geometry("320x420")
+
+        rule_label = ctk.CTkLabel(rules_popup, text="Rule (B/S notation):")
+        rule_label.pack(pady=10)
+        rule_entry = ctk.CTkEntry(rules_popup)
+        rule_entry.insert(0, rule.notation)
+        rule_entry.pack(pady=5)
+
+        # Picking a preset fills in its notation
+        def select_preset(name):
+            rule_entry.delete(0, "end")
+            rule_entry.insert(0, presets[name])
+
+        preset_menu = ctk.CTkOptionMenu(rules_popup, values=list(presets), command=select_preset)
+        preset_menu.set(next((name for name, value in presets.items() if value == rule.notation), "Presets"))
+        preset_menu.pack(pady=5)
+
+        tie_label = ctk.CTkLabel(rules_popup, text="Ties (several teams with the most neighbours):")
+        tie_label.pack(pady=10)
+        tie_description = ctk.CTkLabel(rules_popup, text=tie_descriptions[rule.tie], wraplength=280)
+        tie_menu = ctk.CTkOptionMenu(rules_popup, values=list(tie_policies),
+                                     command=lambda tie: tie_description.configure(text=tie_descriptions[tie]))
+        tie_menu.set(rule.tie)
+        tie_menu.pack(pady=5)
+        tie_description.pack(pady=5)
+
+        seed_label = ctk.CTkLabel(rules_popup, text="Seed of random ties:")
+        seed_label.pack(pady=10)
+        seed_entry = ctk.CTkEntry(rules_popup)
+        seed_entry.insert(0, str(rule.seed))
+        seed_entry.pack(pady=5)
+
+        def apply_rule():
+            seed = seed_entry.get().strip()
+            if not seed.isdigit():
+                self.show_error_popup("Invalid seed", "The seed must be a whole number.")
+                return
+            try:
+                new_rule = parse_rule(rule_entry.get(), tie_menu.get(), int(seed))
+            except ValueError as error:
+                self.show_error_popup("Invalid rule", str(error))
+                return
+            self.running = False
+            self.stop_worker()  # The worker must not step the board while the engine is replaced
+            self.flush_edits()
+            try:
+                self.simulation.set_rule(new_rule)
+            except ValueError as error:  # Hashlife can't settle ties at random
+                self.show_error_popup("Unsupported rule", str(error))
+                return
+            print(f"Rule: {new_rule}")
+            rules_popup.destroy()
+            self.update_live_counter()
+
+        apply_button = ctk.CTkButton(rules_popup, text="Apply", command=apply_rule)
+        apply_button.pack(pady=20)
+
+        rules_popup.focus_set()
+        rules_popup.grab_set()
+
+    # Pop-up to play with more teams, every team starts in a strip of the board of the same width
+    def open_teams_popup(self):
+        teams_popup = tk.Toplevel(self.master)
+        teams_popup.title("Teams")
+        teams_popup.geometry("300x220")
+
+        count_label = ctk.CTkLabel(teams_popup, text=f"Teams: {len(self.simulation.teams)}")
+        count_label.pack(pady=10)
+        count_slider = ctk.CTkSlider(teams_popup, from_=min_teams, to=max_teams, number_of_steps=max_teams - min_teams,
+                                     command=lambda value: count_label.configure(text=f"Teams: {int(value)}"))
+        count_slider.set(len(self.simulation.teams))
+        count_slider.pack(pady=10)
+        note_label = ctk.CTkLabel(teams_popup, text="Matches of more than two teams are not recorded.")
+        note_label.pack(pady=5)
+
+        def apply_teams():
+            count = int(count_slider.get())
+            if count != 2 and not self.simulation.bounded:  # The view of the plane only knows blue and red
+                self.show_error_popup("Unsupported teams", "The unbounded plane is played by two teams.")
+                return
+            self.running = False
+            self.stop_worker()  # The worker must not step the board while the engine is replaced
+            self.pending_edits = {}
+            if count != 2 and self.recorder is not None:
+                self.simulation.record(None)
+                self.recorder.close()
+                self.recorder = None
+            # A two-team match is recorded again from the next start
+            self.simulation.set_teams(count, team_engine(self.engine_name, count))
+            print(f"Teams: {', '.join(team.capitalize() for team in self.simulation.teams)}")
+            teams_popup.destroy()
+            self.renderer.set_regions(self.simulation.dividers)
+            self.create_graph_lines()
+            self.initialize_grid()
+
+        apply_button = ctk.CTkButton(teams_popup, text="Apply", command=apply_teams)
+        apply_button.pack(pady=20)
+
+        teams_popup.focus_set()
+        teams_popup.grab_set()
+
+    # Saves the 'blue' side of the grid as a pattern
+    def save_pattern(self):
+        self.running = False
+        self.stop_worker()  # The worker must not change the board while it is read
+
+        # Get the live cells in relative positions
+        pattern_name = self.prompt_for_pattern_name()
+        if not pattern_name:
+            return  # User canceled the action
+
+        relative_pattern = []
+        for (x, y), color in self.simulation.live_cells.items():
+            if color == "blue":  # Only saving blue cells
+                relative_pattern.append((x, y))
+
+        # Normalize the pattern to start from (0, 0)
+        if relative_pattern:
+            min_x = min(x for x, y in relative_pattern)
+            min_y = min(y for x, y in relative_pattern)
+            normalized_pattern = [(x - min_x, y - min_y) for x, y in relative_pattern]
+        else:
+            normalized_pattern = []
+
+        # Try to add the new pattern to the pattern store
+        pattern_saved = self.add_pattern_to_store(pattern_name, normalized_pattern)
+
+        # Only update the patterns menu if the pattern was successfully saved
+        if pattern_saved:
+            self.pattern_menu_filled = False  # Rebuilt with the new pattern the next time it opens
+        else:
+            print(f"Pattern '{pattern_name}' was not added to the menu due to an error.")
+
+    # Prompt user for pattern name
+    def prompt_for_pattern_name(self):
+        pattern_name_popup = tk.Toplevel(self.master)
+        pattern_name_popup.title("Save Pattern")
+        pattern_name_popup.geometry("300x225")
+
+        label = ctk.CTkLabel(pattern_name_popup, text="Enter pattern name:")
+        label.pack(pady=10)
+        entry = ctk.CTkEntry(pattern_name_popup)
+        entry.pack(pady=10)
+        pattern_name = tk.StringVar()
+
+        def on_submit():
+            name = entry.get().strip()
+            if len(name) > 15:  # Check if the pattern name exceeds 15 characters
+                self.show_error_popup("Name too long", "Pattern names must not exceed 15 characters.")
+            else:
+                pattern_name.set(name)
+                pattern_name_popup.destroy()
+
+        submit_button = ctk.CTkButton(pattern_name_popup, text="Submit", command=on_submit)
+        submit_button.pack(pady=10)
+
+        pattern_name_popup.wait_window()  # Wait for the window to close
+
+        return pattern_name.get().strip()
+
+    # Function to add the pattern to the pattern store
+    def add_pattern_to_store(self, pattern_name, pattern_data):
+        if not pattern_name.isidentifier():  # Ensure the pattern name is valid
+            print("Pattern name is invalid, stopping.")
+            self.show_error_popup("Invalid pattern name", "Pattern names must not contain special characters, numbers or spaces.")
+            return False
+
+        # The store refuses empty patterns, taken names and shapes it already holds in any orientation
+        try:
+            self.patterns.add(pattern_name, pattern_data)
+        except ValueError as error:
+            print(f"{error} Stopping.")
+            self.show_error_popup("Pattern not saved", str(error))
+            return False
+
+        print(f"Pattern '{pattern_name}' saved to the pattern store.")
+        return True
+
+    # Imports RLE and Life 1.06 files into the pattern store
+    def import_patterns(self):
+        paths = filedialog.askopenfilenames(
+            parent=self.master, title="Import Patterns",
+            filetypes=[("Pattern files", "*.rle *.lif *.life"), ("All files", "*")],
+        )
+        if not paths:
+            return  # User canceled the action
+
+        try:
+            added = self.patterns.import_files(paths)
+        except (OSError, UnicodeDecodeError, ValueError) as error:
+            self.show_error_popup("Import failed", str(error))
+            return
+        print(f"Imported {added} new patterns from {len(paths)} files.")
+        self.pattern_menu_filled = False
+
+    # Lists the stored patterns in the Patterns menu, grouped by first letter when there are many
+    def fill_pattern_menu(self):
+        if self.pattern_menu_filled:
+            return
+        self.pattern_menu_filled = True
+        self.pattern_menu.delete(0, "end")
+        self.pattern_menu.add_command(label="Import Patterns...", command=self.import_patterns)
+        self.pattern_menu.add_separator()
+
+        names = self.patterns.names()
+        if len(names) <= menu_group_size:
+            for pattern_name in names:
+                self.pattern_menu.add_command(label=pattern_name, command=lambda p=pattern_name: self.select_pattern(p))
+            return
+
+        groups = {}
+        for pattern_name in sorted(names, key=str.lower):
+            groups.setdefault(pattern_name[:1].upper(), []).append(pattern_name)
+        for letter, group in groups.items():
+            submenu = tk.Menu(self.pattern_menu, tearoff=0)
+            submenu.configure(postcommand=lambda m=submenu, g=group: self.fill_pattern_submenu(m, g))
+            self.pattern_menu.add_cascade(label=f"{letter} ({len(group)})", menu=submenu)
+
+    # Submenus are filled when they are first opened too
+    def fill_pattern_submenu(self, submenu, pattern_names):
+        if submenu.index("end") is not None:
+            return
+        for pattern_name in pattern_names:
+            submenu.add_command(label=pattern_name, command=lambda p=pattern_name: self.select_pattern(p))
+
+    # Function to show an error pop-up window
+    def show_error_popup(self, title, message):
+        error_popup = tk.Toplevel(self.master)
+        error_popup.title(title)
+        error_popup.geometry("350x150")
+
+        label = ctk.CTkLabel(error_popup, text=message, wraplength=250)
+        label.pack(pady=20)
+
+        close_button = ctk.CTkButton(error_popup, text="OK", command=error_popup.destroy)
+        close_button.pack(pady=10)
+
+        # Ensure the user interacts with this window first
+        error_popup.lift(self.master)
+        error_popup.focus_set()
+        error_popup.grab_set()
+
+    # Toggle theme between Light and Dark
+    def toggle_theme(self):
+        if self.current_theme == "Light":
+            ctk.set_appearance_mode("Dark")
+            self.current_theme = "Dark"
+            self.canvas.configure(bg="lightgray")  # Set the grid background to gray
+            self.menu_bar.configure(bg="black", fg="black")  # Set the menu background to black
+            self.counter_frame.configure(fg_color="black")  # Set the counter frame background to black
+            self.live_counter.configure(text_color="white")  # Set the text color to white
+            self.graph.configure(bg="lightgray")
+        else:
+            ctk.set_appearance_mode("Light")
+            self.current_theme = "Light"
+            self.canvas.configure(bg="white")  # Set the grid background to white
+            self.menu_bar.configure(bg="white", fg="black")  # Set the menu background to white
+            self.counter_frame.configure(fg_color="lightgray")  # Set the counter frame background to white
+            self.live_counter.configure(text_color="black")  # Set the text color to black
+            self.graph.configure(bg="white")
+
+        self.renderer.set_theme(self.current_theme)  # Recolours the existing items
+        for team, line in self.graph_lines.items():
+            self.graph.itemconfigure(line, fill=cell_colors[self.current_theme][team])
+
+    def show_info_screen(self):
+        info_screen = tk.Toplevel(self.master)
+        info_screen.title("Welcome to Competitive Game of Life")
+        info_screen.geometry("530x610")
+        info_screen.resizable(False, False)
+
+        # Center the info screen
+        screen_width = self.master.winfo_screenwidth()
+        screen_height = self.master.winfo_screenheight()
+        x_coordinate = int((screen_width / 2) - (450 / 2))
+        y_coordinate = int((screen_height / 2) - (350 / 2))
+        info_screen.geometry(f"+{x_coordinate}+{y_coordinate}")
+
+        instructions = """
+Welcome to the Competitive Game of Life!
+
+How to play:
+- Left-click: Toggle a cell's state.
+- Drag left-click: Paint cells.
+- Right-click: Place a selected pattern.
+- R / M: Rotate / mirror the selected pattern.
+- Drag the black middle line: Move the border between the teams.
+- Settings > Teams: Play with up to 8 teams, each starting in its own strip.
+- Space bar: Start/Stop the simulation.
+- On the unbounded plane (--engine plane): mouse wheel to zoom,
+  middle-drag or arrow keys to pan, Home to show every cell.
+
+How to create a custom pattern:
+- Draw anything on the BLUE side of the simulation.
+- Select 'Save Pattern'.
+- Assign it a name.
+
+Objective:
+- Compete to dominate the board with your color.
+- The game ends when a stable state is reached or an infinite loop is detected.
+
+Good luck!
+        """
+
+        label = ctk.CTkLabel(info_screen, text=instructions, text_color="black", wraplength=420)
+        label.pack(expand=True, padx=20, pady=20)
+
+        close_button = ctk.CTkButton(info_screen, text="Start", command=info_screen.destroy)
+        close_button.pack(pady=10)
+
+        info_screen.lift(self.master)  # Bring the info screen to the front
+        info_screen.focus_set()  # Ensure the info screen receives focus
+        info_screen.grab_set()  # Ensure the user interacts with this window first
+
+    def initialize_grid(self, seed=None):
+        self.running = False
+        self.stop_worker()
+        self.pending_edits = {}
+        self.simulation.randomize(seed, self.density)
+        self.seed_label.configure(text=f"Seed: {self.simulation.seed}")
+        self.draw_grid()
+        self.update_live_counter()
+
+    def draw_grid(self):
+        self.renderer.show_divider(not self.running)  # Draw the middle line when the simulation is not running
+        self.renderer.draw(self.simulation.live_cells)
+
+    def update(self):  # Updates the grid according the Game of Life rules
+        profiler = self.profiler
+        if self.scheduled_at is not None:
+            profiler.record("schedule", max(0.0, time.perf_counter() - self.scheduled_at))  # Tk callback lateness
+            self.scheduled_at = None
+
+        with profiler.span("edits"):
+            self.flush_edits()  # Edits made since the last frame go in before the step
+        changes = self.simulation.step()
+        if changes is not None:  # The board is left as it is when a loop or a stable state is found
+            with profiler.span("render"):
+                self.renderer.show_divider(not self.running)
+                self.renderer.apply(changes)  # Only the cells that changed are redrawn
+            with profiler.span("counter"):
+                self.update_live_counter()
+            if profiler.enabled:
+                profiler.end_generation(self.simulation.generation_count)
+                self.update_hud()
+
+        if self.simulation.finished:
+            self.running = False
+            print(stop_messages[self.simulation.stop_reason], self.simulation.stop_details())
+            self.display_winner()
+            return
+
+        inverted_speed = int(max_speed_wait + 1 - self.speed_scale.get())  # Inverts the speed slider
+
+        if self.running:
+            if profiler.enabled:
+                self.scheduled_at = time.perf_counter() + inverted_speed / 1000
+            self.master.after(inverted_speed, self.update)
+
+    # Performance overlay in the top left corner of the canvas, only when profiling
+    def create_hud(self):
+        if not self.profiler.enabled:
+            return
+        self.canvas.delete("hud")  # The plane's view keeps other items over a rebuild, the old overlay among them
+        self.hud = self.canvas.create_text(6, 6, anchor="nw", text=self.profiler.hud_text(), fill="black",
+                                           font=("Courier", 10), tags="hud")
+
+    def update_hud(self):
+        if self.simulation.generation_count % hud_interval == 0:
+            self.canvas.itemconfigure(self.hud, text=self.profiler.hud_text())
+            self.canvas.tag_raise(self.hud)
+
+    def update_live_counter(self):
+        self.live_counter.configure(text=f"Live Count: {self.count_text()}")
+        if self.simulation.generation_count % graph_interval == 0:
+            self.update_graph()
+
+    # Cells of every team, e.g. "Blue: 120, Red: 98"
+    def count_text(self):
+        simulation = self.simulation
+        return ", ".join(f"{team.capitalize()}: {count}" for team, count in zip(simulation.teams, simulation.counts()))
+
+    # One line per team of the match in the population graph
+    def create_graph_lines(self):
+        for line in self.graph_lines.values():
+            self.graph.delete(line)
+        self.graph_lines = {
+            team: self.graph.create_line(0, 0, 0, 0, fill=cell_colors[self.current_theme][team], width=2)
+            for team in self.simulation.teams
+        }
+
+    # Redraws the population graph from the last generations of the time series, scaled to the highest count
+    def update_graph(self):
+        series = self.simulation.series
+        values = {team: series.column(team, graph_points) for team in self.graph_lines}
+        top = max([1] + [max(counts) for counts in values.values() if counts])
+        x_step = graph_width / (graph_points - 1)
+        for team, line in self.graph_lines.items():
+            if len(values[team]) < 2:
+                self.graph.coords(line, 0, 0, 0, 0)
+                continue
+            coords = []
+            for index, value in enumerate(values[team]):
+                coords.append(index * x_step)
+                coords.append(graph_height - 2 - value * (graph_height - 4) / top)
+            self.graph.coords(line, *coords)
+
+    # Displays the winner in console and calls the splash screen if conditions are met
+    def display_winner(self):
+        winner = self.simulation.winner()
+        if winner is None:
+            return
+
+        print(f"{self.count_text()}. {winner}")
+
+        # Say how the match ended, e.g. "Period-2 loop reached at gen 412", and how the populations went
+        details = self.simulation.stop_details()
+        if details:
+            winner = f"{winner}\n{details}"
+        trend = self.simulation.series.trend_lines()
+        if trend:
+            winner = "\n".join([winner, ""] + trend)
+        self.show_winner_splash(winner)
+
+    # Shows the splash screen with the winner announcement
+    def show_winner_splash(self, winner_message):
+        splash = tk.Toplevel(self.master)
+        splash.title("Winner Announcement")
+        splash.geometry("360x280")
+        splash.resizable(False, False)
+
+        # Center the splash screen
+        screen_width = self.master.winfo_screenwidth()
+        screen_height = self.master.winfo_screenheight()
+        x_coordinate = int((screen_width / 2) - (360 / 2))
+        y_coordinate = int((screen_height / 2) - (280 / 2))
+        splash.geometry(f"+{x_coordinate}+{y_coordinate}")
+
+        message = ctk.CTkLabel(splash, text=winner_message, text_color="black")
+        message.pack(expand=True)
+
+        # Modified 'OK' button to show the info screen after closing the splash
+        ok_button = ctk.CTkButton(splash, text="OK", command=lambda: [splash.destroy(), self.show_info_screen()])
+        ok_button.pack(pady=10)
+
+        replay_button = ctk.CTkButton(splash, text="Replay", command=lambda: [splash.destroy(), self.open_replay()])
+        replay_button.pack(pady=(0, 10))
+
+        splash.grab_set()  # Ensure the user interacts with this window first
+
+    # Replay window with a timeline slider, shows any recorded generation of the current match on the board
+    def open_replay(self):
+        if self.recorder is None:
+            if self.recordable():
+                self.show_error_popup("No replay", "No match has been played yet.")
+            else:
+                self.show_error_popup("No replay", "Matches on the unbounded plane or of more than two teams are "
+                                                   "not recorded.")
+            return
+        self.running = False
+        self.stop_worker()
+        self.flush_edits()
+        self.recorder.flush()
+        recording = Recording(replay_file)
+
+        replay = tk.Toplevel(self.master)
+        replay.title("Replay")
+        replay.geometry("420x160")
+
+        label = ctk.CTkLabel(replay, text="")
+        label.pack(pady=10)
+
+        def show_generation(value):
+            generation = int(value)
+            board = recording.board_at(generation)
+            self.renderer.draw(board)
+            blue_count = sum(1 for color in board.values() if color == "blue")
+            label.configure(text=f"Gen {generation} of {recording.generations}: "
+                                 f"Blue: {blue_count}, Red: {len(board) - blue_count}")
+
+        # Back to the live board when the replay closes
+        def close_replay():
+            recording.close()
+            self.renderer.draw(self.simulation.live_cells)
+            replay.destroy()
+
+        steps = max(1, recording.generations)
+        slider = ctk.CTkSlider(replay, from_=0, to=steps, number_of_steps=steps, command=show_generation, width=380)
+        slider.set(recording.generations)
+        slider.pack(pady=10)
+        show_generation(recording.generations)
+
+        close_button = ctk.CTkButton(replay, text="Close", command=close_replay)
+        close_button.pack(pady=10)
+        replay.protocol("WM_DELETE_WINDOW", close_replay)
+        replay.grab_set()  # The board can't be edited while it shows an old generation
+
+    def start_stop(self):
+        self.running = not self.running
+        if self.running:
+            self.start_recording()
+        if self.running and self.turbo:
+            self.start_worker()
+        elif self.running:
+            self.update()
+        else:
+            self.stop_worker()
+
+    # Recordings index cells on the fixed board and know two teams
+    def recordable(self):
+        return self.simulation.bounded and len(self.simulation.teams) == 2
+
+    # Every generation goes to the replay file from the first match played on, so opening the window writes nothing
+    def start_recording(self):
+        if self.recorder is None and self.recordable():
+            self.recorder = Recorder(replay_file, self.width, self.height)
+            self.simulation.record(self.recorder)
+
+    def toggle_turbo(self):
+        self.turbo = not self.turbo
+        print(f"Turbo mode {'on' if self.turbo else 'off'}.")
+        if self.running:  # Carry on in the other mode
+            self.start_stop()
+            self.start_stop()
+
+    def start_worker(self):
+        self.flush_edits()
+        self.renderer.show_divider(False)
+        self.worker = SimulationWorker(self.simulation, frame_wait / 1000)
+        self.worker.delay = self.worker_delay()
+        self.worker.start()
+        self.poll_job = self.master.after(frame_wait, self.poll_worker)
+
+    # Waits for the worker to end and shows the last board it computed
+    def stop_worker(self):
+        if self.worker is None:
+            return
+        self.worker.stop()
+        if self.poll_job is not None:
+            self.master.after_cancel(self.poll_job)
+            self.poll_job = None
+        self.show_worker_changes()
+        self.worker = None
+        self.renderer.show_divider(True)
+
+    # The speed slider paces the worker, at the top of the slider it runs flat out
+    def worker_delay(self):
+        return (max_speed_wait - self.speed_scale.get()) / 1000
+
+    def show_worker_changes(self):
+        changes = self.worker.collect()
+        if changes:
+            with self.profiler.span("render"):
+                self.renderer.apply(changes)
+            self.update_live_counter()
+            if self.profiler.enabled:
+                self.update_hud()
+
+    # Display refresh in turbo mode, runs once per frame while the worker is busy
+    def poll_worker(self):
+        self.poll_job = None
+        self.worker.delay = self.worker_delay()
+        self.show_worker_changes()
+        if self.worker.alive():
+            self.poll_job = self.master.after(frame_wait, self.poll_worker)
+            return
+
+        # The worker ended on its own, the match is over
+        self.show_worker_changes()
+        self.worker = None
+        self.running = False
+        self.renderer.show_divider(True)
+        if self.simulation.finished:
+            print(stop_messages[self.simulation.stop_reason], self.simulation.stop_details())
+            self.display_winner()
+
+    def clear_grid(self):  # Clears the grid, when the button is pressed
+        self.running = False
+        self.stop_worker()
+        self.pending_edits = {}
+        self.simulation.clear()
+        self.seed_label.configure(text="Seed: -")
+        self.draw_grid()
+        self.update_live_counter()
+
+    def randomize_grid(self):  # Randomises the grid, when the button is pressed
+        self.initialize_grid()
+
+    # Converts the mouse position of an event to a cell
+    def event_cell(self, event):
+        return self.renderer.cell_at(event.x, event.y)
+
+    def on_board(self, x, y):
+        return not self.simulation.bounded or (0 <= x < self.width and 0 <= y < self.height)
+
+    # Adds edits to the pending batch and makes sure the batch is applied on the next frame
+    def queue_edits(self, edits):
+        self.pending_edits.update(edits)
+        if self.flush_job is None:
+            self.flush_job = self.master.after(edit_batch_wait, self.flush_edits)
+
+    # Applies all pending edits at once with a single incremental redraw and count
+    def flush_edits(self):
+        if self.flush_job is not None:
+            self.master.after_cancel(self.flush_job)
+            self.flush_job = None
+        if not self.pending_edits:
+            return
+        if self.worker is not None:  # The worker owns the board, its next frame shows the edits
+            self.worker.submit_edits(self.pending_edits)
+            self.pending_edits = {}
+            return
+
+        changes = self.simulation.apply_edits(self.pending_edits)
+        self.pending_edits = {}
+        self.renderer.show_divider(not self.running)
+        self.renderer.apply(changes)
+        self.update_live_counter()
+
+    def toggle_cell(self, event):  # Changes the state of a pixel on a click
+        if not self.running and self.renderer.near_divider(event.x):
+            self.dragging_divider = True  # Dragging the middle line moves the border between the teams
+            return
+        x, y = self.event_cell(event)
+        self.last_paint_cell = (x, y)
+        if not self.on_board(x, y):
+            return
+
+        # Toggle against the pending state so quick repeated clicks behave like before
+        if (x, y) in self.pending_edits:
+            color = self.pending_edits[(x, y)]
+        else:
+            color = self.simulation.live_cells.get((x, y))
+        self.queue_edits({(x, y): None if color else self.simulation.team_at(x)})
+
+    def paint_cell(self, event):  # Changes the states of pixels when the mouse is held and moving
+        x, y = self.event_cell(event)
+        if self.dragging_divider:
+            self.move_divider(x)
+            return
+        start = self.last_paint_cell or (x, y)
+        self.last_paint_cell = (x, y)
+
+        # Fill in the cells between two motion events so fast strokes leave no gaps
+        self.queue_edits({
+            (cx, cy): self.simulation.team_at(cx)
+            for cx, cy in line_cells(start, (x, y)) if self.on_board(cx, cy)
+        })
+
+    def end_paint(self, event):
+        self.last_paint_cell = None
+        self.dragging_divider = False
+
+    def move_divider(self, x):
+        if self.simulation.bounded:
+            x = min(max(1, x), self.width - 1)  # Both teams keep at least one column
+        self.simulation.set_divider(x)
+        self.renderer.move_divider(x)
+
+    # Stamps the selected pattern from its compiled orientations, the red side gets the mirror image
+    def place_pattern(self, event):
+        x, y = self.event_cell(event)
+        team = self.simulation.team_at(x)
+        offsets = self.patterns.offsets(self.selected_pattern, self.pattern_orientation, team)
+        self.queue_edits(self.simulation.stamp_cells(offsets, x, y, team))
+
+    def select_pattern(self, pattern_name):
+        self.selected_pattern = pattern_name
+
+    # Turns the selected pattern a quarter clockwise on screen, a mirrored one too
+    def rotate_pattern(self):
+        turns, mirrored = self.pattern_orientation & 3, self.pattern_orientation & 4
+        self.pattern_orientation = mirrored | ((turns - 1 if mirrored else turns + 1) & 3)
+        self.print_orientation()
+
+    def mirror_pattern(self):
+        self.pattern_orientation ^= 4
+        self.print_orientation()
+
+    def print_orientation(self):
+        turns, mirrored = self.pattern_orientation & 3, self.pattern_orientation & 4
+        print(f"{self.selected_pattern}: turned {turns * 90} degrees{', mirrored' if mirrored else ''}.")
+
+
+# Cells on the straight line between two cells, both ends included (Bresenham)
+def line_cells(start, end):
+    x0, y0 = start
+    x1, y1 = end
+    dx, dy = abs(x1 - x0), -abs(y1 - y0)
+    step_x = 1 if x0 < x1 else -1
+    step_y = 1 if y0 < y1 else -1
+    error = dx + dy
+
+    cells = [(x0, y0)]
+    while (x0, y0) != (x1, y1):
+        double_error = 2 * error
+        if double_error >= dy:
+            error += dy
+            x0 += step_x
+        if double_error <= dx:
+            error += dx
+            y0 += step_y
+        cells.append((x0, y0))
+    return cells
+
+
+# Opens the window and runs the Tk main loop until it is closed
+def run(engine_name=default_engine, turbo=False, profiler=None):
+    profiler = profiler or Profiler()
+    ctk.set_appearance_mode("Light")  # Modes: "System" (default), "Dark", "Light"
+    ctk.set_default_color_theme("blue")  # Themes: "blue" (default), "green", "dark-blue"
+
+    root = ctk.CTk()
+    root.title("Competitive Game of Life")
+
+    # Option to toggle fullscreen mode using F11
+    root.bind("<F11>", lambda event: root.attributes("-fullscreen", not root.attributes("-fullscreen")))
+
+    root.after(0, lambda: root.state('zoomed'))
+
+    GameOfLife(root, width=simulation_width, height=simulation_height, engine_name=engine_name, profiler=profiler,
+               turbo=turbo)
+    root.mainloop()
@@ -0,0 +1,257 @@
+from rules import standard_rule
+
+states = {None: 0, "blue": 1, "red": 2}
+colors = (None, "blue", "red")
+
+
+# Quadtree node, leaves (level 0) are the plain ints 0 empty, 1 blue and 2 red
+class Node:
+    __slots__ = ("level", "nw", "ne", "sw", "se", "blue", "red", "results")
+
+
+# Memoized quadtree engine, reuses the future of every square it has already seen.
+# The torus is handled by padding: before each jump the board is surrounded by copies of itself,
+# as wide as the jump is long, so the centre evolves exactly like the wrapped board.
+class HashlifeEngine:
+    name = "hashlife"
+
+    def __init__(self, width, height, rule=None, max_nodes=1 << 20, max_jump=64):
+        self.rule = rule or standard_rule
+        if self.rule.random_ties:
+            raise ValueError("The hashlife engine can't settle ties at random, it shares results between positions.")
+        self.width = width
+        self.height = height
+        self.max_nodes = max_nodes  # The node cache is dropped as soon as it holds this many nodes, even mid-jump
+        self.max_jump = max_jump  # Longest jump in generations, padding grows with the jump
+        self.live_cells = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.new_cache()
+
+    # Starts a new cache generation, every node and every memoized result is forgotten
+    def new_cache(self):
+        self.table = {}  # (nw, ne, sw, se) -> canonical node
+        self.empty_nodes = [0]
+
+    # Forgets every node and memoized result once the cache is full. Nodes the running jump still holds stay valid,
+    # they are only no longer shared with the nodes built after this.
+    def evict(self):
+        for node in self.table.values():
+            node.results.clear()
+        self.new_cache()
+        self.evictions += 1
+
+    def load(self, live_cells):
+        self.live_cells = {
+            (x % self.width, y % self.height): color for (x, y), color in live_cells.items() if color is not None
+        }
+
+    def apply(self, changes):
+        for cell, color in changes.items():
+            if color is None:
+                self.live_cells.pop(cell, None)
+            else:
+                self.live_cells[cell] = color
+
+    def cells(self):
+        return dict(self.live_cells)
+
+    def snapshot(self):
+        return frozenset(self.live_cells.items())
+
+    def restore(self, snapshot):
+        self.live_cells = dict(snapshot)
+
+    def population(self):
+        blue_count = sum(1 for color in self.live_cells.values() if color == "blue")
+        return blue_count, len(self.live_cells) - blue_count
+
+    def cache_stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "nodes": len(self.table),
+            "evictions": self.evictions,
+        }
+
+    def step(self):
+        return self.advance(1)
+
+    # Advances any number of generations in power of two jumps, returns the cells that changed overall
+    def advance(self, generations):
+        old_cells = self.live_cells
+        while generations > 0:
+            jump = min(1 << (generations.bit_length() - 1), self.max_jump)
+            self.live_cells = self.jump(jump.bit_length() - 1)
+            generations -= jump
+
+        changes = {cell: None for cell in old_cells if cell not in self.live_cells}
+        for cell, color in self.live_cells.items():
+            if old_cells.get(cell) != color:
+                changes[cell] = color
+        return changes
+
+    # Advances 2 ** j generations at once
+    def jump(self, j):
+        generations = 1 << j
+
+        # Smallest square whose centre half holds the board and whose border is at least one jump wide
+        level = 2
+        while (1 << (level - 1)) < max(self.width, self.height) or (1 << (level - 2)) < generations:
+            level += 1
+        offset = 1 << (level - 2)
+
+        # Copy the board around itself, only cells within one jump of the board can reach it
+        padded = {}
+        for (x, y), color in self.live_cells.items():
+            state = states[color]
+            for copy_y in range(y - (generations // self.height + 1) * self.height, self.height + generations,
+                                self.height):
+                if copy_y < -generations:
+                    continue
+                for copy_x in range(x - (generations // self.width + 1) * self.width, self.width + generations,
+                                    self.width):
+                    if copy_x >= -generations:
+                        padded[(offset + copy_x, offset + copy_y)] = state
+
+        result = self.successor(self.build(level, padded), j)
+
+        # The result is the centre of the square, which starts at the board's origin
+        live_cells = {}
+        for (x, y), state in self.extract(result, 0, 0).items():
+            if x < self.width and y < self.height:
+                live_cells[(x, y)] = colors[state]
+        return live_cells
+
+    def empty(self, level):
+        while len(self.empty_nodes) <= level:
+            smaller = self.empty_nodes[-1]
+            self.empty_nodes.append(self.join(smaller, smaller, smaller, smaller))
+        return self.empty_nodes[level]
+
+    # Canonical node with the given quadrants, equal squares are always the same object
+    def join(self, nw, ne, sw, se):
+        key = (nw, ne, sw, se)
+        node = self.table.get(key)
+        if node is not None:
+            return node
+
+        if len(self.table) >= self.max_nodes:
+            self.evict()
+        node = Node()
+        node.nw, node.ne, node.sw, node.se = nw, ne, sw, se
+        if isinstance(nw, int):
+            node.level = 1
+            node.blue = key.count(1)
+            node.red = key.count(2)
+        else:
+            node.level = nw.level + 1
+            node.blue = nw.blue + ne.blue + sw.blue + se.blue
+            node.red = nw.red + ne.red + sw.red + se.red
+        node.results = {}
+        self.table[key] = node
+        return node
+
+    # Builds a node of the given level from {(x, y): state}, merging quadrants bottom up
+    def build(self, level, cells):
+        nodes = cells
+        for current in range(level):
+            empty = self.empty(current)
+            groups = {}
+            for (x, y), node in nodes.items():
+                group = groups.setdefault((x >> 1, y >> 1), [empty, empty, empty, empty])
+                group[(y & 1) * 2 + (x & 1)] = node
+            nodes = {position: self.join(*group) for position, group in groups.items()}
+        return nodes.get((0, 0), self.empty(level))
+
+    # {(x, y): state} of the live cells of a node whose top left corner is at (x, y)
+    def extract(self, node, x, y, cells=None):
+        if cells is None:
+            cells = {}
+        if isinstance(node, int):
+            if node:
+                cells[(x, y)] = node
+            return cells
+        if node.blue + node.red == 0:
+            return cells
+        half = 1 << (node.level - 1)
+        self.extract(node.nw, x, y, cells)
+        self.extract(node.ne, x + half, y, cells)
+        self.extract(node.sw, x, y + half, cells)
+        self.extract(node.se, x + half, y + half, cells)
+        return cells
+
+    # Centre half of a node advanced 2 ** j generations, j is at most level - 2
+    def successor(self, node, j):
+        if node.blue + node.red == 0:
+            return self.empty(node.level - 1)
+        j = min(j, node.level - 2)
+        result = node.results.get(j)
+        if result is not None:
+            self.hits += 1
+            return result
+        self.misses += 1
+
+        if node.level == 2:
+            result = self.centre_step(node)
+        else:
+            nw, ne, sw, se = node.nw, node.ne, node.sw, node.se
+            join = self.join
+
+            # Nine overlapping squares of half the size, each advanced 2 ** j or half the full jump
+            c1 = self.successor(nw, j)
+            c2 = self.successor(join(nw.ne, ne.nw, nw.se, ne.sw), j)
+            c3 = self.successor(ne, j)
+            c4 = self.successor(join(nw.sw, nw.se, sw.nw, sw.ne), j)
+            c5 = self.successor(join(nw.se, ne.sw, sw.ne, se.nw), j)
+            c6 = self.successor(join(ne.sw, ne.se, se.nw, se.ne), j)
+            c7 = self.successor(sw, j)
+            c8 = self.successor(join(sw.ne, se.nw, sw.se, se.sw), j)
+            c9 = self.successor(se, j)
+
+            if j < node.level - 2:
+                # Already far enough, only the centres of the four quarters are kept
+                result = join(
+                    join(c1.se, c2.sw, c4.ne, c5.nw),
+                    join(c2.se, c3.sw, c5.ne, c6.nw),
+                    join(c4.se, c5.sw, c7.ne, c8.nw),
+                    join(c5.se, c6.sw, c8.ne, c9.nw),
+                )
+            else:
+                result = join(
+                    self.successor(join(c1, c2, c4, c5), j),
+                    self.successor(join(c2, c3, c5, c6), j),
+                    self.successor(join(c4, c5, c7, c8), j),
+                    self.successor(join(c5, c6, c8, c9), j),
+                )
+
+        node.results[j] = result
+        return result
+
+    # One generation of the rule on a 4x4 square, returns its centre 2x2
+    def centre_step(self, node):
+        grid = [[0] * 4 for _ in range(4)]
+        for quadrant, qx, qy in ((node.nw, 0, 0), (node.ne, 2, 0), (node.sw, 0, 2), (node.se, 2, 2)):
+            grid[qy][qx] = quadrant.nw
+            grid[qy][qx + 1] = quadrant.ne
+            grid[qy + 1][qx] = quadrant.sw
+            grid[qy + 1][qx + 1] = quadrant.se
+
+        rule_table = self.rule.table
+        centre = []
+        for y in (1, 2):
+            for x in (1, 2):
+                blue = red = 0
+                for dy in (-1, 0, 1):
+                    for dx in (-1, 0, 1):
+                        if dx or dy:
+                            state = grid[y + dy][x + dx]
+                            if state == 1:
+                                blue += 1
+                            elif state == 2:
+                                red += 1
+                centre.append(rule_table[grid[y][x] * 81 + blue * 9 + red])
+        return self.join(*centre)
@@ -0,0 +1,194 @@
+import argparse
+import random
+import time
+from engine import available_engines, default_engine, engines, team_engine
+from pattern_store import default_store
+from profiling import Profiler
+from recording import Recorder
+from rules import add_rule_arguments, rule_from_arguments, standard_rule
+from simulation import Simulation, stop_messages
+from teams import max_teams, min_teams
+
+
+# Top left corner that puts a pattern in the middle of the blue half of the board
+def blue_position(pattern, width, height):
+    pattern_width = max(dx for dx, dy in pattern) + 1
+    pattern_height = max(dy for dx, dy in pattern) + 1
+    return max(0, width // 4 - pattern_width // 2), max(0, height // 2 - pattern_height // 2)
+
+
+# Mirror image of a blue position, so the red pattern lines up with the blue one
+def red_position(pattern, x, width):
+    max_x = max(dx for dx, dy in pattern)
+    return max(width // 2, width - 1 - x - max_x)
+
+
+# Two opposing stored patterns, each centred in its half with red mirrored like place_pattern does.
+# The red pattern is moved down by offset rows, a seed shifts both patterns by the same mirrored random amount.
+def setup_match(width, height, blue_pattern=None, red_pattern=None, engine_name=default_engine, offset=0, seed=None,
+                track_cells=True, rule=None):
+    patterns = default_store()
+    return setup_cells_match(width, height, None if blue_pattern is None else patterns[blue_pattern],
+                             None if red_pattern is None else patterns[red_pattern], engine_name, offset, seed,
+                             track_cells, rule)
+
+
+# setup_match for patterns given as lists of cells rather than names in the store
+def setup_cells_match(width, height, blue_cells=None, red_cells=None, engine_name=default_engine, offset=0, seed=None,
+                      track_cells=True, rule=None):
+    simulation = Simulation(width, height, engine_name=engine_name, track_cells=track_cells, rule=rule)
+    shift_x = shift_y = 0
+    if seed is not None:
+        rng = random.Random(seed)
+        shift_x = rng.randint(-(width // 8), width // 8)
+        shift_y = rng.randint(-(height // 4), height // 4)
+
+    edits = {}
+    if blue_cells is not None:
+        x, y = blue_position(blue_cells, width, height)
+        x = min(max(0, x + shift_x), width // 2 - 1)
+        edits.update(simulation.pattern_cells(blue_cells, x, (y + shift_y) % height))
+    if red_cells is not None:
+        x, y = blue_position(red_cells, width, height)
+        x = min(max(0, x + shift_x), width // 2 - 1)
+        edits.update(simulation.pattern_cells(red_cells, red_position(red_cells, x, width),
+                                              (y + shift_y + offset) % height))
+    simulation.apply_edits(edits)
+    return simulation
+
+
+# Builds the starting board, either two opposing patterns or a seeded random board of any number of teams
+def setup_simulation(args, rule=None):
+    # Engines that reduce counts and hashes themselves keep the board out of Python dictionaries,
+    # unless the match is recorded
+    track_cells = args.record is not None or not hasattr(engines[args.engine], "step_summary")
+    if args.blue_pattern is None and args.red_pattern is None:
+        simulation = Simulation(args.width, args.height, engine_name=args.engine, track_cells=track_cells,
+                                rule=rule, teams=args.teams)
+        simulation.randomize(args.seed, args.density)
+        return simulation
+    return setup_match(args.width, args.height, args.blue_pattern, args.red_pattern, args.engine,
+                       track_cells=track_cells, rule=rule)
+
+
+# Mean milliseconds per generation of each phase and totals of the counters
+def print_profile(profiler):
+    samples = list(profiler.samples)
+    if not samples:
+        return
+    totals = {}
+    for sample in samples:
+        for key, value in sample.items():
+            if key not in ("generation", "time", "frame_ms"):
+                totals[key] = totals.get(key, 0) + value
+    for key, total in totals.items():
+        if key.endswith("_ms"):
+            print(f"{key[:-3]}: {total / len(samples):.3f} ms per generation")
+    counters = ", ".join(f"{key} {total}" for key, total in totals.items() if not key.endswith("_ms"))
+    print(f"Over {len(samples)} generations: {counters}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a Competitive Game of Life match without a display")
+    parser.add_argument("--width", type=int, default=96)
+    parser.add_argument("--height", type=int, default=54)
+    parser.add_argument("--engine", choices=available_engines(), default=default_engine)
+    parser.add_argument("--generations", type=int, default=None,
+                        help="Number of generations to run, plays to completion when omitted")
+    parser.add_argument("--seed", type=int, default=None,
+                        help="Seed for the random starting board, a new one is drawn and printed when omitted")
+    parser.add_argument("--density", type=float, default=0.5,
+                        help="Share of each side of the random starting board that starts alive")
+    add_rule_arguments(parser)
+    parser.add_argument("--teams", type=int, default=2,
+                        help=f"Number of teams on the random starting board, {min_teams} to {max_teams}")
+    parser.add_argument("--blue-pattern", default=None, help="Name of a pattern in the pattern store")
+    parser.add_argument("--red-pattern", default=None, help="Name of a pattern in the pattern store")
+    parser.add_argument("--fast-forward", type=int, default=0,
+                        help="Generations to skip before playing, in large jumps with the hashlife engine")
+    parser.add_argument("--import-patterns", nargs="+", default=[], metavar="FILE",
+                        help="RLE or Life 1.06 files to add to the pattern store first")
+    parser.add_argument("--profile", action="store_true", help="Print the time spent in each phase of a generation")
+    parser.add_argument("--trace", default=None, help="CSV or JSON file for the per-generation samples")
+    parser.add_argument("--record", default=None, help="Records the match to a file that can be replayed")
+    parser.add_argument("--keyframe-interval", type=int, default=64, help="Generations between two full boards")
+    args = parser.parse_args(argv)
+
+    if args.import_patterns:
+        print(f"Imported {default_store().import_files(args.import_patterns)} new patterns.")
+    for name in (args.blue_pattern, args.red_pattern):
+        if name is not None and name not in default_store():
+            parser.error(f"unknown pattern '{name}'")
+    if not getattr(engines[args.engine], "bounded", True):
+        if args.record:
+            parser.error(f"a match on the unbounded {args.engine} engine can't be recorded")
+        if args.generations is None:  # Gliders flying off never come back, so the board may never repeat
+            parser.error(f"--generations is required on the unbounded {args.engine} engine")
+
+    if not 0 <= args.density <= 1:
+        parser.error("--density must be between 0 and 1")
+    if not min_teams <= args.teams <= max_teams:
+        parser.error(f"--teams must be between {min_teams} and {max_teams}")
+    if args.teams != 2:
+        if args.record:
+            parser.error("only two-team matches can be recorded")
+        if args.blue_pattern is not None or args.red_pattern is not None:
+            parser.error("pattern matches are played by two teams")
+        if not getattr(engines[args.engine], "bounded", True):
+            parser.error(f"the unbounded {args.engine} engine plays two teams")
+        engine_name = team_engine(args.engine, args.teams)
+        if engine_name != args.engine:
+            print(f"The {args.engine} engine plays two teams, using the {engine_name} engine.")
+            args.engine = engine_name
+    rule = rule_from_arguments(parser, args)
+    if rule.random_ties and args.engine == "hashlife":
+        parser.error("the hashlife engine needs a rule without random ties")
+
+    simulation = setup_simulation(args, rule)
+    if rule != standard_rule:
+        print(f"Rule: {rule}")
+    if simulation.seed is not None:
+        print(f"Random board: seed {simulation.seed}, density {args.density}")
+    if args.profile or args.trace:
+        simulation.profiler = Profiler(enabled=True)
+    recorder = None
+    if args.record:
+        recorder = Recorder(args.record, args.width, args.height, args.keyframe_interval)
+        simulation.record(recorder)
+
+    start = time.perf_counter()
+    played = simulation.fast_forward(args.fast_forward) if args.fast_forward else 0
+    if not simulation.finished:
+        played += simulation.run(args.generations)
+    elapsed = time.perf_counter() - start
+
+    gens_per_sec = played / elapsed if elapsed > 0 else float("inf")
+    print(f"{played} generations in {elapsed:.3f}s ({gens_per_sec:.1f} gens/sec, {simulation.engine_name} engine)")
+    if simulation.finished:
+        print(stop_messages[simulation.stop_reason], simulation.stop_details())
+    winner = simulation.winner() or "No winner yet."
+    counts = ", ".join(f"{team.capitalize()}: {count}" for team, count in zip(simulation.teams, simulation.counts()))
+    print(f"{counts}. {winner}")
+
+    if hasattr(simulation.engine, "cache_stats"):
+        stats = simulation.engine.cache_stats()
+        print(f"Cache: {stats['hit_rate']:.1%} hit rate, {stats['nodes']} nodes, {stats['evictions']} evictions")
+    if recorder is not None:
+        recorder.close()
+        print(f"Match recorded to {args.record}")
+    if simulation.profiler.enabled:
+        print_profile(simulation.profiler)
+        if args.trace:
+            simulation.profiler.dump(args.trace)
+            print(f"{len(simulation.profiler.samples)} generations written to {args.trace}")
+    if hasattr(simulation.engine, "tile_stats"):
+        stats = simulation.engine.tile_stats()
+        print(f"Tiles: {stats['mean_active_fraction']:.1%} active per generation on average, "
+              f"{stats['active']} of {stats['tiles']} in the last one")
+    if hasattr(simulation.engine, "chunk_stats"):
+        stats = simulation.engine.chunk_stats()
+        print(f"Plane: {stats['chunks']} chunks, live cells spread over {stats['width']}x{stats['height']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,335 @@
+import argparse
+import json
+import math
+import time
+import numpy as np
+from cycles import cell_keys, color_codes
+from engine import available_engines, board_codes, code_cells, default_engine, neighbor_sum, stamp_codes
+from pattern_store import default_store
+from rules import add_rule_arguments, lookup, random_tie, rule_from_arguments, standard_rule
+from simulation import Simulation
+
+reasons = ("stable", "loop", "extinct", "limit")  # Index of each reason in BatchRun.reasons
+outcomes = ("tie", "blue", "red")  # Index of each outcome in batch_outcomes
+confidence_z = 1.96  # 95% intervals
+
+
+# Starting board of one Monte Carlo match as an array of colour codes. The pattern plays alone on its side
+# of the divider, at a random spot and optionally in a random orientation. The other side gets the random
+# half board a seeded random board would give it, or a second pattern placed the same way.
+def starting_board(pattern, side, width, height, seed, density=0.5, against=None, orientation=0,
+                   random_orientation=False):
+    divider = width // 2
+    if against is None:
+        codes = board_codes(width, height, density, seed, divider)
+    else:
+        codes = np.zeros((height, width), dtype=np.uint8)
+    rng = np.random.default_rng([seed, 1])  # Placements, apart from the stream board_codes draws from
+    other = "red" if side == "blue" else "blue"
+    players = [(pattern, side)] + ([(against, other)] if against is not None else [])
+    for name, team in players:
+        first, last = (0, divider) if team == "blue" else (divider, width)
+        codes[:, first:last] = 0
+        chosen = int(rng.integers(8)) if random_orientation else orientation
+        offsets = np.asarray(default_store().offsets(name, chosen, team))
+        pattern_width = int(offsets[:, 0].max()) + 1
+        if pattern_width > last - first:
+            raise ValueError(f"{name} is wider than the {team} side of the board.")
+        stamp_codes(codes, offsets, int(rng.integers(first, last - pattern_width + 1)), int(rng.integers(height)),
+                    color_codes[team])
+    return codes
+
+
+# Splitmix64 finalizer of every word plus the salt of its position, a bijection so a single changed word
+# always changes the hash
+def mix(words, salts):
+    z = words + salts
+    z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return z ^ (z >> np.uint64(31))
+
+
+blue_bytes = np.uint64(0x0101010101010101)
+red_bytes = np.uint64(0x0202020202020202)
+neighbor_weights = bytes([0, 9, 1]) + bytes(253)  # Colour code -> 9 for blue and 1 for red, summed into 9 * blue + red
+
+
+# (blue, red) of every board from the words of its cells, a blue byte is 1 and a red one 2
+def board_counts(words):
+    if hasattr(np, "bitwise_count"):  # NumPy 2
+        blue = np.bitwise_count(words & blue_bytes).sum(axis=1, dtype=np.int64)
+        red = np.bitwise_count(words & red_bytes).sum(axis=1, dtype=np.int64)
+        return np.stack([blue, red], axis=1)
+    cells = words.view(np.uint8)
+    live = np.count_nonzero(cells, axis=1)
+    red = cells.sum(axis=1, dtype=np.int64) - live
+    return np.stack([live - red, red], axis=1)
+
+
+# Steps a stack of boards at once with the rule table of NumpyEngine, all of them in one (boards, height, width)
+# uint8 array of colour codes, so one neighbour sum of 9 * blue + red indexes the table for every board. Each
+# board is retired as soon as its match would
+# have stopped in Simulation: stable, looped, a team wiped out or the generation limit reached. Retired
+# boards are dropped from the stack, so the work shrinks with the boards still playing, and since all boards
+# start together they share one generation count. Changes, populations and hashes are worked out on the
+# 64-bit words of each board rather than cell by cell. Loops are found from the last history_capacity hashes
+# of each board, a repeat is not replayed to verify it like Simulation does as a false one needs a 64-bit
+# hash collision.
+class BatchRun:
+    def __init__(self, codes, max_generations=5000, history_capacity=1 << 12, rule=None):
+        count, height, width = codes.shape
+        self.cells = codes.astype(np.uint8)
+        self.rule = rule or standard_rule
+        self.coins = self.rule.coin_array(width, height) if self.rule.random_ties else None
+        self.padding = -(height * width) % 8  # Zero bytes that round each board up to whole words
+        self.max_generations = max_generations
+        self.generation = 0
+        self.steps = 0  # Board generations computed, retiring steps included
+
+        self.words = self.board_words(self.cells)
+        positions = np.arange(self.words.shape[1])
+        self.salts = cell_keys(positions, np.zeros_like(positions), np.zeros_like(positions))
+        self.hashes = np.bitwise_xor.reduce(mix(self.words, self.salts), axis=1)
+        # Column g % capacity holds generation g. Rows of retired boards are only dropped once half the
+        # rows are retired, copying the history on every retirement would cost more than the steps.
+        self.history = np.zeros((count, history_capacity), dtype=np.uint64)
+        self.history[:, 0] = self.hashes
+        self.rows = np.arange(count)  # History row of each board still playing
+
+        self.ids = np.arange(count)  # Board of each row of the stack
+        self.reasons = np.full(count, -1, dtype=np.int8)
+        self.generations = np.zeros(count, dtype=np.int64)
+        self.counts = board_counts(self.words)
+
+    @property
+    def active(self):
+        return len(self.ids)
+
+    def board_words(self, cells):
+        flat = cells.reshape(len(cells), -1)
+        if self.padding:
+            flat = np.concatenate([flat, np.zeros((len(flat), self.padding), dtype=np.uint8)], axis=1)
+        return flat.view(np.uint64)
+
+    def retire(self, rows, reason, generation, counts):
+        ids = self.ids[rows]
+        self.reasons[ids] = reasons.index(reason)
+        self.generations[ids] = generation
+        self.counts[ids] = counts[rows]
+
+    # Advances every board still playing by one generation, returns the number still playing afterwards
+    def step(self):
+        cells = self.cells
+        index = neighbor_sum(lookup(neighbor_weights, cells))
+        index += cells * np.uint8(81)
+        new_cells = lookup(self.rule.table, index)
+        if self.coins is not None:
+            new_cells = np.where(new_cells == random_tie, self.coins, new_cells)
+        self.steps += self.active
+
+        # Hash of each new board from the words that changed
+        words = self.board_words(new_cells)
+        changed = words != self.words
+        moving = changed.any(axis=1)
+        boards, positions = np.nonzero(changed)
+        salts = self.salts[positions]
+        delta = mix(self.words[boards, positions], salts) ^ mix(words[boards, positions], salts)
+        hashes = self.hashes.copy()
+        if len(boards):
+            starts = np.flatnonzero(np.diff(boards, prepend=-1))
+            hashes[boards[starts]] ^= np.bitwise_xor.reduceat(delta, starts)
+
+        # A board that comes back to a recent board loops, it keeps the board before the repeat like Simulation
+        generation = self.generation
+        capacity = self.history.shape[1]
+        recent = self.history[:, :min(generation + 1, capacity)]
+        latest = np.zeros(len(recent), dtype=np.uint64)
+        latest[self.rows] = hashes
+        looped = moving & (recent == latest[:, None]).any(axis=1)[self.rows]
+        old_counts = self.counts[self.ids]
+        self.retire(~moving, "stable", generation, old_counts)
+        self.retire(looped, "loop", generation, old_counts)
+
+        generation += 1
+        counts = board_counts(words)
+        advanced = moving & ~looped
+        extinct = advanced & ((counts[:, 0] == 0) | (counts[:, 1] == 0)) & (generation > 1)
+        limit = advanced & ~extinct & (generation >= self.max_generations)
+        self.retire(extinct, "extinct", generation, counts)
+        self.retire(limit, "limit", generation, counts)
+
+        playing = advanced & ~extinct & ~limit
+        self.counts[self.ids[playing]] = counts[playing]
+        if not playing.all():
+            new_cells, words, hashes = new_cells[playing], words[playing], hashes[playing]
+            self.rows = self.rows[playing]
+            self.ids = self.ids[playing]
+            if 2 * len(self.rows) <= len(self.history):
+                self.history = self.history[self.rows]
+                self.rows = np.arange(len(self.rows))
+        self.cells, self.words, self.hashes = new_cells, words, hashes
+        self.history[self.rows, generation % capacity] = hashes
+        self.generation = generation
+        return self.active
+
+    def run(self):
+        while self.active:
+            self.step()
+
+
+# Index into outcomes of every board, decided like Simulation.outcome with early stops counted as a tie
+def batch_outcomes(generations, counts):
+    blue, red = counts[:, 0], counts[:, 1]
+    return np.select([generations <= 1, blue == 0, red == 0, blue > red, red > blue], [0, 2, 1, 1, 2], 0)
+
+
+# Wilson score interval of a proportion
+def wilson_interval(successes, trials, z=confidence_z):
+    if not trials:
+        return 0.0, 1.0
+    p = successes / trials
+    denominator = 1 + z * z / trials
+    centre = (p + z * z / (2 * trials)) / denominator
+    margin = z * math.sqrt(p * (1 - p) / trials + z * z / (4 * trials * trials)) / denominator
+    return max(0.0, centre - margin), min(1.0, centre + margin)
+
+
+# Plays boards matches of a pattern on one side, batch_size boards at a time. Board i is starting_board(seed + i).
+# Returns the summary and the (outcome, reason, generations) of every board.
+def estimate(pattern, side="blue", boards=1000, width=96, height=54, seed=0, density=0.5, against=None,
+             orientation=0, random_orientation=False, max_generations=5000, batch_size=1024,
+             history_capacity=1 << 12, rule=None):
+    results = []
+    steps = 0
+    start = time.perf_counter()
+    for first in range(0, boards, batch_size):
+        codes = np.stack([
+            starting_board(pattern, side, width, height, seed + index, density, against, orientation,
+                           random_orientation)
+            for index in range(first, min(boards, first + batch_size))
+        ])
+        run = BatchRun(codes, max_generations, history_capacity, rule)
+        run.run()
+        steps += run.steps
+        for outcome, reason, generations in zip(batch_outcomes(run.generations, run.counts).tolist(),
+                                                run.reasons.tolist(), run.generations.tolist()):
+            results.append((outcomes[outcome], reasons[reason], generations))
+    elapsed = time.perf_counter() - start
+
+    summary = {"pattern": pattern, "side": side, "against": against or "random", "boards": boards,
+               "rule": str(rule or standard_rule)}
+    other = "red" if side == "blue" else "blue"
+    for name, outcome in (("win", side), ("tie", "tie"), ("loss", other)):
+        hits = sum(1 for result in results if result[0] == outcome)
+        low, high = wilson_interval(hits, boards)
+        summary[name] = {"count": hits, "probability": round(hits / boards, 4) if boards else 0.0,
+                         "low": round(low, 4), "high": round(high, 4)}
+    summary["reasons"] = {reason: sum(1 for result in results if result[1] == reason) for reason in reasons}
+    summary["mean_generations"] = round(sum(result[2] for result in results) / max(1, boards), 1)
+    summary["seconds"] = round(elapsed, 3)
+    summary["board_generations_per_sec"] = round(steps / elapsed, 1) if elapsed > 0 else float("inf")
+    return summary, results
+
+
+# Plays the first boards one at a time on Simulation, returns the indices whose result differs from the batch
+# and the board generations per second
+def play_one_at_a_time(results, pattern, side, boards, width, height, seed, density, against, orientation,
+                       random_orientation, max_generations, engine_name, rule=None):
+    mismatches = []
+    steps = 0
+    start = time.perf_counter()
+    for index in range(boards):
+        codes = starting_board(pattern, side, width, height, seed + index, density, against, orientation,
+                               random_orientation)
+        simulation = Simulation(width, height, engine_name=engine_name, rule=rule)
+        simulation.reset(code_cells(codes))
+        simulation.run(max_generations)
+        reason = simulation.stop_reason or "limit"
+        steps += simulation.generation_count + (reason in ("stable", "loop"))
+        if (simulation.outcome() or "tie", reason, simulation.generation_count) != results[index]:
+            mismatches.append(index)
+    elapsed = time.perf_counter() - start
+    return mismatches, steps / elapsed if elapsed > 0 else float("inf")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Win, tie and loss probabilities of a pattern over many "
+                                                 "random matches, played as one batch of boards")
+    parser.add_argument("pattern", help="Stored pattern to evaluate")
+    parser.add_argument("--side", choices=("blue", "red"), default="blue", help="Team that plays the pattern")
+    parser.add_argument("--against", default=None,
+                        help="Pattern the other team plays, a random half board by default")
+    parser.add_argument("--boards", type=int, default=1000, help="Matches to play")
+    parser.add_argument("--batch-size", type=int, default=1024, help="Boards stepped together")
+    parser.add_argument("--width", type=int, default=96)
+    parser.add_argument("--height", type=int, default=54)
+    parser.add_argument("--density", type=float, default=0.5,
+                        help="Fraction of the opposing side filled with cells, 0 to 1")
+    parser.add_argument("--seed", type=int, default=0, help="Board i is built from seed + i")
+    parser.add_argument("--orientation", type=int, choices=range(8), default=0,
+                        help="Orientation of the pattern, see pattern_store.transforms")
+    parser.add_argument("--random-orientation", action="store_true",
+                        help="Place the pattern in a random orientation on every board")
+    add_rule_arguments(parser)
+    parser.add_argument("--max-generations", type=int, default=5000)
+    parser.add_argument("--history", type=int, default=1 << 12,
+                        help="Recent boards kept per board for loop detection, longer loops run to the limit")
+    parser.add_argument("--compare", type=int, default=0,
+                        help="Also play this many of the boards one at a time and check they agree")
+    parser.add_argument("--engine", choices=[name for name in available_engines() if name != "plane"],
+                        default=default_engine,
+                        help="Engine of the one at a time comparison")
+    parser.add_argument("--json", action="store_true", help="Print the summary as JSON")
+    args = parser.parse_args(argv)
+
+    names = [args.pattern] + ([args.against] if args.against else [])
+    unknown = [name for name in names if name not in default_store()]
+    if unknown:
+        parser.error(f"unknown patterns: {', '.join(unknown)}")
+    if args.boards < 1 or args.batch_size < 1 or args.history < 1 or args.max_generations < 1:
+        parser.error("--boards, --batch-size, --history and --max-generations must be at least 1")
+    if args.seed < 0:
+        parser.error("--seed must not be negative")
+    if not 0 <= args.density <= 1:
+        parser.error("--density must be between 0 and 1")
+    rule = rule_from_arguments(parser, args)
+    if args.compare and rule.random_ties and args.engine == "hashlife":
+        parser.error("the hashlife engine needs a rule without random ties")
+
+    settings = dict(width=args.width, height=args.height, seed=args.seed, density=args.density,
+                    against=args.against, orientation=args.orientation,
+                    random_orientation=args.random_orientation, max_generations=args.max_generations, rule=rule)
+    try:
+        summary, results = estimate(args.pattern, args.side, args.boards, batch_size=args.batch_size,
+                                    history_capacity=args.history, **settings)
+    except ValueError as error:
+        parser.error(str(error))
+
+    if args.compare:
+        boards = min(args.compare, args.boards)
+        mismatches, rate = play_one_at_a_time(results, args.pattern, args.side, boards, engine_name=args.engine,
+                                              **settings)
+        summary["compared"] = {"boards": boards, "engine": args.engine, "mismatches": mismatches,
+                               "board_generations_per_sec": round(rate, 1),
+                               "speedup": round(summary["board_generations_per_sec"] / rate, 1)}
+
+    if args.json:
+        print(json.dumps(summary, indent=2))
+        return
+    print(f"{args.pattern} as {args.side} against {summary['against']}, {args.boards} boards, {summary['rule']}:")
+    for name in ("win", "tie", "loss"):
+        row = summary[name]
+        print(f"  {name}: {row['probability']:.3f} [{row['low']:.3f}, {row['high']:.3f}] ({row['count']})")
+    print("  " + ", ".join(f"{count} {reason}" for reason, count in summary["reasons"].items()) +
+          f", {summary['mean_generations']} generations on average")
+    print(f"{summary['board_generations_per_sec']:.0f} board generations/sec in batches of {args.batch_size}, "
+          f"{summary['seconds']:.2f} s")
+    if args.compare:
+        compared = summary["compared"]
+        print(f"One at a time on {compared['engine']}: {compared['board_generations_per_sec']:.0f} board "
+              f"generations/sec, the batch is {compared['speedup']}x faster, "
+              f"{len(compared['mismatches'])} of {compared['boards']} boards disagree")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+import hashlib
+import os
+import re
+import sqlite3
+from array import array
+from collections import OrderedDict
+from patterns import patterns as builtin_patterns
+from teams import mirrored_teams
+
+default_path = "patterns.db"
+compiled_capacity = 512  # Patterns whose orientations are kept in memory, the least recently used go first
+
+# The eight rotations and mirror images of a pattern. The index of an orientation is its number of
+# quarter turns, plus 4 when it is mirrored left to right after turning.
+transforms = (
+    lambda x, y: (x, y),
+    lambda x, y: (-y, x),
+    lambda x, y: (-x, -y),
+    lambda x, y: (y, -x),
+    lambda x, y: (-x, y),
+    lambda x, y: (y, x),
+    lambda x, y: (x, -y),
+    lambda x, y: (-y, -x),
+)
+
+
+# Moves a pattern so its top left corner is at (0, 0), cells sorted row by row
+def normalize(cells):
+    min_x = min(x for x, y in cells)
+    min_y = min(y for x, y in cells)
+    return sorted((x - min_x, y - min_y) for x, y in cells)
+
+
+# Cells of a pattern in every orientation, each moved so its top left corner is at (0, 0)
+def orientations(cells):
+    return tuple(tuple(normalize([transform(x, y) for x, y in cells])) for transform in transforms)
+
+
+# Orientation a pattern is placed in by a team: red plays the mirror image of blue, like place_pattern always did,
+# and so does every second team after it
+def team_orientation(orientation, team):
+    return orientation ^ 4 if team in mirrored_teams else orientation
+
+
+# Same value for every translation, rotation and mirror image of a pattern
+def canonical_hash(cells):
+    canonical = min(normalize([transform(x, y) for x, y in cells]) for transform in transforms)
+    data = array("i", [value for cell in canonical for value in cell]).tobytes()
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def pack_cells(cells):
+    return array("i", [value for cell in cells for value in cell]).tobytes()
+
+
+def unpack_cells(data):
+    values = array("i")
+    values.frombytes(data)
+    return list(zip(values[::2], values[1::2]))
+
+
+# Run length encoded pattern, returns (name or None, cells). Every live state counts as a live cell.
+def parse_rle(text):
+    name = None
+    body = []
+    for line in text.splitlines():
+        line = line.strip()
+        if line.startswith("#N"):
+            name = line[2:].strip() or None
+        elif line.startswith("#") or line.startswith("x ") or line.startswith("x="):
+            continue
+        else:
+            body.append(line)
+
+    cells = []
+    x = y = 0
+    for count, tag in re.findall(r"(\d*)([p-y][A-X]|[a-zA-Z.$!])", "".join(body)):
+        count = int(count) if count else 1
+        if tag == "!":
+            break
+        if tag == "$":
+            x = 0
+            y += count
+        elif tag in "b.":
+            x += count
+        else:
+            cells.extend((x + i, y) for i in range(count))
+            x += count
+    return name, cells
+
+
+# Life 1.06 pattern, one "x y" pair per live cell
+def parse_life106(text):
+    cells = []
+    for line in text.splitlines():
+        line = line.strip()
+        if line and not line.startswith("#"):
+            x, y = line.split()[:2]
+            cells.append((int(x), int(y)))
+    return None, cells
+
+
+# (name, cells) of an RLE or Life 1.06 file, named after the file when it carries no name
+def read_pattern_file(path):
+    with open(path) as file:
+        text = file.read()
+    parse = parse_life106 if text.lstrip().startswith("#Life 1.06") else parse_rle
+    name, cells = parse(text)
+    return name or os.path.splitext(os.path.basename(path))[0], cells
+
+
+# Pattern library in an SQLite file. Only the names are read up front, the cells of a pattern
+# are loaded the first time it is used. Every shape is stored once, whatever its position and orientation.
+# Until the file exists the built-in patterns are served from memory, it is created on the first save.
+class PatternStore:
+    def __init__(self, path=default_path, capacity=compiled_capacity):
+        self.path = path
+        self.connection = None
+        self.capacity = capacity
+        self.compiled = OrderedDict()  # name -> orientations of the recently used patterns, oldest first
+        if os.path.exists(path):
+            self.connect()
+
+    # Opens the file, creating it and seeding it with the built-in patterns when needed
+    def connect(self):
+        if self.connection is None:
+            self.connection = sqlite3.connect(self.path)
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS patterns (name TEXT PRIMARY KEY, shape TEXT NOT NULL UNIQUE, cells BLOB)"
+            )
+            if not len(self):
+                self.add_many(builtin_patterns.items())
+        return self.connection
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+    def names(self):
+        if self.connection is None:
+            return list(builtin_patterns)
+        return [name for name, in self.connection.execute("SELECT name FROM patterns ORDER BY rowid")]
+
+    def __iter__(self):
+        return iter(self.names())
+
+    def __len__(self):
+        if self.connection is None:
+            return len(builtin_patterns)
+        return self.connection.execute("SELECT COUNT(*) FROM patterns").fetchone()[0]
+
+    def __contains__(self, name):
+        if self.connection is None:
+            return name in builtin_patterns
+        return self.connection.execute("SELECT 1 FROM patterns WHERE name = ?", (name,)).fetchone() is not None
+
+    def __getitem__(self, name):
+        return list(self.oriented(name)[0])
+
+    # The eight orientations of a pattern (see transforms), compiled when it is loaded or saved
+    def oriented(self, name):
+        compiled = self.compiled.get(name)
+        if compiled is not None:
+            self.compiled.move_to_end(name)
+            return compiled
+        if self.connection is None:
+            if name not in builtin_patterns:
+                raise KeyError(name)
+            return self.compile(name, builtin_patterns[name])
+        row = self.connection.execute("SELECT cells FROM patterns WHERE name = ?", (name,)).fetchone()
+        if row is None:
+            raise KeyError(name)
+        return self.compile(name, unpack_cells(row[0]))
+
+    def compile(self, name, cells):
+        compiled = self.compiled[name] = orientations(cells)
+        if len(self.compiled) > self.capacity:
+            self.compiled.popitem(last=False)  # Forget the least recently used pattern
+        return compiled
+
+    # Offsets of a pattern as placed by a team in an orientation, red gets the mirror image
+    def offsets(self, name, orientation=0, team="blue"):
+        return self.oriented(name)[team_orientation(orientation, team)]
+
+    # Name of the stored pattern with the same shape, or None
+    def find_shape(self, cells):
+        shape = canonical_hash(cells)
+        if self.connection is None:
+            return next((name for name, known in builtin_patterns.items() if canonical_hash(known) == shape), None)
+        row = self.connection.execute("SELECT name FROM patterns WHERE shape = ?", (shape,)).fetchone()
+        return row[0] if row else None
+
+    # Saves one pattern, raises ValueError when the name or the shape is already taken
+    def add(self, name, cells):
+        if not cells:
+            raise ValueError("The pattern has no cells.")
+        self.connect()
+        if name in self:
+            raise ValueError(f"A pattern named '{name}' already exists.")
+        duplicate = self.find_shape(cells)
+        if duplicate is not None:
+            raise ValueError(f"This pattern is the same as '{duplicate}'.")
+        cells = normalize(cells)
+        with self.connection:
+            self.connection.execute("INSERT INTO patterns VALUES (?, ?, ?)",
+                                    (name, canonical_hash(cells), pack_cells(cells)))
+        self.compile(name, cells)
+
+    # Saves many (name, cells) pairs in one transaction, taken names and shapes are skipped.
+    # Returns the number of patterns added.
+    def add_many(self, named_patterns):
+        rows = ((name, canonical_hash(cells), pack_cells(normalize(cells))) for name, cells in named_patterns if cells)
+        self.connect()
+        before = self.connection.total_changes
+        with self.connection:
+            self.connection.executemany("INSERT OR IGNORE INTO patterns VALUES (?, ?, ?)", rows)
+        return self.connection.total_changes - before
+
+    # Imports RLE and Life 1.06 files, returns the number of new patterns
+    def import_files(self, paths):
+        return self.add_many(read_pattern_file(path) for path in paths)
+
+
+store = None
+
+
+# Store shared by the whole process, opened on first use
+def default_store():
+    global store
+    if store is None:
+        store = PatternStore()
+    return store
@@ -0,0 +1,134 @@
+import csv
+import json
+import time
+from collections import deque
+
+
+# Handed out by a disabled profiler, so instrumented code only pays for one call and an empty with block
+class NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+null_span = NullSpan()
+
+
+# Adds the time spent inside a with block to one phase of the current generation
+class Span:
+    __slots__ = ("profiler", "name", "start")
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.profiler.record(self.name, time.perf_counter() - self.start)
+        return False
+
+
+# Named timing spans and counters per generation. Every finished generation becomes one sample,
+# the recent ones feed the HUD and all of them (up to max_samples) can be dumped to a trace file.
+class Profiler:
+    def __init__(self, enabled=False, window=60, max_samples=1 << 17):
+        self.enabled = enabled
+        self.phases = {}  # phase -> seconds in the generation in progress
+        self.counters = {}  # counter -> total in the generation in progress
+        self.samples = deque(maxlen=max_samples)
+        self.recent = deque(maxlen=window)  # Last samples, for gens/sec and the phase breakdown
+        self.last_end = None
+
+    def span(self, name):
+        if not self.enabled:
+            return null_span
+        return Span(self, name)
+
+    def record(self, name, seconds):
+        if self.enabled:
+            self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def count(self, name, amount=1):
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    # Births, deaths and colour flips of a step, old_cells is the board before the changes
+    def count_changes(self, changes, old_cells):
+        if not self.enabled:
+            return
+        births = deaths = 0
+        for cell, color in changes.items():
+            if color is None:
+                deaths += 1
+            elif cell not in old_cells:
+                births += 1
+        self.count("births", births)
+        self.count("deaths", deaths)
+        self.count("flips", len(changes) - births - deaths)
+
+    # Closes the current generation, its frame time runs from the end of the previous one
+    def end_generation(self, generation):
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        sample = {
+            "generation": generation,
+            "time": now,
+            "frame_ms": (now - self.last_end) * 1000 if self.last_end is not None else 0.0,
+        }
+        for name, seconds in self.phases.items():
+            sample[f"{name}_ms"] = seconds * 1000
+        sample.update(self.counters)
+        self.samples.append(sample)
+        self.recent.append(sample)
+        self.phases = {}
+        self.counters = {}
+        self.last_end = now
+
+    # gens/sec, mean frame time and mean time per phase over the recent generations
+    def summary(self):
+        if len(self.recent) < 2:
+            return None
+        samples = list(self.recent)[1:]  # The first frame time reaches back before the window
+        elapsed = self.recent[-1]["time"] - self.recent[0]["time"]
+        phases = {}
+        for sample in samples:
+            for key, value in sample.items():
+                if key.endswith("_ms") and key != "frame_ms":
+                    phases[key[:-3]] = phases.get(key[:-3], 0.0) + value / len(samples)
+        return {
+            "gens_per_sec": len(samples) / elapsed if elapsed > 0 else float("inf"),
+            "frame_ms": sum(sample["frame_ms"] for sample in samples) / len(samples),
+            "phases": phases,
+        }
+
+    # Text of the on-canvas overlay
+    def hud_text(self):
+        summary = self.summary()
+        if summary is None:
+            return "Profiling..."
+        lines = [f"{summary['gens_per_sec']:.1f} gens/sec, {summary['frame_ms']:.1f} ms/frame"]
+        for name, ms in sorted(summary["phases"].items(), key=lambda item: -item[1]):
+            lines.append(f"{name}: {ms:.2f} ms")
+        return "\n".join(lines)
+
+    # Writes every sample to a CSV or JSON trace, depending on the file name
+    def dump(self, path):
+        samples = list(self.samples)
+        if path.endswith(".json"):
+            with open(path, "w") as file:
+                json.dump(samples, file, indent=1)
+            return
+
+        fields = []
+        for sample in samples:
+            fields.extend(key for key in sample if key not in fields)
+        with open(path, "w", newline="") as file:
+            writer = csv.DictWriter(file, fieldnames=fields, restval=0)
+            writer.writeheader()
+            writer.writerows(samples)
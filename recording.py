@@ -0,0 +1,325 @@
+import argparse
+import json
+import mmap
+import os
+import struct
+import tempfile
+from array import array
+from bisect import bisect_right
+from engine import set_bits
+
+# File layout, all little endian:
+#   header: magic, version, width, height, keyframe interval
+#   records: kind (b"K" keyframe or b"D" delta), generation, payload length, payload
+# A keyframe holds the board as two bit planes (blue, red) of width * height bits, cell y * width + x.
+# A delta holds four arrays of cell indices: blue births, red births, deaths and colour flips, preceded by
+# their lengths. Indices are uint16 on boards of up to 65536 cells and uint32 on larger ones.
+# Every recording starts with the keyframe of generation 0.
+magic = b"CGLR"
+version = 1
+header = struct.Struct("<4sHIII")
+record_header = struct.Struct("<cII")
+count_header = struct.Struct("<IIII")
+
+
+def index_type(width, height):
+    return "H" if width * height <= 1 << 16 else "I"
+
+
+# Payload of a keyframe record for a board
+def keyframe_payload(width, height, live_cells):
+    size = (width * height + 7) // 8
+    planes = {"blue": bytearray(size), "red": bytearray(size)}
+    for (x, y), color in live_cells.items():
+        index = y * width + x
+        planes[color][index >> 3] |= 1 << (index & 7)
+    return bytes(planes["blue"] + planes["red"])
+
+
+# Payload of a delta record for the births, deaths and flips of one generation, old_cells is the board before them
+def delta_payload(width, height, changes, old_cells):
+    typecode = index_type(width, height)
+    blue_births, red_births, deaths, flips = (array(typecode), array(typecode), array(typecode), array(typecode))
+    for (x, y), color in changes.items():
+        index = y * width + x
+        if color is None:
+            deaths.append(index)
+        elif (x, y) in old_cells:
+            flips.append(index)
+        elif color == "blue":
+            blue_births.append(index)
+        else:
+            red_births.append(index)
+    payload = count_header.pack(len(blue_births), len(red_births), len(deaths), len(flips))
+    return payload + blue_births.tobytes() + red_births.tobytes() + deaths.tobytes() + flips.tobytes()
+
+
+# {(x, y): colour} of a keyframe payload
+def keyframe_cells(payload, width):
+    size = len(payload) // 2
+    live_cells = {}
+    for color, start in (("blue", 0), ("red", size)):
+        plane = int.from_bytes(payload[start:start + size], "little")
+        for index in set_bits(plane):
+            live_cells[(index % width, index // width)] = color
+    return live_cells
+
+
+# (blue births, red births, deaths, flips) cell index arrays of a delta payload
+def delta_indices(payload, typecode):
+    counts = count_header.unpack_from(payload, 0)
+    offset = count_header.size
+    arrays = []
+    for count in counts:
+        values = array(typecode)
+        size = values.itemsize * count
+        values.frombytes(payload[offset:offset + size])
+        arrays.append(values)
+        offset += size
+    return arrays
+
+
+# Applies the index arrays of a delta to a board
+def apply_delta(live_cells, indices, width):
+    blue_births, red_births, deaths, flips = indices
+    for cells, color in ((blue_births, "blue"), (red_births, "red")):
+        for index in cells:
+            live_cells[(index % width, index // width)] = color
+    for index in deaths:
+        del live_cells[(index % width, index // width)]
+    for index in flips:
+        cell = (index % width, index // width)
+        live_cells[cell] = "red" if live_cells[cell] == "blue" else "blue"
+
+
+# Writes the generations of one match, starting over whenever the match restarts
+class Recorder:
+    def __init__(self, path, width, height, keyframe_interval=64):
+        self.path = path
+        self.width = width
+        self.height = height
+        self.keyframe_interval = keyframe_interval
+        self.file = open(path, "wb")
+
+    # Truncates the file and starts a new recording from the given board (generation 0)
+    def restart(self, live_cells, width=None, height=None):
+        self.width = width or self.width
+        self.height = height or self.height
+        self.file.seek(0)
+        self.file.truncate()
+        self.file.write(header.pack(magic, version, self.width, self.height, self.keyframe_interval))
+        self.write_keyframe(0, live_cells)
+
+    def write_record(self, kind, generation, payload):
+        self.file.write(record_header.pack(kind, generation, len(payload)))
+        self.file.write(payload)
+
+    def write_keyframe(self, generation, live_cells):
+        self.write_record(b"K", generation, keyframe_payload(self.width, self.height, live_cells))
+
+    # Births, deaths and flips of one generation, old_cells is the board before the changes
+    def write_delta(self, generation, changes, old_cells):
+        self.write_record(b"D", generation, delta_payload(self.width, self.height, changes, old_cells))
+
+    def flush(self):
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+# Read-only view of a recording. The file is memory-mapped and only the record headers are read when it is
+# opened, a board is rebuilt from the nearest keyframe before it plus the deltas after that keyframe.
+class Recording:
+    def __init__(self, path):
+        self.file = open(path, "rb")
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        found, file_version, self.width, self.height, self.keyframe_interval = header.unpack_from(self.data, 0)
+        if found != magic or file_version != version:
+            raise ValueError(f"{path} is not a match recording.")
+
+        self.records = []  # (kind, generation, payload offset, payload length) in file order
+        self.keyframes = []  # Record indices of the keyframes
+        self.keyframe_generations = []
+        offset = header.size
+        while offset + record_header.size <= len(self.data):
+            kind, generation, length = record_header.unpack_from(self.data, offset)
+            offset += record_header.size
+            if offset + length > len(self.data):
+                break  # Cut off while it was being written
+            if kind == b"K":
+                self.keyframes.append(len(self.records))
+                self.keyframe_generations.append(generation)
+            self.records.append((kind, generation, offset, length))
+            offset += length
+        if not self.keyframes:
+            raise ValueError(f"{path} holds no keyframe.")
+        self.generations = self.records[-1][1]  # Last recorded generation
+
+    def close(self):
+        self.data.close()
+        self.file.close()
+
+    def payload(self, record):
+        _, _, offset, length = record
+        return self.data[offset:offset + length]
+
+    def keyframe(self, record):
+        return keyframe_cells(self.payload(record), self.width)
+
+    # (blue births, red births, deaths, flips) cell index arrays of a delta record
+    def delta(self, record):
+        return delta_indices(self.payload(record), index_type(self.width, self.height))
+
+    def apply_delta(self, live_cells, record):
+        apply_delta(live_cells, self.delta(record), self.width)
+
+    # Board at the given generation, one keyframe load plus at most keyframe_interval deltas
+    def board_at(self, generation):
+        generation = max(0, min(generation, self.generations))
+        position = self.keyframes[bisect_right(self.keyframe_generations, generation) - 1]
+        live_cells = self.keyframe(self.records[position])
+        for index in range(position + 1, len(self.records)):
+            record = self.records[index]
+            if record[1] > generation:
+                break
+            if record[0] == b"D":
+                self.apply_delta(live_cells, record)
+        return live_cells
+
+    # Population of each team after every generation, with that generation's births, deaths and flips
+    def summary_rows(self):
+        rows = []
+        width = self.width
+        for record in self.records:
+            # A keyframe starts the board over, after a fast forward it is the only record of its generation
+            if record[0] == b"K":
+                board = self.keyframe(record)
+                blue = sum(1 for color in board.values() if color == "blue")
+                red = len(board) - blue
+                if not rows or rows[-1]["generation"] != record[1]:
+                    rows.append({"generation": record[1], "blue": blue, "red": red, "births": 0, "deaths": 0,
+                                 "flips": 0})
+                continue
+            blue_births, red_births, deaths, flips = self.delta(record)
+
+            # Deaths and flips carry no colour, the board tells whose cells they were
+            died = {"blue": 0, "red": 0}
+            for index in deaths:
+                died[board.pop((index % width, index // width))] += 1
+            to_blue = 0
+            for index in flips:
+                cell = (index % width, index // width)
+                board[cell] = "red" if board[cell] == "blue" else "blue"
+                to_blue += board[cell] == "blue"
+            to_red = len(flips) - to_blue
+            for indices, color in ((blue_births, "blue"), (red_births, "red")):
+                for index in indices:
+                    board[(index % width, index // width)] = color
+
+            blue += len(blue_births) - died["blue"] + to_blue - to_red
+            red += len(red_births) - died["red"] + to_red - to_blue
+            rows.append({
+                "generation": record[1], "blue": blue, "red": red,
+                "births": len(blue_births) + len(red_births), "deaths": len(deaths), "flips": len(flips),
+            })
+        return rows
+
+
+# Summary statistics of a recorded match
+def summarize(path):
+    recording = Recording(path)
+    rows = recording.summary_rows()
+    recording_size = os.path.getsize(path)
+    summary = {
+        "width": recording.width,
+        "height": recording.height,
+        "generations": recording.generations,
+        "keyframes": len(recording.keyframes),
+        "bytes": recording_size,
+        "bytes_per_generation": round(recording_size / max(1, recording.generations), 1),
+        "final_blue": rows[-1]["blue"],
+        "final_red": rows[-1]["red"],
+        "births": sum(row["births"] for row in rows),
+        "deaths": sum(row["deaths"] for row in rows),
+        "flips": sum(row["flips"] for row in rows),
+    }
+    for team in ("blue", "red"):
+        peak = max(rows, key=lambda row: row[team])
+        summary[f"peak_{team}"] = peak[team]
+        summary[f"peak_{team}_generation"] = peak["generation"]
+
+    # Generations at which the team in the lead changed
+    lead_changes = []
+    leader = None
+    for row in rows:
+        current = "blue" if row["blue"] > row["red"] else "red" if row["red"] > row["blue"] else leader
+        if leader is not None and current != leader:
+            lead_changes.append(row["generation"])
+        leader = current
+    summary["lead_changes"] = lead_changes
+    summary["leader"] = leader or "tie"
+    recording.close()
+    return summary, rows
+
+
+# Records a match that starts with a hashlife fast forward and checks every summary row against the board rebuilt
+# by seeking to it. The keyframe written after the jump is the only record of its generation.
+def self_check(width=96, height=54, seed=5):
+    from engine import random_board
+    from simulation import Simulation
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "check.cglr")
+        simulation = Simulation(width, height, engine_name="hashlife")
+        simulation.reset(random_board(width, height, 0.5, seed))
+        recorder = Recorder(path, width, height, keyframe_interval=16)
+        simulation.record(recorder)
+        simulation.fast_forward(100)
+        simulation.run(200)
+        recorder.close()
+
+        recording = Recording(path)
+        rows = recording.summary_rows()
+        for row in rows:
+            board = recording.board_at(row["generation"])
+            blue = sum(1 for color in board.values() if color == "blue")
+            if (row["blue"], row["red"]) != (blue, len(board) - blue):
+                raise AssertionError(f"Summary of generation {row['generation']} differs from the recorded board")
+        if rows[-1]["generation"] != simulation.generation_count:
+            raise AssertionError(f"Summary ends at generation {rows[-1]['generation']}, "
+                                 f"the match at {simulation.generation_count}")
+        recording.close()
+    print(f"Summary of a fast forwarded recording matches its boards over {len(rows)} generations.")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Summary statistics of a recorded match")
+    parser.add_argument("recording", nargs="?", help="Recording written by the GUI or by headless.py --record")
+    parser.add_argument("--self-check", action="store_true",
+                        help="Checks the summary of a recording that starts with a fast forward, no file needed")
+    parser.add_argument("--json", action="store_true", help="Print the summary as JSON")
+    parser.add_argument("--csv", default=None, help="Writes the population of each generation to a CSV file")
+    args = parser.parse_args(argv)
+    if args.self_check:
+        self_check()
+        return
+    if args.recording is None:
+        parser.error("a recording is required unless --self-check is given")
+
+    summary, rows = summarize(args.recording)
+    if args.json:
+        print(json.dumps(summary, indent=2))
+    else:
+        for key, value in summary.items():
+            print(f"{key}: {value}")
+    if args.csv:
+        with open(args.csv, "w") as file:
+            file.write("generation,blue,red,births,deaths,flips\n")
+            for row in rows:
+                file.write(f"{row['generation']},{row['blue']},{row['red']},{row['births']},{row['deaths']},"
+                           f"{row['flips']}\n")
+
+
+if __name__ == "__main__":
+    main()
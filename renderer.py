@@ -0,0 +1,498 @@
+import math
+import time
+
+
+# Fill colour of each team on the canvas, per theme
+cell_colors = {
+    "Light": {"blue": "blue", "red": "red", "green": "#00A000", "yellow": "#E0B000", "purple": "purple",
+              "orange": "#FF8000", "cyan": "#00B0B0", "magenta": "magenta"},
+    "Dark": {"blue": "blue", "red": "#ED0000", "green": "#008800", "yellow": "#C89B00", "purple": "#7A1FA2",
+             "orange": "#E06C00", "cyan": "#008B8B", "magenta": "#C000C0"},  # Use darker colours in dark mode
+}
+
+# Grid line colour per theme
+grid_line_colors = {"Light": "lightgray", "Dark": "gray"}
+
+divider_grab_pixels = 4  # How close to the divider a click has to be to drag it
+
+
+# Draws the board on a Tk canvas, the grid is created once and cells keep their rectangle between frames
+class CanvasRenderer:
+    def __init__(self, canvas, width, height, cell_size, theme="Light"):
+        self.canvas = canvas
+        self.cell_size = cell_size
+        self.theme = theme
+        self.rebuild(width, height)
+
+    # Recreates the static grid lines and the middle line, only needed at startup and after a resize
+    def rebuild(self, width, height):
+        self.width = width
+        self.height = height
+        self.cell_items = {}  # (x, y) -> rectangle id, a cell reuses its rectangle every time it comes alive
+        self.shown = {}  # (x, y) -> colour currently visible on the canvas
+        self.canvas.delete("all")
+
+        size = self.cell_size
+        line_color = grid_line_colors[self.theme]
+        for x in range(0, width * size, size):
+            self.canvas.create_line(x, 0, x, height * size, fill=line_color, tags="grid")
+        for y in range(0, height * size, size):
+            self.canvas.create_line(0, y, width * size, y, fill=line_color, tags="grid")
+
+        self.divider_x = width // 2
+        middle_x = self.divider_x * size
+        self.divider = self.canvas.create_line(
+            middle_x, 0, middle_x, height * size,
+            fill="black", width=2  # Thicker black line
+        )
+        self.divider_visible = True
+        self.draggable = True  # Only the divider of a two-team match moves
+
+    # Moves the line between the two sides to the left edge of column x
+    def move_divider(self, x):
+        self.divider_x = x
+        self.canvas.coords(self.divider, x * self.cell_size, 0, x * self.cell_size, self.height * self.cell_size)
+
+    # Lines between the regions of the teams (see Simulation.dividers), the first one is the divider
+    def set_regions(self, dividers):
+        self.canvas.delete("region")
+        self.move_divider(dividers[0])
+        self.draggable = len(dividers) == 1
+        size = self.cell_size
+        for x in dividers[1:]:
+            self.canvas.create_line(x * size, 0, x * size, self.height * size, fill="black", width=2, tags="region",
+                                    state="normal" if self.divider_visible else "hidden")
+
+    # True when a canvas x position is close enough to the divider to grab it
+    def near_divider(self, pixel_x):
+        return (self.draggable and self.divider_visible and
+                abs(pixel_x - self.divider_x * self.cell_size) <= divider_grab_pixels)
+
+    # Cell under a canvas position
+    def cell_at(self, pixel_x, pixel_y):
+        return pixel_x // self.cell_size, pixel_y // self.cell_size
+
+    # The middle line is only shown while the simulation is not running
+    def show_divider(self, visible):
+        if visible != self.divider_visible:
+            self.canvas.itemconfigure(self.divider, state="normal" if visible else "hidden")
+            self.canvas.itemconfigure("region", state="normal" if visible else "hidden")
+            self.divider_visible = visible
+
+    # Brings the canvas in line with the given board, only cells that differ from the last frame are touched
+    def draw(self, live_cells):
+        changes = {cell: None for cell in self.shown if cell not in live_cells}
+        for cell, color in live_cells.items():
+            if self.shown.get(cell) != color:
+                changes[cell] = color
+        self.apply(changes)
+
+    # Applies {(x, y): colour or None} changes, as returned by Simulation.step
+    def apply(self, changes):
+        colors = cell_colors[self.theme]
+        size = self.cell_size
+        for cell, color in changes.items():
+            item = self.cell_items.get(cell)
+            if color is None:
+                if cell in self.shown:
+                    self.canvas.itemconfigure(item, state="hidden")
+                    del self.shown[cell]
+                continue
+
+            if item is None:
+                x, y = cell
+                item = self.canvas.create_rectangle(
+                    x * size, y * size, (x + 1) * size, (y + 1) * size,
+                    fill=colors[color], outline="gray"
+                )
+                self.canvas.tag_lower(item, "grid")  # Keep the grid lines on top like before
+                self.cell_items[cell] = item
+            else:
+                self.canvas.itemconfigure(item, fill=colors[color], state="normal")
+            self.shown[cell] = color
+
+    # Recolours the existing items instead of rebuilding the canvas
+    def set_theme(self, theme):
+        self.theme = theme
+        self.canvas.itemconfigure("grid", fill=grid_line_colors[theme])
+        colors = cell_colors[theme]
+        for cell, color in self.shown.items():
+            if color != "blue":  # Blue looks the same in both themes
+                self.canvas.itemconfigure(self.cell_items[cell], fill=colors[color])
+
+
+# Constants of the viewport
+min_zoom = 1 / 256  # Pixels per cell
+max_zoom = 32
+cell_zoom = 4  # From this many pixels per cell on cells are drawn one by one, below it as a density map
+grid_zoom = 8  # Grid lines are only drawn from this many pixels per cell on
+density_pixels = 8  # Smallest size on screen of a square of the density map
+index_chunk = 64  # Cells are indexed by 64x64 chunk so the visible ones are found without scanning the world
+count_levels = (4, 32, 256, 2048)  # Block sizes in cells of the population pyramid behind the density map
+
+# Team and background colours of the density map per theme, as RGB
+density_colors = {
+    "Light": {"blue": (0, 0, 255), "red": (255, 0, 0), "background": (255, 255, 255)},
+    "Dark": {"blue": (0, 0, 255), "red": (237, 0, 0), "background": (211, 211, 211)},
+}
+
+
+# Window onto an unbounded plane with zoom and pan. The renderer keeps its own index of the live cells,
+# built from the changes it is given like CanvasRenderer's, with population counts per block at a few sizes.
+# A frame only reads the chunks and blocks inside the view, so its cost follows the size of the view
+# and not the size of the world. Cells smaller than cell_zoom pixels are drawn as a density map.
+class ViewportRenderer:
+    def __init__(self, canvas, width, height, cell_size, theme="Light"):
+        self.canvas = canvas
+        self.cell_size = cell_size
+        self.theme = theme
+        self.rebuild(width, height)
+
+    # Forgets the board and shows the width x height starting area at the starting cell size
+    def rebuild(self, width, height):
+        self.width = width
+        self.height = height
+        self.view_width = width * self.cell_size  # Size of the view in pixels
+        self.view_height = height * self.cell_size
+        self.zoom = self.cell_size  # Pixels per cell
+        self.origin_x = 0.0  # Position in the world of the top left corner of the view, in cells
+        self.origin_y = 0.0
+        self.divider_x = width // 2
+        self.divider_visible = True
+        self.chunks = {}  # (chunk x, chunk y) -> {(x, y): colour}
+        self.counts = {size: {} for size in count_levels}  # Block size -> {(block x, block y): [blue, red]}
+        self.redraw()
+
+    # Region of the world in view as whole cells, (x0, y0, x1, y1) with the ends excluded
+    def visible_region(self):
+        x0 = math.floor(self.origin_x)
+        y0 = math.floor(self.origin_y)
+        return (x0, y0, math.ceil(self.origin_x + self.view_width / self.zoom) + 1,
+                math.ceil(self.origin_y + self.view_height / self.zoom) + 1)
+
+    def cell_at(self, pixel_x, pixel_y):
+        return math.floor(self.origin_x + pixel_x / self.zoom), math.floor(self.origin_y + pixel_y / self.zoom)
+
+    def pixel_at(self, x, y):
+        return (x - self.origin_x) * self.zoom, (y - self.origin_y) * self.zoom
+
+    # Zooms by a factor around a canvas position, the cell under it stays in place
+    def zoom_at(self, pixel_x, pixel_y, factor):
+        zoom = min(max_zoom, max(min_zoom, self.zoom * factor))
+        if zoom == self.zoom:
+            return
+        self.origin_x += pixel_x / self.zoom - pixel_x / zoom
+        self.origin_y += pixel_y / self.zoom - pixel_y / zoom
+        self.zoom = zoom
+        self.redraw()
+
+    # Moves the view by a distance in pixels, the world follows the mouse
+    def pan(self, pixel_dx, pixel_dy):
+        self.origin_x -= pixel_dx / self.zoom
+        self.origin_y -= pixel_dy / self.zoom
+        self.redraw()
+
+    # Zooms and pans so every live cell is in view, or back to the starting area on an empty board
+    def fit(self):
+        if not self.chunks:
+            self.show_region(0, 0, self.width, self.height)
+            return
+        chunk_xs = [chunk_x for chunk_x, chunk_y in self.chunks]
+        chunk_ys = [chunk_y for chunk_x, chunk_y in self.chunks]
+        self.show_region(min(chunk_xs) * index_chunk, min(chunk_ys) * index_chunk,
+                          (max(chunk_xs) + 1) * index_chunk, (max(chunk_ys) + 1) * index_chunk)
+
+    # Centres the view on a region of the world, at the largest power of two zoom that fits all of it
+    def show_region(self, x0, y0, x1, y1):
+        zoom = min(self.view_width / (x1 - x0), self.view_height / (y1 - y0))
+        self.zoom = min(max_zoom, max(min_zoom, 2 ** math.floor(math.log2(zoom))))
+        self.origin_x = (x0 + x1) / 2 - self.view_width / self.zoom / 2
+        self.origin_y = (y0 + y1) / 2 - self.view_height / self.zoom / 2
+        self.redraw()
+
+    def move_divider(self, x):
+        self.divider_x = x
+        self.place_divider()
+
+    # The plane is only played by two teams, so there are no other region lines
+    def set_regions(self, dividers):
+        self.move_divider(dividers[0])
+
+    def near_divider(self, pixel_x):
+        return self.divider_visible and abs(pixel_x - self.pixel_at(self.divider_x, 0)[0]) <= divider_grab_pixels
+
+    def show_divider(self, visible):
+        if visible != self.divider_visible:
+            self.divider_visible = visible
+            self.place_divider()
+
+    def place_divider(self):
+        pixel_x = self.pixel_at(self.divider_x, 0)[0]
+        self.canvas.coords(self.divider, pixel_x, 0, pixel_x, self.view_height)
+        self.canvas.itemconfigure(self.divider, state="normal" if self.divider_visible else "hidden")
+
+    def draw(self, live_cells):
+        changes = {}
+        for cells in self.chunks.values():
+            for cell in cells:
+                if cell not in live_cells:
+                    changes[cell] = None
+        for cell, color in live_cells.items():
+            if self.color_of(cell) != color:
+                changes[cell] = color
+        self.apply(changes)
+
+    def color_of(self, cell):
+        cells = self.chunks.get((cell[0] // index_chunk, cell[1] // index_chunk))
+        return cells.get(cell) if cells else None
+
+    def apply(self, changes):
+        for cell, color in changes.items():
+            self.index(cell, color)
+        if self.zoom < cell_zoom:
+            self.draw_density()
+            return
+
+        x0, y0, x1, y1 = self.visible_region()
+        for cell, color in changes.items():
+            if x0 <= cell[0] < x1 and y0 <= cell[1] < y1:
+                self.show_cell(cell, color)
+
+    # Keeps the chunk index and the block counts in line with one changed cell
+    def index(self, cell, color):
+        x, y = cell
+        key = (x // index_chunk, y // index_chunk)
+        cells = self.chunks.get(key)
+        old_color = cells.get(cell) if cells else None
+        if old_color == color:
+            return
+        if color is None:
+            del cells[cell]
+            if not cells:
+                del self.chunks[key]
+        else:
+            if cells is None:
+                cells = self.chunks[key] = {}
+            cells[cell] = color
+
+        for size, counts in self.counts.items():
+            block = (x // size, y // size)
+            count = counts.get(block)
+            if count is None:
+                count = counts[block] = [0, 0]
+            if old_color is not None:
+                count[old_color == "red"] -= 1
+            if color is not None:
+                count[color == "red"] += 1
+            if count == [0, 0]:
+                del counts[block]
+
+    # Draws everything in view again, after the view moved or the theme changed
+    def redraw(self):
+        self.canvas.delete("view")
+        self.cell_items = {}  # (x, y) -> rectangle id of the cells in view
+        self.shown = {}
+        zoom = self.zoom
+        x0, y0, x1, y1 = self.visible_region()
+
+        if zoom >= grid_zoom:
+            line_color = grid_line_colors[self.theme]
+            for x in range(x0, x1):
+                pixel_x = self.pixel_at(x, 0)[0]
+                self.canvas.create_line(pixel_x, 0, pixel_x, self.view_height, fill=line_color, tags=("view", "grid"))
+            for y in range(y0, y1):
+                pixel_y = self.pixel_at(0, y)[1]
+                self.canvas.create_line(0, pixel_y, self.view_width, pixel_y, fill=line_color, tags=("view", "grid"))
+
+        self.divider = self.canvas.create_line(0, 0, 0, 0, fill="black", width=2, tags="view")
+        self.place_divider()
+
+        if zoom < cell_zoom:
+            self.draw_density()
+            return
+        for key, cells in region_items(self.chunks, index_chunk, x0, y0, x1, y1):
+            for cell, color in cells.items():
+                if x0 <= cell[0] < x1 and y0 <= cell[1] < y1:
+                    self.show_cell(cell, color)
+
+    def show_cell(self, cell, color):
+        item = self.cell_items.get(cell)
+        if color is None:
+            if cell in self.shown:
+                self.canvas.itemconfigure(item, state="hidden")
+                del self.shown[cell]
+            return
+
+        fill = cell_colors[self.theme][color]
+        if item is None:
+            left, top = self.pixel_at(*cell)
+            item = self.canvas.create_rectangle(
+                left, top, left + self.zoom, top + self.zoom,
+                fill=fill, outline="gray" if self.zoom >= grid_zoom else "", tags=("view", "cell")
+            )
+            if self.zoom >= grid_zoom:
+                self.canvas.tag_lower(item, "grid")  # Keep the grid lines on top like CanvasRenderer
+            else:
+                self.canvas.tag_lower(item)
+            self.cell_items[cell] = item
+        else:
+            self.canvas.itemconfigure(item, fill=fill, state="normal")
+        self.shown[cell] = color
+
+    # One square per block of cells with live cells in it, tinted by team and by how full it is.
+    # The counts come from the coarsest level that fits in a block, so at most 64 are added up per square.
+    def draw_density(self):
+        self.canvas.delete("density")
+        block = 2 ** math.ceil(math.log2(max(count_levels[0], density_pixels / self.zoom)))
+        level = max(size for size in count_levels if size <= block)
+        x0, y0, x1, y1 = self.visible_region()
+
+        totals = {}
+        for (level_x, level_y), (blue, red) in region_items(self.counts[level], level, x0, y0, x1, y1):
+            key = (level_x * level // block, level_y * level // block)
+            total = totals.get(key)
+            if total is None:
+                totals[key] = [blue, red]
+            else:
+                total[0] += blue
+                total[1] += red
+
+        colors = density_colors[self.theme]
+        area = block * block
+        size = block * self.zoom
+        for (block_x, block_y), (blue, red) in totals.items():
+            left, top = self.pixel_at(block_x * block, block_y * block)
+            self.canvas.create_rectangle(left, top, left + size, top + size, outline="",
+                                         fill=density_color(colors, blue, red, area), tags=("view", "density"))
+        if totals:
+            self.canvas.tag_lower("density")  # Under the divider and the profiling overlay
+
+    def set_theme(self, theme):
+        self.theme = theme
+        self.redraw()
+
+
+# Entries of a {(block x, block y): value} table with blocks of the given size overlapping a region.
+# Looks the blocks up one by one when the region holds fewer of them than the table, scans the table otherwise.
+def region_items(table, size, x0, y0, x1, y1):
+    first_x, last_x = x0 // size, (x1 - 1) // size
+    first_y, last_y = y0 // size, (y1 - 1) // size
+    if (last_x - first_x + 1) * (last_y - first_y + 1) < len(table):
+        return [((block_x, block_y), table[(block_x, block_y)])
+                for block_y in range(first_y, last_y + 1) for block_x in range(first_x, last_x + 1)
+                if (block_x, block_y) in table]
+    return [(key, value) for key, value in table.items()
+            if first_x <= key[0] <= last_x and first_y <= key[1] <= last_y]
+
+
+# Mix of the team colours by their share of a block, faded into the background the emptier the block is
+def density_color(colors, blue, red, area):
+    share = blue / (blue + red)
+    strength = min(1.0, 0.25 + 3 * (blue + red) / area)
+    channels = []
+    for blue_channel, red_channel, background in zip(colors["blue"], colors["red"], colors["background"]):
+        team = blue_channel * share + red_channel * (1 - share)
+        channels.append(round(background + (team - background) * strength))
+    return "#%02x%02x%02x" % tuple(channels)
+
+
+# Canvas stand-in for running the renderer without a display, counts the calls it receives
+class StubCanvas:
+    def __init__(self):
+        self.calls = 0
+        self.next_id = 1
+
+    def create_line(self, *args, **kwargs):
+        return self.create()
+
+    def create_rectangle(self, *args, **kwargs):
+        return self.create()
+
+    def create(self):
+        self.calls += 1
+        self.next_id += 1
+        return self.next_id - 1
+
+    def itemconfigure(self, *args, **kwargs):
+        self.calls += 1
+
+    def tag_lower(self, *args):
+        self.calls += 1
+
+    def tag_raise(self, *args):
+        self.calls += 1
+
+    def coords(self, *args):
+        self.calls += 1
+
+    def delete(self, *args):
+        self.calls += 1
+
+
+# The previous draw_grid, deletes everything and creates every item again, kept for comparison
+def redraw_all(canvas, live_cells, width, height, cell_size):
+    canvas.delete("all")
+    for (x, y), color in live_cells.items():
+        canvas.create_rectangle(
+            x * cell_size, y * cell_size, (x + 1) * cell_size, (y + 1) * cell_size,
+            fill=color, outline="gray"
+        )
+    for x in range(0, width * cell_size, cell_size):
+        canvas.create_line(x, 0, x, height * cell_size, fill="lightgray")
+    for y in range(0, height * cell_size, cell_size):
+        canvas.create_line(0, y, width * cell_size, y, fill="lightgray")
+
+
+# Times both renderers over the same generations, flushing Tk after every frame when a display is available
+def measure_frame_times(width=200, height=100, cell_size=16, generations=200, warmup=50, seed=1):
+    from simulation import Simulation
+
+    try:
+        import tkinter as tk
+        root = tk.Tk()
+        canvas = tk.Canvas(root, width=width * cell_size, height=height * cell_size)
+        canvas.pack()
+        flush = root.update
+    except Exception:  # No display, measure the Python side and count canvas calls on a stub
+        canvas = StubCanvas()
+        flush = None
+
+    results = {}
+    for name in ("redraw_all", "incremental"):
+        simulation = Simulation(width, height)
+        simulation.randomize(seed)
+        simulation.run(warmup)  # Skip the first burst after randomizing
+        renderer = CanvasRenderer(canvas, width, height, cell_size)
+        renderer.draw(simulation.live_cells)
+        calls_before = getattr(canvas, "calls", 0)
+
+        total = 0.0
+        frames = 0
+        for _ in range(generations):
+            changes = simulation.step()
+            if changes is None:
+                break
+            start = time.perf_counter()
+            if name == "redraw_all":
+                redraw_all(canvas, simulation.live_cells, width, height, cell_size)
+            else:
+                renderer.apply(changes)
+            if flush is not None:
+                flush()
+            total += time.perf_counter() - start
+            frames += 1
+        calls = (getattr(canvas, "calls", 0) - calls_before) / frames
+        results[name] = (total / frames * 1000, calls)
+
+    if flush is None:  # The stub neither draws nor repaints, so these are not frame times
+        print(f"{width}x{height}, stub canvas without a display, {frames} frames. "
+              f"Python side only, run with a display to time real Tk frames.")
+    else:
+        print(f"{width}x{height}, Tk canvas, {frames} frames")
+    for name, (frame_ms, calls) in results.items():
+        print(f"{name}: {frame_ms:.2f} ms per frame" + (f", {calls:.0f} canvas calls per frame" if calls else ""))
+    return results
+
+
+if __name__ == "__main__":
+    measure_frame_times()
@@ -0,0 +1,168 @@
+import re
+
+try:
+    import numpy as np
+except ImportError:  # Only the array helpers need NumPy
+    np = None
+
+
+mask = (1 << 64) - 1
+tie_policies = ("empty", "keep", "random")  # What a cell becomes when several teams have the most neighbours
+tie_descriptions = {
+    "empty": "Leave the cell empty",
+    "keep": "Keep the cell's colour, a birth stays empty",
+    "random": "Pick one of the tied teams at random from the seed",
+}
+presets = {
+    "Life": "B3/S23",
+    "HighLife": "B36/S23",
+    "Day & Night": "B3678/S34678",
+    "Maze": "B3/S12345",
+    "Seeds": "B2/S",
+    "Move": "B368/S245",
+    "2x2": "B36/S125",
+}
+rule_pattern = re.compile(r"^B([0-8]*)/?S([0-8]*)$|^S([0-8]*)/?B([0-8]*)$")
+random_tie = 3  # Table entry of a cell that comes alive on a tie and takes the colour of its coin
+
+
+# Birth and survival counts plus a tie policy, compiled into a lookup table of the next state of a cell.
+# Entry own * 81 + blue * 9 + red holds the next state of a cell in state own (0 empty, 1 blue, 2 red) with that
+# many blue and red neighbours, as 0, 1, 2 or random_tie. The table is 256 bytes so any uint8 index is valid.
+class Rule:
+    def __init__(self, birth=(3,), survival=(2, 3), tie="empty", seed=0):
+        self.birth = frozenset(birth)
+        self.survival = frozenset(survival)
+        if not self.birth | self.survival <= set(range(9)):
+            raise ValueError("Neighbour counts go from 0 to 8.")
+        if 0 in self.birth:
+            raise ValueError("Rules where empty cells with no neighbours come alive (B0) are not supported.")
+        if tie not in tie_policies:
+            raise ValueError(f"Unknown tie policy '{tie}', choose from {', '.join(tie_policies)}.")
+        self.tie = tie
+        self.seed = seed
+        self.table = self.compile()
+        self.life = self.compile_life()
+
+    def compile(self):
+        table = bytearray(256)
+        for own in range(3):
+            counts = self.survival if own else self.birth
+            for blue in range(9):
+                for red in range(9 - blue):
+                    if blue + red not in counts:
+                        continue
+                    if blue != red:
+                        state = 1 if blue > red else 2
+                    elif self.tie == "keep":
+                        state = own
+                    elif self.tie == "random":
+                        state = random_tie
+                    else:
+                        state = 0
+                    table[own * 81 + blue * 9 + red] = state
+        return bytes(table)
+
+    # Whether a cell is alive next generation, entry alive * 9 + live neighbours, for boards of more than two teams
+    # whose tie rule is applied apart (see engine.TeamEngine)
+    def compile_life(self):
+        table = bytearray(256)
+        for count in self.birth:
+            table[count] = 1
+        for count in self.survival:
+            table[9 + count] = 1
+        return bytes(table)
+
+    @property
+    def random_ties(self):
+        return self.tie == "random"
+
+    # B/S notation, like B36/S23
+    @property
+    def notation(self):
+        return f"B{''.join(map(str, sorted(self.birth)))}/S{''.join(map(str, sorted(self.survival)))}"
+
+    def __str__(self):
+        if self.tie == "random":
+            return f"{self.notation}, random ties (seed {self.seed})"
+        return f"{self.notation}, ties {self.tie}" if self.tie != "empty" else self.notation
+
+    def key(self):
+        return self.birth, self.survival, self.tie, self.seed if self.random_ties else None
+
+    def __eq__(self, other):
+        return isinstance(other, Rule) and self.key() == other.key()
+
+    def __hash__(self):
+        return hash(self.key())
+
+    # Colour code of every cell of a width x height torus whose tie is settled at random
+    def coin_array(self, width, height):
+        ys, xs = np.mgrid[0:height, 0:width]
+        return coins(xs, ys, self.seed)
+
+
+standard_rule = Rule()
+
+
+# Rule from B/S notation (B36/S23, S23/B36 or without the slash) or the name of a preset
+def parse_rule(text, tie="empty", seed=0):
+    text = text.strip()
+    compact = text.upper().replace(" ", "")
+    preset = next((value for name, value in presets.items() if name.upper().replace(" ", "") == compact), None)
+    match = rule_pattern.match(preset or compact)
+    if match is None:
+        raise ValueError(f"Unknown rule '{text}', use B/S notation like B36/S23 or one of: {', '.join(presets)}.")
+    birth, survival = (match.group(1), match.group(2)) if match.group(1) is not None else (match.group(4),
+                                                                                          match.group(3))
+    return Rule(map(int, birth), map(int, survival), tie, seed)
+
+
+# Random 64-bit value of the position (x, y) under a seed, a splitmix64 mix. A tie between k teams there goes to
+# the tied team at index value % k, in team order.
+def tie_hash(x, y, seed):
+    z = (((y << 32) | (x & 0xFFFFFFFF)) ^ (seed * 0x9E3779B97F4A7C15)) & mask
+    z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & mask
+    z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & mask
+    return z ^ (z >> 31)
+
+
+# tie_hash for arrays of positions at once
+def tie_hashes(xs, ys, seed):
+    z = ((np.asarray(ys, dtype=np.int64) << 32) | (np.asarray(xs, dtype=np.int64) & 0xFFFFFFFF)).view(np.uint64)
+    z = z ^ np.uint64(seed * 0x9E3779B97F4A7C15 & mask)
+    z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return z ^ (z >> np.uint64(31))
+
+
+# Colour a tie between blue and red at (x, y) resolves to under a seed, 1 blue or 2 red
+def coin(x, y, seed):
+    return 1 + (tie_hash(x, y, seed) & 1)
+
+
+# coin for arrays of positions at once
+def coins(xs, ys, seed):
+    return (1 + (tie_hashes(xs, ys, seed) & np.uint64(1))).astype(np.uint8)
+
+
+# Table entries of a uint8 array of table indices. bytes.translate is a 256 byte lookup in C, several times
+# faster than gathering with NumPy, which widens the indices first.
+def lookup(table, index):
+    return np.frombuffer(index.tobytes().translate(table), dtype=np.uint8).reshape(index.shape)
+
+
+# --rule, --tie and --tie-seed options of the command line tools
+def add_rule_arguments(parser):
+    parser.add_argument("--rule", default="B3/S23",
+                        help=f"Birth and survival counts in B/S notation, or one of: {', '.join(presets)}")
+    parser.add_argument("--tie", choices=tie_policies, default="empty",
+                        help="What a cell that lives becomes when several teams have the most neighbours")
+    parser.add_argument("--tie-seed", type=int, default=0, help="Seed of the colours picked with --tie random")
+
+
+def rule_from_arguments(parser, args):
+    try:
+        return parse_rule(args.rule, args.tie, args.tie_seed)
+    except ValueError as error:
+        parser.error(str(error))
@@ -0,0 +1,202 @@
+import argparse
+import os
+import time
+import weakref
+from multiprocessing import Pipe, Process, shared_memory
+import numpy as np
+from cycles import cell_keys
+from rules import coins, lookup, random_tie, standard_rule
+
+
+# One worker owns rows start to end - 1. Each generation it reads its strip plus the row above and below
+# straight from the shared source buffer (the halo) and writes its new rows into the other buffer.
+def strip_worker(memory_name, width, height, start, end, connection, rule):
+    memory = shared_memory.SharedMemory(name=memory_name)
+    boards = np.ndarray((2, 2, height, width), dtype=np.uint8, buffer=memory.buf)  # [buffer, team, y, x]
+    rows = np.arange(start - 1, end + 1) % height
+    ys = np.arange(start, end)
+    strip_coins = coins(*np.meshgrid(np.arange(width), ys), rule.seed) if rule.random_ties else None
+
+    while True:
+        source = connection.recv()
+        if source is None:
+            break
+
+        blue = boards[source, 0][rows]
+        red = boards[source, 1][rows]
+        old_blue = blue[1:-1]
+        old_red = red[1:-1]
+        states = lookup(rule.table, strip_neighbor_sum(9 * blue + red) + 81 * old_blue + 162 * old_red)
+        if strip_coins is not None:
+            states = np.where(states == random_tie, strip_coins, states)
+        new_blue = (states == 1).view(np.uint8)
+        new_red = (states == 2).view(np.uint8)
+        boards[1 - source, 0, start:end] = new_blue
+        boards[1 - source, 1, start:end] = new_red
+
+        # Zobrist hash delta of the strip, the old colour of every changed cell goes out and the new one comes in
+        strip_y, strip_x = np.nonzero((new_blue != old_blue) | (new_red != old_red))
+        old_codes = old_blue[strip_y, strip_x] + 2 * old_red[strip_y, strip_x]
+        new_codes = new_blue[strip_y, strip_x] + 2 * new_red[strip_y, strip_x]
+        hash_delta = 0
+        for codes in (old_codes, new_codes):
+            live = codes != 0
+            if live.any():
+                keys = cell_keys(strip_x[live], ys[strip_y[live]], codes[live])
+                hash_delta ^= int(np.bitwise_xor.reduce(keys))
+
+        connection.send((len(strip_y), hash_delta, int(new_blue.sum()), int(new_red.sum())))
+
+    memory.close()
+
+
+# Neighbour counts of the middle rows of a strip that has one halo row above and below
+def strip_neighbor_sum(rows):
+    columns = rows[:-2] + rows[1:-1] + rows[2:]
+    return columns + np.roll(columns, 1, axis=1) + np.roll(columns, -1, axis=1) - rows[1:-1]
+
+
+def shutdown(processes, connections, memory):
+    for connection in connections:
+        try:
+            connection.send(None)
+        except (BrokenPipeError, OSError):
+            pass
+    for process in processes:
+        process.join(timeout=5)
+    memory.close()
+    memory.unlink()
+
+
+# Multi-core engine, the torus is split into horizontal strips, one worker process each, all sharing the board
+class ShardedEngine:
+    name = "sharded"
+    colors = (None, "blue", "red")
+
+    def __init__(self, width, height, rule=None, workers=None):
+        self.width = width
+        self.height = height
+        self.rule = rule or standard_rule
+        workers = max(1, min(workers or os.cpu_count() or 1, height))
+
+        # Two copies of the board, workers read one and write the other, then they swap
+        self.memory = shared_memory.SharedMemory(create=True, size=2 * 2 * height * width)
+        self.boards = np.ndarray((2, 2, height, width), dtype=np.uint8, buffer=self.memory.buf)
+        self.boards[:] = 0
+        self.current = 0
+
+        self.connections = []
+        self.processes = []
+        for index in range(workers):
+            start, end = height * index // workers, height * (index + 1) // workers
+            parent_end, child_end = Pipe()
+            process = Process(target=strip_worker,
+                              args=(self.memory.name, width, height, start, end, child_end, self.rule), daemon=True)
+            process.start()
+            self.connections.append(parent_end)
+            self.processes.append(process)
+        self.finalizer = weakref.finalize(self, shutdown, self.processes, self.connections, self.memory)
+
+    def close(self):
+        self.finalizer()
+
+    @property
+    def blue(self):
+        return self.boards[self.current, 0]
+
+    @property
+    def red(self):
+        return self.boards[self.current, 1]
+
+    def load(self, live_cells):
+        self.boards[self.current] = 0
+        for (x, y), color in live_cells.items():
+            if color == "blue":
+                self.blue[y % self.height, x % self.width] = 1
+            elif color == "red":
+                self.red[y % self.height, x % self.width] = 1
+
+    def apply(self, changes):
+        for (x, y), color in changes.items():
+            self.blue[y, x] = color == "blue"
+            self.red[y, x] = color == "red"
+
+    def cells(self):
+        live_cells = {}
+        for color, board in (("blue", self.blue), ("red", self.red)):
+            ys, xs = np.nonzero(board)
+            for x, y in zip(xs.tolist(), ys.tolist()):
+                live_cells[(x, y)] = color
+        return live_cells
+
+    def snapshot(self):
+        return self.blue.tobytes(), self.red.tobytes()
+
+    def restore(self, snapshot):
+        blue, red = snapshot
+        self.blue[:] = np.frombuffer(blue, dtype=np.uint8).reshape(self.height, self.width)
+        self.red[:] = np.frombuffer(red, dtype=np.uint8).reshape(self.height, self.width)
+
+    def population(self):
+        return int(self.blue.sum()), int(self.red.sum())
+
+    # Advances one generation on all workers and reduces their results,
+    # returns (changed cells, Zobrist hash delta, blue count, red count) without touching single cells here
+    def step_summary(self):
+        for connection in self.connections:
+            connection.send(self.current)
+        results = [connection.recv() for connection in self.connections]
+        self.current = 1 - self.current
+
+        changed = hash_delta = blue_count = red_count = 0
+        for strip_changed, strip_hash, strip_blue, strip_red in results:
+            changed += strip_changed
+            hash_delta ^= strip_hash
+            blue_count += strip_blue
+            red_count += strip_red
+        return changed, hash_delta, blue_count, red_count
+
+    # Goes back to the board before the last step, the other buffer still holds it
+    def undo(self):
+        self.current = 1 - self.current
+
+    def step(self):
+        self.step_summary()
+        old_blue, old_red = self.boards[1 - self.current]
+        new_blue, new_red = self.blue, self.red
+        ys, xs = np.nonzero((new_blue != old_blue) | (new_red != old_red))
+        codes = (new_blue[ys, xs] + 2 * new_red[ys, xs]).tolist()
+        return {(x, y): self.colors[code] for x, y, code in zip(xs.tolist(), ys.tolist(), codes)}
+
+
+# Generations per second of a random board for each worker count
+def measure_scaling(width=4000, height=4000, generations=20, worker_counts=(1, 2, 4, 8), density=0.3, seed=1):
+    rng = np.random.default_rng(seed)
+    left = rng.random((height, width)) < density
+    blue = left & (np.arange(width) < width // 2)
+    red = left & ~blue
+
+    results = {}
+    for workers in worker_counts:
+        engine = ShardedEngine(width, height, workers=workers)
+        engine.blue[:] = blue
+        engine.red[:] = red
+        engine.step_summary()  # Warm up the workers
+        start = time.perf_counter()
+        for _ in range(generations):
+            engine.step_summary()
+        results[workers] = generations / (time.perf_counter() - start)
+        engine.close()
+        print(f"{workers} workers: {results[workers]:.2f} gens/sec "
+              f"({results[workers] / results[worker_counts[0]]:.2f}x)")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scaling benchmark for the sharded engine")
+    parser.add_argument("--width", type=int, default=4000)
+    parser.add_argument("--height", type=int, default=4000)
+    parser.add_argument("--generations", type=int, default=20)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = parser.parse_args()
+    measure_scaling(args.width, args.height, args.generations, tuple(args.workers))
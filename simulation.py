@@ -0,0 +1,349 @@
+import random
+from bisect import bisect_right
+from cycles import CycleDetector, board_hash, update_hash
+from engine import default_engine, generate_board, make_engine
+from profiling import Profiler
+from rules import standard_rule
+from teams import match_teams, mirrored_teams, region_dividers, team_names
+from timeseries import PopulationSeries
+
+
+# Reasons a match can stop, printed by the GUI and the headless runner
+stop_messages = {
+    "loop": "Infinite loop detected. Simulation stopped.",
+    "stable": "No changes detected. Simulation stopped.",
+    "extinct": "A team has no cells left. Simulation stopped.",
+}
+
+winner_messages = {**{team: f"{team.capitalize()} wins!" for team in team_names}, "tie": "It's a tie!"}
+
+
+# Display-free core of the game, owns the board, the step rule, loop detection and the winner
+class Simulation:
+    def __init__(self, width, height, engine_name=default_engine, history_capacity=1 << 14, track_cells=True,
+                 profiler=None, series_capacity=1 << 12, rule=None, teams=2):
+        self.width = width
+        self.height = height
+        self.engine_name = engine_name
+        self.rule = rule or standard_rule  # Birth and survival counts and tie policy, see rules.Rule
+        self.teams = match_teams(teams)  # Team names in team order, blue and red unless more teams play
+        self.engine = make_engine(engine_name, width, height, self.rule, teams)  # Computes the next generation
+        # Columns where the region of each team after the first starts. With two teams cells left of the divider
+        # belong to blue and the rest to red, more teams get strips of equal width.
+        self.dividers = region_dividers(width, teams)
+        # Without tracking the board only lives in the engine, which reports counts and hash deltas itself
+        # (step_summary), so very large boards never go through Python dictionaries
+        self.track_cells = track_cells
+        self.live_cells = {}
+        self.populations = (0,) * teams  # Cells of each team, kept up to date from the changes of every step and edit
+        self.series = PopulationSeries(series_capacity, self.teams)  # Populations and changes of recent generations
+        self.state_hash = 0  # Zobrist hash of live_cells, updated from the births and deaths of each step
+        self.cycles = CycleDetector(history_capacity)  # Bounded hash -> generation history
+        self.generation_count = 0
+        self.stop_reason = None  # Set to a key of stop_messages when the match ends
+        self.period = None  # Oscillation period and first generation of the loop, once one is found
+        self.cycle_start = None
+        self.profiler = profiler or Profiler()  # Disabled unless one is passed in
+        self.recorder = None  # recording.Recorder that gets every generation of the match, tracked mode only
+        self.seed = None  # Seed of the random starting board, to play the same match again
+
+    # The line between blue and red in a two-team match
+    @property
+    def divider(self):
+        return self.dividers[0]
+
+    @property
+    def finished(self):
+        return self.stop_reason is not None
+
+    # False when the engine plays on an unbounded plane, cells are then never wrapped around the board
+    @property
+    def bounded(self):
+        return getattr(self.engine, "bounded", True)
+
+    def resize(self, width, height):
+        engine = make_engine(self.engine_name, width, height, self.rule, len(self.teams))
+        if hasattr(self.engine, "close"):
+            self.engine.close()
+        self.width = width
+        self.height = height
+        self.engine = engine
+        self.dividers = region_dividers(width, len(self.teams))
+        self.clear()
+
+    # Plays on under another rule from the current board, the match starts again from it
+    def set_rule(self, rule):
+        engine = make_engine(self.engine_name, self.width, self.height, rule, len(self.teams))  # Raises first
+        engine.load(self.engine.cells())
+        if hasattr(self.engine, "close"):
+            self.engine.close()
+        self.rule = rule
+        self.engine = engine
+        self.restart()
+
+    # Starts over on an empty board with another number of teams, on the given engine if it must change
+    def set_teams(self, count, engine_name=None):
+        if self.recorder is not None and count != 2:
+            raise ValueError("Only two-team matches can be recorded.")
+        engine_name = engine_name or self.engine_name
+        engine = make_engine(engine_name, self.width, self.height, self.rule, count)  # Raises before anything changes
+        if hasattr(self.engine, "close"):
+            self.engine.close()
+        self.engine_name = engine_name
+        self.engine = engine
+        self.teams = match_teams(count)
+        self.dividers = region_dividers(self.width, count)
+        self.series = PopulationSeries(self.series.capacity, self.teams)
+        self.clear()
+
+    # Starts a new match from the given board
+    def reset(self, live_cells):
+        self.seed = None
+        self.engine.load(live_cells)
+        self.state_hash = board_hash(live_cells)
+        self.live_cells = dict(live_cells) if self.track_cells else {}
+        self.populations = self.engine.population()
+        self.restart()
+
+    # Forgets the history so the match starts again from the current board, called after every edit
+    def restart(self):
+        self.cycles.clear()
+        self.cycles.check(self.state_hash, 0)
+        self.generation_count = 0
+        self.stop_reason = None
+        self.period = None
+        self.cycle_start = None
+        self.series.clear()
+        self.series.append(0, self.populations)
+        if self.recorder is not None:
+            self.recorder.restart(self.live_cells, self.width, self.height)
+
+    def clear(self):
+        self.reset({})
+
+    # Records the match from now on, every restart starts the recording over
+    def record(self, recorder):
+        if recorder is not None and not self.track_cells:
+            raise ValueError("Only a simulation that tracks its cells can be recorded.")
+        if recorder is not None and not self.bounded:
+            raise ValueError("A match on an unbounded plane can't be recorded.")
+        if recorder is not None and len(self.teams) != 2:
+            raise ValueError("Only two-team matches can be recorded.")
+        self.recorder = recorder
+        if recorder is not None:
+            recorder.restart(self.live_cells, self.width, self.height)
+
+    # Fills the region of each team at random with the same number of cells, a new seed is drawn when none is given
+    def randomize(self, seed=None, density=0.5):
+        if seed is None:
+            seed = random.randrange(1 << 32)
+        self.reset(generate_board(self.width, self.height, density, seed, self.divider, len(self.teams)))
+        self.seed = seed
+
+    # Team whose region holds column x
+    def team_at(self, x):
+        return self.teams[bisect_right(self.dividers, x)]
+
+    # Moves the line between the two sides, the cells already on the board keep their team
+    def set_divider(self, x):
+        self.dividers[0] = x
+
+    # Applies a batch of {(x, y): colour or None} edits and starts a new match, returns the cells that changed
+    def apply_edits(self, edits):
+        current = self.live_cells if self.track_cells else self.engine.cells()
+        changes = {cell: color for cell, color in edits.items() if current.get(cell) != color}
+        self.state_hash = update_hash(self.state_hash, current, changes)
+        if self.track_cells:
+            self.track_changes(changes)
+            self.engine.apply(changes)
+        else:
+            self.engine.apply(changes)
+            self.populations = self.engine.population()
+        self.restart()
+        return changes
+
+    def toggle_cell(self, x, y):
+        return self.apply_edits({(x, y): None if (x, y) in self.live_cells else self.team_at(x)})
+
+    def paint_cell(self, x, y):
+        return self.apply_edits({(x, y): self.team_at(x)})
+
+    # Cells covered by a pattern with its top left corner at (x, y), mirrored when placed by red or every second
+    # team after it (see teams.mirrored_teams)
+    def pattern_cells(self, pattern, x, y):
+        if self.team_at(x) in mirrored_teams:
+            max_x = max(dx for dx, dy in pattern)
+            inverted_pattern = [(max_x - dx, dy) for dx, dy in pattern]
+            pattern = inverted_pattern
+        return self.stamp_cells(pattern, x, y, self.team_at(x))
+
+    # Cells of offsets that are already turned the right way (see PatternStore.offsets), wrapped around the torus
+    def stamp_cells(self, offsets, x, y, color):
+        if not self.bounded:
+            return {(x + dx, y + dy): color for dx, dy in offsets}
+        width, height = self.width, self.height
+        return {((x + dx) % width, (y + dy) % height): color for dx, dy in offsets}
+
+    # Places many patterns as one batch of edits, stamps are (offsets, x, y, colour), returns the changed cells
+    def stamp_many(self, stamps):
+        edits = {}
+        for offsets, x, y, color in stamps:
+            edits.update(self.stamp_cells(offsets, x, y, color))
+        return self.apply_edits(edits)
+
+    def place_pattern(self, pattern, x, y):
+        return self.apply_edits(self.pattern_cells(pattern, x, y))
+
+    # Advances one generation, returns the changed cells or None if the match stopped on a loop
+    def step(self):
+        self.stop_reason = None
+        with self.profiler.span("engine"):
+            if self.track_cells:
+                changes = self.engine.step()
+                changed = len(changes)
+            else:
+                changes = {}
+                changed, hash_delta, blue_count, red_count = self.engine.step_summary()
+        self.profiler.count("touched", changed)
+
+        # Nothing changed, the board is a still life
+        if not changed:
+            self.stop("stable", 1, self.generation_count)
+            return None
+
+        # Check if the new state is a recurrence, verifying the whole board when the hash repeats
+        with self.profiler.span("hash"):
+            if self.track_cells:
+                new_hash = update_hash(self.state_hash, self.live_cells, changes)
+            else:
+                new_hash = self.state_hash ^ hash_delta
+            seen_at = self.cycles.check(new_hash, self.generation_count + 1)
+            if seen_at is not None:
+                period = self.generation_count + 1 - seen_at
+                if self.verify_cycle(period):
+                    # Undo the step
+                    if self.track_cells:
+                        self.engine.apply({cell: self.live_cells.get(cell) for cell in changes})
+                    else:
+                        self.engine.undo()
+                    self.stop("loop", period, seen_at)
+                    return None
+
+        if self.track_cells:
+            self.profiler.count_changes(changes, self.live_cells)
+            if self.recorder is not None:
+                self.recorder.write_delta(self.generation_count + 1, changes, self.live_cells)
+            gained, lost = self.track_changes(changes)
+        else:
+            # The engine only reports totals, the series gets the net change of each team
+            old_blue, old_red = self.populations
+            self.populations = (blue_count, red_count)
+            gained = {"blue": max(0, blue_count - old_blue), "red": max(0, red_count - old_red)}
+            lost = {"blue": max(0, old_blue - blue_count), "red": max(0, old_red - red_count)}
+        self.state_hash = new_hash
+        self.generation_count += 1
+        self.series.append(self.generation_count, self.populations, gained, lost)
+        if self.recorder is not None and self.generation_count % self.recorder.keyframe_interval == 0:
+            self.recorder.write_keyframe(self.generation_count, self.live_cells)
+
+        # Check if at most one team has cells left
+        if self.generation_count > 1 and self.wiped_out():
+            self.stop("extinct")
+        return changes
+
+    # Applies changes to live_cells and the populations, returns two {team: cells} dicts of what each team
+    # gained and lost. A cell that changes colour is lost by one team and gained by the other.
+    def track_changes(self, changes):
+        live_cells = self.live_cells
+        gained = dict.fromkeys(self.teams, 0)
+        lost = dict.fromkeys(self.teams, 0)
+        for cell, color in changes.items():
+            old_color = live_cells.pop(cell, None)  # Cell dies or changes colour
+            if old_color is not None:
+                lost[old_color] += 1
+            if color is not None:
+                live_cells[cell] = color  # Cell is born or changes colour
+                gained[color] += 1
+        self.populations = tuple(count + gained[team] - lost[team] for team, count in zip(self.teams, self.populations))
+        return gained, lost
+
+    def stop(self, reason, period=None, cycle_start=None):
+        self.stop_reason = reason
+        self.period = period
+        self.cycle_start = cycle_start
+
+    # Replays one period from the next board and checks it comes back to the same board. The engine plays it itself
+    # and is put back afterwards, so engines with worker pools or shared memory don't build a second set.
+    def verify_cycle(self, period):
+        snapshot = self.engine.snapshot()  # The engine already holds the next board
+        step = getattr(self.engine, "step_summary", self.engine.step)
+        for _ in range(period):
+            step()
+        same = self.engine.snapshot() == snapshot
+        self.engine.restore(snapshot)
+        return same
+
+    # Describes how the match ended, for the winner splash and the headless runner
+    def stop_details(self):
+        if self.stop_reason == "stable":
+            return f"Stable state reached at gen {self.cycle_start}"
+        elif self.stop_reason == "loop":
+            return f"Period-{self.period} loop reached at gen {self.cycle_start}"
+        elif self.stop_reason == "extinct":
+            return f"A team was wiped out at gen {self.generation_count}"
+        return None
+
+    # Jumps ahead without checking each generation for loops, engines that can (hashlife) skip many at once
+    def fast_forward(self, generations):
+        advance = getattr(self.engine, "advance", None)
+        if advance is None:
+            return self.run(generations)
+
+        changes = advance(generations)
+        self.state_hash = update_hash(self.state_hash, self.live_cells, changes)
+        gained, lost = self.track_changes(changes)
+        self.generation_count += generations
+        self.series.append(self.generation_count, self.populations, gained, lost)
+        if self.recorder is not None:  # The generations in between were never computed one by one
+            self.recorder.write_keyframe(self.generation_count, self.live_cells)
+
+        if self.generation_count > 1 and self.wiped_out():
+            self.stop("extinct")
+        return generations
+
+    # Steps until the match ends or the generation limit is reached, returns the generations played
+    def run(self, generations=None):
+        played = 0
+        while generations is None or played < generations:
+            if self.step() is not None:
+                played += 1
+                self.profiler.end_generation(self.generation_count)
+            if self.finished:
+                break
+        return played
+
+    # Cells of each team in team order, (blue, red) in a two-team match
+    def counts(self):
+        return self.populations
+
+    # True when no more than one team has cells left
+    def wiped_out(self):
+        return len(self.populations) - self.populations.count(0) <= 1
+
+    # Returns the team with the most cells or "tie" when several have the most, or None if the match has not
+    # really started
+    def outcome(self):
+        if self.generation_count <= 1:
+            return None
+
+        counts = self.counts()
+        if len(counts) == 2 and not any(counts):  # Blue and red dying out together has always been a red win
+            return "red"
+        most = max(counts)
+        if counts.count(most) > 1:
+            return "tie"
+        return self.teams[counts.index(most)]
+
+    # Returns the winner announcement, or None if the match has not really started
+    def winner(self):
+        return winner_messages.get(self.outcome())
@@ -0,0 +1,402 @@
+import argparse
+import asyncio
+import multiprocessing
+import socket
+import time
+from cycles import board_hash
+from engine import available_engines, default_engine
+from recording import (apply_delta, delta_indices, delta_payload, header, index_type, keyframe_cells,
+                       keyframe_payload, magic, record_header, version)
+from simulation import Simulation
+
+# A spectator that connects over TCP is sent the header of a recording file, then records like the ones of a
+# recording (see recording.py): first the latest keyframe and the deltas since, so it has the board at once,
+# then every generation as it is played. Spectators send nothing. One whose send buffer grows past the limit
+# is skipped until the next keyframe, so slow spectators never hold up the match and resume from a whole board.
+default_port = 8765
+
+
+class Spectator:
+    def __init__(self, writer):
+        self.writer = writer
+        self.transport = writer.transport
+        self.waiting = False  # Fell behind, nothing is sent until the next keyframe
+        self.skipped = 0  # Records not sent because of that
+
+
+# Gets every generation of a match like a recording.Recorder does and sends it to all spectators.
+# The records are encoded once and the same bytes are written to every spectator's transport.
+class Broadcaster:
+    def __init__(self, width, height, keyframe_interval=64, buffer_limit=1 << 18, send_buffer=1 << 16):
+        self.width = width
+        self.height = height
+        self.keyframe_interval = keyframe_interval
+        self.buffer_limit = buffer_limit  # Bytes waiting to be sent to a spectator before it is skipped
+        self.send_buffer = send_buffer  # Socket send buffer of each spectator, 0 leaves the system default
+        self.spectators = set()
+        self.catch_up = []  # Latest keyframe record and the delta records since, sent to spectators as they join
+        self.records = 0
+        self.bytes_sent = 0
+        self.fell_behind = 0  # Times a spectator was skipped until the next keyframe
+        self.skipped = 0  # Records not sent to spectators that were behind
+        self.peak_spectators = 0
+
+    # A new match. The board size is part of the header the spectators got when they joined, so it stays.
+    def restart(self, live_cells, width=None, height=None):
+        self.write_keyframe(0, live_cells)
+
+    def write_keyframe(self, generation, live_cells):
+        payload = keyframe_payload(self.width, self.height, live_cells)
+        record = record_header.pack(b"K", generation, len(payload)) + payload
+        self.catch_up = [record]
+        self.broadcast(record, True)
+
+    def write_delta(self, generation, changes, old_cells):
+        payload = delta_payload(self.width, self.height, changes, old_cells)
+        record = record_header.pack(b"D", generation, len(payload)) + payload
+        self.catch_up.append(record)
+        self.broadcast(record, False)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        for spectator in self.spectators:
+            spectator.writer.close()
+        self.spectators.clear()
+
+    def join(self, writer):
+        connection = writer.get_extra_info("socket")
+        if connection is not None and self.send_buffer:
+            # The kernel would otherwise grow its buffer to megabytes and hide a stalled spectator for long
+            connection.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, self.send_buffer)
+        spectator = Spectator(writer)
+        writer.write(header.pack(magic, version, self.width, self.height, self.keyframe_interval) +
+                     b"".join(self.catch_up))
+        self.spectators.add(spectator)
+        self.peak_spectators = max(self.peak_spectators, len(self.spectators))
+        return spectator
+
+    def leave(self, spectator):
+        self.spectators.discard(spectator)
+
+    def broadcast(self, record, keyframe):
+        self.records += 1
+        for spectator in self.spectators:
+            transport = spectator.transport
+            if transport.is_closing():
+                continue
+            behind = transport.get_write_buffer_size() > self.buffer_limit
+            if behind and not spectator.waiting:
+                spectator.waiting = True
+                self.fell_behind += 1
+            if spectator.waiting:
+                if behind or not keyframe:
+                    spectator.skipped += 1
+                    self.skipped += 1
+                    continue
+                spectator.waiting = False
+            transport.write(record)
+            self.bytes_sent += len(record)
+
+
+# Plays random matches one after another at a fixed rate and streams them to every spectator that connects
+class SpectatorServer:
+    def __init__(self, simulation, broadcaster, rate=60, density=0.5, restart_delay=1.0, keep_hashes=False):
+        self.simulation = simulation
+        self.broadcaster = broadcaster
+        self.rate = rate  # Generations per second
+        self.density = density
+        self.restart_delay = restart_delay  # Seconds the final board of a match stays up
+        self.generations = 0  # Generations played since the server started
+        self.hashes = {} if keep_hashes else None  # generation -> board hash of the current match, for checks
+        self.server = None
+        simulation.record(broadcaster)
+
+    # Starts listening, returns the port, which is picked by the system when port is 0
+    async def start(self, host="127.0.0.1", port=default_port):
+        self.server = await asyncio.start_server(self.handle, host, port)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def handle(self, reader, writer):
+        spectator = self.broadcaster.join(writer)
+        try:
+            while await reader.read(1024):  # Reading only finds out when the spectator leaves
+                pass
+        except ConnectionError:
+            pass
+        finally:
+            self.broadcaster.leave(spectator)
+            writer.close()
+
+    def new_match(self):
+        self.simulation.randomize(density=self.density)
+        if self.hashes is not None:
+            self.hashes = {0: self.simulation.state_hash}
+
+    # Steps the match rate times per second until cancelled. When the server falls behind it plays on
+    # from the current time instead of rushing to catch up.
+    async def play(self):
+        loop = asyncio.get_running_loop()
+        simulation = self.simulation
+        if self.hashes is not None:
+            self.hashes = {simulation.generation_count: simulation.state_hash}
+        next_step = loop.time()
+        while True:
+            if simulation.finished:
+                await asyncio.sleep(self.restart_delay)
+                self.new_match()
+                next_step = loop.time()
+            if simulation.step() is not None:
+                self.generations += 1
+                if self.hashes is not None:
+                    self.hashes[simulation.generation_count] = simulation.state_hash
+            next_step += 1 / self.rate
+            delay = next_step - loop.time()
+            if delay < 0:
+                next_step = loop.time()
+            await asyncio.sleep(max(0.0, delay))
+
+    async def close(self):
+        self.broadcaster.close()
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+
+
+# Reference client, rebuilds the board from the bytes of the stream. With rebuild off it only checks the
+# records, which is what most clients of the load test do.
+class Viewer:
+    def __init__(self, rebuild=True):
+        self.rebuild = rebuild
+        self.buffer = bytearray()
+        self.width = self.height = None
+        self.typecode = None
+        self.live_cells = {}
+        self.generation = None  # Generation of the board, None until the first keyframe
+        self.keyframes = 0
+        self.deltas = 0
+        self.gaps = 0  # Deltas that did not follow the previous generation, the board is wrong until a keyframe
+        self.received = 0  # Bytes
+
+    # Applies every complete record of the bytes received so far
+    def feed(self, data):
+        self.received += len(data)
+        buffer = self.buffer
+        buffer += data
+        offset = 0
+        if self.width is None:
+            if len(buffer) < header.size:
+                return
+            found, stream_version, self.width, self.height, _ = header.unpack_from(buffer, 0)
+            if found != magic or stream_version != version:
+                raise ValueError("Not a match stream.")
+            self.typecode = index_type(self.width, self.height)
+            offset = header.size
+        while offset + record_header.size <= len(buffer):
+            kind, generation, length = record_header.unpack_from(buffer, offset)
+            start = offset + record_header.size
+            if start + length > len(buffer):
+                break
+            self.apply(kind, generation, bytes(buffer[start:start + length]) if self.rebuild else None)
+            offset = start + length
+        del buffer[:offset]
+
+    def apply(self, kind, generation, payload):
+        if kind == b"K":
+            self.keyframes += 1
+            self.generation = generation
+            if self.rebuild:
+                self.live_cells = keyframe_cells(payload, self.width)
+            return
+        self.deltas += 1
+        if self.generation is None:
+            return
+        if generation != self.generation + 1:
+            self.gaps += 1
+            self.generation = None
+            return
+        self.generation = generation
+        if self.rebuild:
+            apply_delta(self.live_cells, delta_indices(payload, self.typecode), self.width)
+
+    def counts(self):
+        blue = sum(1 for color in self.live_cells.values() if color == "blue")
+        return blue, len(self.live_cells) - blue
+
+
+# Watches a server for the given seconds or until it closes the connection, on_second is called every second
+async def watch(viewer, host="127.0.0.1", port=default_port, seconds=None, on_second=None):
+    reader, writer = await asyncio.open_connection(host, port)
+    await follow(viewer, reader, writer, seconds, on_second)
+
+
+async def follow(viewer, reader, writer, seconds=None, on_second=None):
+    loop = asyncio.get_running_loop()
+    end = None if seconds is None else loop.time() + seconds
+    next_report = loop.time() + 1
+    try:
+        while end is None or loop.time() < end:
+            timeout = 1.0 if end is None else min(1.0, max(0.0, end - loop.time()))
+            try:
+                data = await asyncio.wait_for(reader.read(1 << 16), timeout)
+            except asyncio.TimeoutError:
+                data = None
+            if data == b"":
+                break
+            if data:
+                viewer.feed(data)
+            if on_second is not None and loop.time() >= next_report:
+                on_second(viewer)
+                next_report += 1
+    finally:
+        writer.close()
+
+
+# Connection whose receive buffer is kept small, so a client that stops reading falls behind within seconds
+async def open_small_connection(host, port, receive_buffer=4096):
+    connection = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    connection.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, receive_buffer)
+    connection.setblocking(False)
+    await asyncio.get_running_loop().sock_connect(connection, (host, port))
+    return await asyncio.open_connection(sock=connection)
+
+
+# Clients of a load test, run in their own process so they do not share the server's event loop. All of them
+# connect first, results gets "connected" and then they watch for the given seconds. The first verify clients
+# rebuild the board and report its hash, the stalled ones never read.
+def run_swarm(host, port, clients, verify, stalled, seconds, results):
+    async def swarm():
+        connections = []
+        for first in range(0, clients + stalled, 50):  # A few at a time, the listen backlog is short
+            connections += await asyncio.gather(*(
+                asyncio.open_connection(host, port) if index < clients else open_small_connection(host, port)
+                for index in range(first, min(clients + stalled, first + 50))
+            ))
+        results.put("connected")
+
+        viewers = [Viewer(rebuild=index < verify) for index in range(clients)]
+        await asyncio.gather(*(follow(viewer, *connection, seconds) for viewer, connection in zip(viewers, connections)),
+                             asyncio.sleep(seconds), return_exceptions=True)
+        for _, writer in connections[clients:]:
+            writer.close()
+        return [{
+            "generation": viewer.generation,
+            "hash": board_hash(viewer.live_cells) if viewer.rebuild and viewer.generation is not None else None,
+            "keyframes": viewer.keyframes,
+            "deltas": viewer.deltas,
+            "gaps": viewer.gaps,
+            "received": viewer.received,
+        } for viewer in viewers]
+
+    results.put(asyncio.run(swarm()))
+
+
+def make_server(args, keep_hashes=False):
+    simulation = Simulation(args.width, args.height, engine_name=args.engine)
+    simulation.randomize(args.seed, args.density)
+    broadcaster = Broadcaster(args.width, args.height, args.keyframe_interval, args.buffer_limit)
+    return SpectatorServer(simulation, broadcaster, args.rate, args.density, keep_hashes=keep_hashes)
+
+
+async def serve(args):
+    server = make_server(args)
+    port = await server.start(args.host, args.port)
+    print(f"Streaming {args.width}x{args.height} matches at {args.rate} gens/sec on {args.host}:{port}")
+    try:
+        await server.play()
+    finally:
+        await server.close()
+
+
+# Serves matches while a swarm of clients in another process watches them, then reports what both sides saw
+async def load_test(args):
+    server = make_server(args, keep_hashes=True)
+    broadcaster = server.broadcaster
+    port = await server.start(args.host, 0)
+    results = multiprocessing.Queue()
+    swarm = multiprocessing.Process(target=run_swarm, args=(args.host, port, args.clients, args.verify,
+                                                            args.stalled, args.seconds, results))
+    player = asyncio.create_task(server.play())
+    swarm.start()
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(None, results.get)
+    start = time.perf_counter()
+    first_generation = server.generations
+    first_records = broadcaster.records
+    first_bytes = broadcaster.bytes_sent
+    first_skipped = broadcaster.skipped
+    reports = await loop.run_in_executor(None, results.get)
+    elapsed = time.perf_counter() - start
+    generations = server.generations - first_generation
+    hashes = dict(server.hashes)
+    player.cancel()
+    await server.close()
+    await loop.run_in_executor(None, swarm.join)
+
+    rebuilt = [report for report in reports if report["hash"] is not None]
+    matching = sum(1 for report in rebuilt if hashes.get(report["generation"]) == report["hash"])
+    print(f"Server: {generations / elapsed:.1f} gens/sec of {args.rate} on {args.width}x{args.height}, "
+          f"{broadcaster.peak_spectators} spectators at most")
+    print(f"  {broadcaster.records - first_records} records, "
+          f"{(broadcaster.bytes_sent - first_bytes) / elapsed / 1e6:.1f} MB/s sent, "
+          f"spectators fell behind {broadcaster.fell_behind} times and {broadcaster.skipped - first_skipped} records were skipped")
+    print(f"Clients: {len(reports)}, {sum(report['deltas'] for report in reports) / max(1, len(reports)):.0f} deltas "
+          f"and {sum(report['keyframes'] for report in reports) / max(1, len(reports)):.1f} keyframes each, "
+          f"{sum(report['gaps'] for report in reports)} gaps")
+    print(f"  {matching} of {len(rebuilt)} rebuilt boards match the server's board")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Streams live matches to spectators over TCP")
+    commands = parser.add_subparsers(dest="command", required=True)
+    serve_parser = commands.add_parser("serve", help="Play random matches and stream them")
+    watch_parser = commands.add_parser("watch", help="Reference client, rebuilds the board and prints it each second")
+    load_parser = commands.add_parser("loadtest", help="Serve matches to many clients and check what they got")
+    for command in (serve_parser, watch_parser, load_parser):
+        command.add_argument("--host", default="127.0.0.1")
+    for command in (serve_parser, watch_parser):
+        command.add_argument("--port", type=int, default=default_port)
+    for command in (serve_parser, load_parser):
+        command.add_argument("--width", type=int, default=200)
+        command.add_argument("--height", type=int, default=100)
+        command.add_argument("--engine", choices=[name for name in available_engines() if name != "plane"],
+                             default=default_engine)
+        command.add_argument("--rate", type=float, default=60, help="Generations per second")
+        command.add_argument("--seed", type=int, default=None, help="Seed of the first match")
+        command.add_argument("--density", type=float, default=0.5)
+        command.add_argument("--keyframe-interval", type=int, default=64)
+        command.add_argument("--buffer-limit", type=int, default=1 << 18,
+                             help="Bytes queued for a spectator before it skips to the next keyframe")
+    watch_parser.add_argument("--seconds", type=float, default=None)
+    load_parser.add_argument("--clients", type=int, default=300)
+    load_parser.add_argument("--verify", type=int, default=4, help="Clients that rebuild the board")
+    load_parser.add_argument("--stalled", type=int, default=2, help="Extra clients that never read")
+    load_parser.add_argument("--seconds", type=float, default=10)
+    args = parser.parse_args(argv)
+
+    if args.command == "watch":
+        def print_board(viewer):
+            blue, red = viewer.counts()
+            print(f"Gen {viewer.generation}: blue {blue}, red {red}, {viewer.keyframes} keyframes, "
+                  f"{viewer.deltas} deltas, {viewer.received} bytes")
+
+        try:
+            asyncio.run(watch(Viewer(), args.host, args.port, args.seconds, print_board))
+        except (ConnectionError, KeyboardInterrupt) as error:
+            if isinstance(error, ConnectionError):
+                parser.error(f"can't watch {args.host}:{args.port}: {error}")
+        return
+
+    if args.rate <= 0 or args.keyframe_interval < 1:
+        parser.error("--rate and --keyframe-interval must be positive")
+    if not 0 <= args.density <= 1:
+        parser.error("--density must be between 0 and 1")
+    try:
+        asyncio.run(serve(args) if args.command == "serve" else load_test(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,19 @@
+# Names of the teams in play order, a match of n teams uses the first n. Two-team matches are blue against red.
+team_names = ("blue", "red", "green", "yellow", "purple", "orange", "cyan", "magenta")
+min_teams = 2
+max_teams = len(team_names)
+team_codes = {name: code for code, name in enumerate(team_names, 1)}  # Team ID on integer boards, 0 is empty
+code_colors = (None,) + team_names  # Team of each ID
+mirrored_teams = team_names[1::2]  # Every second team plays patterns mirrored, so neighbouring teams face each other
+
+
+# Teams of a match, raises ValueError for an unsupported number of them
+def match_teams(count):
+    if not min_teams <= count <= max_teams:
+        raise ValueError(f"A match is played by {min_teams} to {max_teams} teams.")
+    return team_names[:count]
+
+
+# Columns where the starting region of every team after the first begins, regions are strips of equal width
+def region_dividers(width, count):
+    return [width * index // count for index in range(1, count)]
@@ -0,0 +1,67 @@
+from array import array
+
+
+# Ring buffer of per-generation populations and changes per team, one typed array per field.
+# Appending is O(1) and the memory is fixed, the oldest generations are overwritten once it is full.
+class PopulationSeries:
+    def __init__(self, capacity=1 << 12, teams=("blue", "red")):
+        self.capacity = capacity
+        self.teams = teams
+        self.fields = (("generation",) + teams + tuple(f"{team}_gained" for team in teams) +
+                       tuple(f"{team}_lost" for team in teams))
+        self.columns = {field: array("q", bytes(8 * capacity)) for field in self.fields}
+        columns = self.columns
+        self.team_columns = [(team, columns[team], columns[f"{team}_gained"], columns[f"{team}_lost"]) for team in teams]
+        self.start = 0  # Index of the oldest generation
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def clear(self):
+        self.start = 0
+        self.size = 0
+
+    # populations holds the count of every team in team order, gained and lost are {team: cells} dicts
+    def append(self, generation, populations, gained=None, lost=None):
+        if self.size < self.capacity:
+            index = (self.start + self.size) % self.capacity
+            self.size += 1
+        else:
+            index = self.start
+            self.start = (self.start + 1) % self.capacity
+        self.columns["generation"][index] = generation
+        for (team, counts, gains, losses), count in zip(self.team_columns, populations):
+            counts[index] = count
+            gains[index] = gained[team] if gained else 0
+            losses[index] = lost[team] if lost else 0
+
+    # Values of one field, oldest first, only the last ones when last is given
+    def column(self, field, last=None):
+        count = self.size if last is None else min(last, self.size)
+        first = (self.start + self.size - count) % self.capacity
+        values = self.columns[field]
+        if first + count <= self.capacity:
+            return values[first:first + count].tolist()
+        return values[first:].tolist() + values[:first + count - self.capacity].tolist()
+
+    def latest(self, field):
+        if not self.size:
+            return None
+        return self.columns[field][(self.start + self.size - 1) % self.capacity]
+
+    # Lines describing how the match went, for the end of game splash
+    def trend_lines(self, window=100):
+        if self.size < 2:
+            return []
+        generations = self.column("generation")
+        lines = []
+        for team in self.teams:
+            values = self.column(team)
+            peak = max(values)
+            peak_generation = generations[values.index(peak)]
+            recent = values[-min(window, len(values)):]
+            change = recent[-1] - recent[0]
+            lines.append(f"{team.capitalize()}: peak {peak} at gen {peak_generation}, "
+                         f"{change:+d} over the last {len(recent) - 1} gens")
+        return lines
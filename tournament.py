@@ -0,0 +1,126 @@
+import argparse
+import csv
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from engine import available_engines, default_engine
+from headless import setup_match
+from pattern_store import default_store
+
+
+# Every pattern as blue against every other pattern as red, for each offset and seed
+def match_matrix(names, offsets=(0,), seeds=(None,)):
+    return [
+        (blue, red, offset, seed)
+        for blue in names
+        for red in names
+        if blue != red
+        for offset in offsets
+        for seed in seeds
+    ]
+
+
+# Plays one match to completion without a display, runs in a worker process
+def play_match(match, width=96, height=54, engine_name=default_engine, max_generations=5000):
+    blue, red, offset, seed = match
+    simulation = setup_match(width, height, blue, red, engine_name, offset, seed)
+    generations = simulation.run(max_generations)
+    blue_count, red_count = simulation.counts()
+    return {
+        "blue": blue,
+        "red": red,
+        "offset": offset,
+        "seed": seed,
+        "outcome": simulation.outcome() or "tie",  # Matches that end at once count as a tie
+        "reason": simulation.stop_reason or "limit",
+        "generations": generations,
+        "blue_count": blue_count,
+        "red_count": red_count,
+    }
+
+
+def play_match_with_settings(arguments):
+    match, settings = arguments
+    return play_match(match, **settings)
+
+
+# Runs all matches over a process pool, returns the results in match order and the matches per second
+def run_tournament(matches, workers=None, **settings):
+    workers = workers or os.cpu_count() or 1
+    start = time.perf_counter()
+    if workers == 1:
+        results = [play_match(match, **settings) for match in matches]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            chunk_size = max(1, len(matches) // (workers * 8))
+            results = list(executor.map(play_match_with_settings, [(match, settings) for match in matches],
+                                        chunksize=chunk_size))
+    elapsed = time.perf_counter() - start
+    return results, len(matches) / elapsed if elapsed > 0 else float("inf")
+
+
+# Win/loss/tie table per pairing, seen from the blue pattern, with the mean generations to a result
+def summarize(results):
+    table = {}
+    for result in results:
+        row = table.setdefault((result["blue"], result["red"]), {
+            "blue": result["blue"], "red": result["red"], "wins": 0, "losses": 0, "ties": 0, "generations": 0,
+        })
+        if result["outcome"] == "blue":
+            row["wins"] += 1
+        elif result["outcome"] == "red":
+            row["losses"] += 1
+        else:
+            row["ties"] += 1
+        row["generations"] += result["generations"]
+
+    for row in table.values():
+        row["mean_generations"] = round(row.pop("generations") / (row["wins"] + row["losses"] + row["ties"]), 1)
+    return list(table.values())
+
+
+def write_results(path, table, results):
+    if path.endswith(".json"):
+        with open(path, "w") as file:
+            json.dump({"table": table, "matches": results}, file, indent=2)
+    else:
+        with open(path, "w", newline="") as file:
+            writer = csv.DictWriter(file, fieldnames=list(table[0]))
+            writer.writeheader()
+            writer.writerows(table)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Round-robin tournament between all saved patterns")
+    parser.add_argument("--width", type=int, default=96)
+    parser.add_argument("--height", type=int, default=54)
+    parser.add_argument("--engine", choices=available_engines(), default=default_engine)
+    parser.add_argument("--patterns", nargs="+", default=None, help="Patterns to play, all stored patterns by default")
+    parser.add_argument("--offsets", type=int, nargs="+", default=[0], help="Rows the red pattern is moved down")
+    parser.add_argument("--seeds", type=int, nargs="+", default=None, help="Seeds for random placements")
+    parser.add_argument("--max-generations", type=int, default=5000)
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes, all cores by default")
+    parser.add_argument("--output", default="tournament.csv", help="CSV or JSON file for the results")
+    args = parser.parse_args(argv)
+
+    names = args.patterns or default_store().names()
+    unknown = [name for name in names if name not in default_store()]
+    if unknown:
+        parser.error(f"unknown patterns: {', '.join(unknown)}")
+    matches = match_matrix(names, args.offsets, args.seeds or [None])
+    results, matches_per_sec = run_tournament(
+        matches, args.workers, width=args.width, height=args.height, engine_name=args.engine,
+        max_generations=args.max_generations,
+    )
+    table = summarize(results)
+    write_results(args.output, table, results)
+
+    for row in table:
+        print(f"{row['blue']} vs {row['red']}: {row['wins']}W {row['losses']}L {row['ties']}T, "
+              f"{row['mean_generations']} generations")
+    print(f"{len(matches)} matches at {matches_per_sec:.1f} matches/sec, results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+import queue
+import threading
+import time
+
+
+# Advances a simulation on a background thread. The changes of every generation are merged into one pending
+# dict and handed to the display through a small bounded queue at most once per frame interval, when the
+# display falls behind the queue stays full and the generations in between are merged instead of queued.
+# While the thread runs it owns the simulation, other threads only send edits and read the published frames.
+class SimulationWorker:
+    def __init__(self, simulation, frame_interval=1 / 60, queue_size=2):
+        self.simulation = simulation
+        self.frame_interval = frame_interval
+        self.frames = queue.Queue(maxsize=queue_size)  # {(x, y): colour or None} changes per frame
+        self.edits = queue.SimpleQueue()
+        self.delay = 0.0  # Seconds between two generations, 0 runs flat out
+        self.pending = {}  # Changes not handed to the display yet
+        self.merged_frames = 0  # Frames that were merged into a later one because the queue was full
+        self.stopping = threading.Event()
+        self.thread = None
+
+    def start(self):
+        self.stopping.clear()
+        self.thread = threading.Thread(target=self.run, name="simulation-worker", daemon=True)
+        self.thread.start()
+
+    # Stops the thread and waits for it, afterwards the simulation belongs to the caller again
+    def stop(self):
+        self.stopping.set()
+        if self.thread is not None:
+            self.thread.join()
+
+    def alive(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    # Edits are applied by the worker between two generations
+    def submit_edits(self, edits):
+        self.edits.put(dict(edits))
+
+    def run(self):
+        simulation = self.simulation
+        next_frame = time.perf_counter()
+        while not self.stopping.is_set():
+            self.apply_edits()
+            changes = simulation.step()
+            if changes is not None:
+                self.pending.update(changes)
+                simulation.profiler.end_generation(simulation.generation_count)
+            if simulation.finished:
+                break
+
+            now = time.perf_counter()
+            if now >= next_frame and self.publish():
+                next_frame = now + self.frame_interval
+            if self.delay > 0:
+                self.stopping.wait(self.delay)
+        self.apply_edits()
+
+    def apply_edits(self):
+        while True:
+            try:
+                edits = self.edits.get_nowait()
+            except queue.Empty:
+                return
+            self.pending.update(self.simulation.apply_edits(edits))
+
+    def publish(self):
+        if not self.pending:
+            return True
+        try:
+            self.frames.put_nowait(self.pending)
+        except queue.Full:
+            self.merged_frames += 1
+            return False
+        self.pending = {}
+        return True
+
+    # Changes of all published frames, merged in order. Once the thread has ended the changes
+    # it did not publish are included too, so the display ends up showing the final board.
+    def collect(self):
+        changes = {}
+        while True:
+            try:
+                changes.update(self.frames.get_nowait())
+            except queue.Empty:
+                break
+        if not self.alive():
+            changes.update(self.pending)
+            self.pending = {}
+        return changes